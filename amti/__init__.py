@@ -1,7 +1,12 @@
 """A Mechanical Turk Interface"""
 
-from amti import (
-    actions,
-    clis,
-    settings,
-    utils)
+from amti.utils.lazy import lazy_submodules
+
+
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'actions',
+    'clis',
+    'local',
+    'settings',
+    'utils'
+])
@@ -1,10 +1,17 @@
 """Actions for managing HITs and their results"""
 
-from amti.actions import (
-    create,
-    delete,
-    expire,
-    extraction,
-    review,
-    save,
-    status)
+from amti.utils.lazy import lazy_submodules
+
+
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'archive',
+    'convert',
+    'create',
+    'delete',
+    'expire',
+    'extraction',
+    'ingest',
+    'review',
+    'save',
+    'status'
+])
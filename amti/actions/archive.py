@@ -0,0 +1,198 @@
+"""Functions for archiving completed batches"""
+
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+
+from amti import settings
+from amti import utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def _archive_results(zip_file, results_dir, results_arc_dir):
+    """Write the results in ``results_dir`` to ``zip_file`` as segments.
+
+    Returns the number of HITs archived.
+    """
+    results_reader = utils.results.ResultsReader(results_dir)
+    if results_reader.layout is None:
+        return 0
+
+    hit_count = len(results_reader)
+
+    if results_reader.layout == 'segments':
+        for file_name in sorted(os.listdir(results_dir)):
+            zip_file.write(
+                os.path.join(results_dir, file_name),
+                arcname=f'{results_arc_dir}/{file_name}')
+
+        return hit_count
+
+    # results saved as a directory per HIT are packed into segments, so
+    # the archive holds a few large members rather than one or two per
+    # HIT.
+    with tempfile.TemporaryDirectory() as working_dir:
+        segments_dir = os.path.join(working_dir, 'results')
+        with utils.results.SegmentWriter(segments_dir) as segment_writer:
+            for hit, assignments in results_reader:
+                segment_writer.write(hit, assignments)
+
+        for file_name in sorted(os.listdir(segments_dir)):
+            zip_file.write(
+                os.path.join(segments_dir, file_name),
+                arcname=f'{results_arc_dir}/{file_name}')
+
+    return hit_count
+
+
+def archive_batch(
+        batch_dir,
+        archive_path=None,
+        remove=False):
+    """Pack the completed batch in ``batch_dir`` into a single archive.
+
+    The archive is a compressed ZIP file holding everything in the batch
+    directory, with the results stored in segments (see
+    ``amti.utils.results``). Extraction and deletion read batches
+    straight from their archives (see ``amti.utils.archive``), so the
+    batch directory can be removed once it's archived.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the batch's directory. Every HIT created for the
+        batch must have been saved, and no save or conversion may have
+        been left unfinished.
+    archive_path : Optional[str]
+        the path at which to write the archive, or ``None`` to write it
+        next to ``batch_dir``, named by
+        ``settings.ARCHIVE_FILE_NAME_TEMPLATE``. Defaults to ``None``.
+    remove : bool
+        if ``True``, remove ``batch_dir`` once the archive is written
+        and checked. Defaults to ``False``.
+
+    Returns
+    -------
+    str
+        the path to the archive.
+    """
+    # construct important paths
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    batchid_file_name, _ = batch_dir_subpaths['batchid']
+    results_dir_name, _ = batch_dir_subpaths['results']
+    incomplete_file_name = settings.INCOMPLETE_FILE_NAME
+
+    batch_dir = os.path.normpath(batch_dir)
+    batchid_file_path = os.path.join(batch_dir, batchid_file_name)
+
+    with open(batchid_file_path) as batchid_file:
+        batch_id = batchid_file.read().strip()
+
+    # this also raises if any shard hasn't been fully uploaded.
+    if utils.batch.get_incomplete_shard_dirs(batch_dir):
+        raise ValueError(
+            f'{batch_dir} still has an {incomplete_file_name} file. Please'
+            f' save every HIT in the batch before archiving it.')
+
+    shard_dirs = utils.batch.get_shard_dirs(batch_dir)
+
+    # an interrupted save or conversion may have left results only in
+    # its staging directories, which an archive would lose.
+    leftover_paths = [
+        os.path.join(shard_dir, leftover_name)
+        for shard_dir in shard_dirs
+        for leftover_name in [
+            settings.SAVE_STAGING_DIR_NAME,
+            settings.CONVERT_STAGING_DIR_NAME,
+            f'{settings.CONVERT_STAGING_DIR_NAME}.old'
+        ]
+        if os.path.exists(os.path.join(shard_dir, leftover_name))
+    ]
+    if leftover_paths:
+        raise ValueError(
+            f'{batch_dir} has leftovers from an interrupted save or'
+            f' conversion: {", ".join(leftover_paths)}. Please run'
+            f' save-batch or convert-results on the batch again before'
+            f' archiving it.')
+
+    # every HIT created for the batch must be in the archive.
+    expected_hit_ids = set()
+    for shard_dir in shard_dirs:
+        _, line_hit_ids = utils.batch.read_upload_journal(
+            os.path.join(shard_dir, settings.UPLOAD_JOURNAL_FILE_NAME))
+        expected_hit_ids.update(line_hit_ids.values())
+
+    if archive_path is None:
+        archive_path = os.path.join(
+            os.path.dirname(batch_dir),
+            settings.ARCHIVE_FILE_NAME_TEMPLATE.format(
+                batch_dir_name=os.path.basename(batch_dir)))
+    if os.path.exists(archive_path):
+        raise ValueError(f'{archive_path} already exists.')
+
+    logger.info(f'Archiving batch {batch_id} to {archive_path}.')
+
+    shard_dirs = {os.path.normpath(shard_dir) for shard_dir in shard_dirs}
+
+    # write the archive under a temporary name, so an interrupted run
+    # never leaves a partial archive behind.
+    tmp_archive_path = f'{archive_path}.tmp'
+    try:
+        hit_count = 0
+        with zipfile.ZipFile(
+                tmp_archive_path, 'w',
+                compression=zipfile.ZIP_DEFLATED) as zip_file:
+            for dir_path, dir_names, file_names in os.walk(batch_dir):
+                dir_names.sort()
+
+                arc_dir = os.path.relpath(dir_path, batch_dir).replace(
+                    os.sep, '/')
+                arc_prefix = '' if arc_dir == '.' else f'{arc_dir}/'
+
+                if dir_path in shard_dirs and results_dir_name in dir_names:
+                    dir_names.remove(results_dir_name)
+                    hit_count += _archive_results(
+                        zip_file=zip_file,
+                        results_dir=os.path.join(dir_path, results_dir_name),
+                        results_arc_dir=f'{arc_prefix}{results_dir_name}')
+
+                for file_name in sorted(file_names):
+                    zip_file.write(
+                        os.path.join(dir_path, file_name),
+                        arcname=f'{arc_prefix}{file_name}')
+
+        # check that every HIT can be read back before trusting the
+        # archive.
+        with utils.results.BatchReader(tmp_archive_path) as batch_reader:
+            archived_hit_ids = set(batch_reader.hit_ids())
+        if len(archived_hit_ids) != hit_count:
+            raise ValueError(
+                f'The archive of {batch_dir} holds {len(archived_hit_ids)}'
+                f' HITs instead of {hit_count}.')
+        missing_hit_ids = expected_hit_ids - archived_hit_ids
+        if missing_hit_ids:
+            raise ValueError(
+                f'{len(missing_hit_ids)} of the HITs created for'
+                f' {batch_dir} have no saved results, for example'
+                f' {min(missing_hit_ids)}. Please save every HIT in the'
+                f' batch before archiving it.')
+
+        os.replace(tmp_archive_path, archive_path)
+    except BaseException:
+        if os.path.exists(tmp_archive_path):
+            os.remove(tmp_archive_path)
+        raise
+
+    logger.info(
+        f'Archived {hit_count} HITs from batch {batch_id} to'
+        f' {archive_path}.')
+
+    if remove:
+        logger.info(f'Removing {batch_dir}.')
+        shutil.rmtree(batch_dir)
+
+    return archive_path
@@ -0,0 +1,69 @@
+"""Functions for converting a batch's results to another layout"""
+
+import logging
+import os
+
+from amti import settings
+from amti import utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def convert_batch(
+        batch_dir,
+        layout):
+    """Convert the results saved in ``batch_dir`` to ``layout``.
+
+    Results that are already in ``layout`` are left as they are, as are
+    shards with no results saved yet. Saving the rest of a partially
+    saved batch continues in the new layout.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the batch's directory.
+    layout : str
+        the layout to convert the results to. See
+        ``settings.RESULTS_LAYOUTS``.
+
+    Returns
+    -------
+    int
+        the number of HITs whose results were converted.
+    """
+    if layout not in settings.RESULTS_LAYOUTS:
+        raise ValueError(
+            'layout must be one of {layouts}.'.format(
+                layouts=', '.join(settings.RESULTS_LAYOUTS)))
+
+    # construct important paths
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    batchid_file_name, _ = batch_dir_subpaths['batchid']
+    results_dir_name, _ = batch_dir_subpaths['results']
+
+    batchid_file_path = os.path.join(
+        batch_dir, batchid_file_name)
+
+    with open(batchid_file_path) as batchid_file:
+        batch_id = batchid_file.read().strip()
+
+    logger.info(f'Converting the results of batch {batch_id} to {layout}.')
+
+    hit_count = 0
+    for shard_dir in utils.batch.get_shard_dirs(batch_dir):
+        results_dir = os.path.join(shard_dir, results_dir_name)
+        shard_hit_count = utils.results.convert_results_dir(
+            results_dir=results_dir,
+            layout=layout,
+            staging_dir=os.path.join(
+                shard_dir, settings.CONVERT_STAGING_DIR_NAME))
+
+        logger.debug(f'Converted {shard_hit_count} HITs in {results_dir}.')
+
+        hit_count += shard_hit_count
+
+    logger.info(
+        f'Converted {hit_count} HITs in batch {batch_id} to {layout}.')
+
+    return hit_count
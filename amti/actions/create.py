@@ -1,13 +1,20 @@
 """Functions for creating HITs"""
 
+import array
+import concurrent.futures
+import contextlib
+import gzip
+import hashlib
 import json
 import logging
 import os
+import re
 import shutil
 import tempfile
 import uuid
+from xml.etree import ElementTree
 
-import jinja2
+import botocore.exceptions
 
 from amti import settings
 from amti import utils
@@ -16,10 +23,86 @@ from amti import utils
 logger = logging.getLogger(__name__)
 
 
+HIT_ALREADY_EXISTS_ERROR_CODE = 'AWS.MechanicalTurk.HitAlreadyExists'
+"""The ``TurkErrorCode`` MTurk returns when a request token is reused."""
+
+
+HIT_ALREADY_EXISTS_PATTERN = re.compile(r'(?P<hit_id>\b[0-9A-Z]{30}\b)')
+"""A pattern matching the HIT ID in MTurk's HitAlreadyExists errors."""
+
+
+FICLONE = 0x40049409
+"""The Linux ``ioctl`` request for cloning a file as a reflink."""
+
+
+def _validate_data_line(data_path, line_number, ln):
+    """Raise a ``ValueError`` if ``ln`` isn't valid JSON."""
+    try:
+        json.loads(ln)
+    except ValueError:
+        raise ValueError(
+            f'Line {line_number} of {data_path} did not validate as'
+            f' JSON. Please make sure file is in JSON Lines'
+            f' format.')
+
+
+def _link_file(source_path, destination_path):
+    """Link ``destination_path`` to ``source_path`` without copying data.
+
+    Try to create a reflink (a copy-on-write clone) first, and fall back
+    to a hardlink. Both only work when the paths are on the same
+    filesystem, and reflinks additionally require filesystem support.
+
+    Returns
+    -------
+    bool
+        ``True`` if the file was linked, otherwise ``False``.
+    """
+    try:
+        import fcntl
+        with open(source_path, 'rb') as source_file, \
+                open(destination_path, 'wb') as destination_file:
+            fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+        logger.debug(f'Reflinked {destination_path} to {source_path}.')
+        return True
+    except (ImportError, OSError):
+        if os.path.exists(destination_path):
+            os.remove(destination_path)
+
+    try:
+        os.link(source_path, destination_path)
+        logger.debug(f'Hardlinked {destination_path} to {source_path}.')
+        return True
+    except OSError:
+        return False
+
+
+def _materialize_data(data_path, destination_path):
+    """Validate the data at ``data_path`` and place it at ``destination_path``.
+
+    The data is linked into place when possible, in which case it's only
+    read once to validate it. Otherwise, it's validated and copied in a
+    single streaming pass.
+    """
+    if _link_file(data_path, destination_path):
+        with open(data_path, 'rb') as data_file:
+            for i, ln in enumerate(data_file):
+                _validate_data_line(data_path, i+1, ln)
+        return
+
+    logger.debug(f'Copying {data_path} to {destination_path}.')
+    with open(data_path, 'rb') as data_file, \
+            open(destination_path, 'wb') as destination_file:
+        for i, ln in enumerate(data_file):
+            _validate_data_line(data_path, i+1, ln)
+            destination_file.write(ln)
+
+
 def initialize_batch_directory(
         definition_dir,
         data_path,
-        save_dir):
+        save_dir,
+        shard_size=None):
     """Create a directory on disk that represents a batch.
 
     Create a directory on disk which brings together the basic elements
@@ -30,6 +113,19 @@ def initialize_batch_directory(
     To simultaneously create the batch directory and upload the HITs to
     MTurk, use the ``create_batch`` function.
 
+    The batch directory is built in a staging directory inside
+    ``save_dir`` and then renamed into place, so it only ever appears
+    complete. The data file is validated and copied in one pass, or, if
+    it's on the same filesystem as ``save_dir``, reflinked or hardlinked
+    instead of copied. Note that a hardlinked data file shares its
+    contents with the original, so the original shouldn't be edited in
+    place afterwards.
+
+    If ``shard_size`` is given, the data is split into shards of at most
+    ``shard_size`` lines, each of which becomes a batch directory of its
+    own (with its own batch ID) inside the returned batch directory.
+    Actions on the returned batch directory fan out over its shards.
+
     Parameters
     ----------
     definition_dir : str
@@ -40,20 +136,22 @@ def initialize_batch_directory(
     save_dir : str
         the path to the directory in which to write the batch
         directory.
+    shard_size : Optional[int]
+        the maximum number of HITs in each of the batch's shards, or
+        ``None`` to not shard the batch. Defaults to ``None``.
 
     Returns
     -------
     batch_dir : str
         the path to the batch directory.
     """
+    if shard_size is not None and shard_size < 1:
+        raise ValueError('shard_size must be at least 1.')
+
     # construct important paths
     batch_dir_name, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
-    readme_file_name, _ = batch_dir_subpaths['readme']
-    commit_file_name, _ = batch_dir_subpaths['commit']
-    batchid_file_name, _ = batch_dir_subpaths['batchid']
     data_file_name, _ = batch_dir_subpaths['data']
-    definition_dir_name, definition_dir_subpaths = \
-        batch_dir_subpaths['definition']
+    _, definition_dir_subpaths = batch_dir_subpaths['definition']
 
     hittype_properties_path = os.path.join(
         definition_dir,
@@ -62,85 +160,189 @@ def initialize_batch_directory(
         definition_dir,
         definition_dir_subpaths['hit_properties'][0])
 
+    # validate the definition data
+    with open(hittype_properties_path, 'r') as hittype_properties_file:
+        hittype_properties = json.load(hittype_properties_file)
+    hittype_validation_errors = utils.validation.validate_dict(
+        hittype_properties, settings.HITTYPE_PROPERTIES)
+    if hittype_validation_errors:
+        raise ValueError(
+            'HIT Type properties file ({hittype_properties_path})'
+            ' had the following validation errors:'
+            '\n{validation_errors}'.format(
+                hittype_properties_path=hittype_properties_path,
+                validation_errors='\n'.join(hittype_validation_errors)))
+
+    with open(hit_properties_path, 'r') as hit_properties_file:
+        hit_properties = json.load(hit_properties_file)
+    hit_validation_errors = utils.validation.validate_dict(
+        hit_properties, settings.HIT_PROPERTIES)
+    if hit_validation_errors:
+        raise ValueError(
+            'HIT properties file ({hit_properties_path})'
+            ' had the following validation errors:'
+            '\n{validation_errors}'.format(
+                hit_properties_path=hit_properties_path,
+                validation_errors='\n'.join(hit_validation_errors)))
+
     # create a UUID for the batch and the path to the batch dir
     batch_id = str(uuid.uuid4())
     batch_dir = os.path.join(
         save_dir, batch_dir_name.format(batch_id=batch_id))
 
-    # use a temporary working directory to build up the batch directory
-    with tempfile.TemporaryDirectory() as working_dir:
-        # write the README file
-        readme_path = os.path.join(working_dir, readme_file_name)
-        with open(readme_path, 'w') as readme_file:
-            readme_file.write(settings.BATCH_README)
-
-        # write the COMMIT file
+    # build up the batch directory in a staging directory on the same
+    # filesystem as its final location, so that it can be published
+    # with an atomic rename.
+    working_dir = tempfile.mkdtemp(
+        prefix=f'.{batch_dir_name.format(batch_id=batch_id)}-',
+        dir=save_dir)
+    try:
         current_commit = utils.log.get_current_commit() or '<none>'
-        commit_path = os.path.join(working_dir, commit_file_name)
-        with open(commit_path, 'w') as commit_file:
-            commit_file.write(current_commit)
-
-        # write the BATCHID file
-        batchid_path = os.path.join(working_dir, batchid_file_name)
-        with open(batchid_path, 'w') as batchid_file:
-            batchid_file.write(batch_id)
-
-        # validate the definition data
-        with open(hittype_properties_path, 'r') as hittype_properties_file:
-            hittype_properties = json.load(hittype_properties_file)
-        hittype_validation_errors = utils.validation.validate_dict(
-            hittype_properties, settings.HITTYPE_PROPERTIES)
-        if hittype_validation_errors:
-            raise ValueError(
-                'HIT Type properties file ({hittype_properties_path})'
-                ' had the following validation errors:'
-                '\n{validation_errors}'.format(
-                    hittype_properties_path=hittype_properties_path,
-                    validation_errors='\n'.join(hittype_validation_errors)))
-
-        with open(hit_properties_path, 'r') as hit_properties_file:
-            hit_properties = json.load(hit_properties_file)
-        hit_validation_errors = utils.validation.validate_dict(
-            hit_properties, settings.HIT_PROPERTIES)
-        if hit_validation_errors:
-            raise ValueError(
-                'HIT properties file ({hit_properties_path})'
-                ' had the following validation errors:'
-                '\n{validation_errors}'.format(
-                    hit_properties_path=hit_properties_path,
-                    validation_errors='\n'.join(hit_validation_errors)))
 
-        # copy the definition data to the working directory
-        working_definition_dir = os.path.join(
-            working_dir, definition_dir_name)
-        os.mkdir(working_definition_dir)
-        for _, (file_name, _) in definition_dir_subpaths.items():
-            shutil.copyfile(
-                os.path.join(definition_dir, file_name),
-                os.path.join(working_definition_dir, file_name))
+        _write_batch_files(
+            working_dir=working_dir,
+            batch_id=batch_id,
+            current_commit=current_commit,
+            definition_dir=definition_dir)
+
+        if shard_size is None:
+            # validate and copy the batch data (data.jsonl) to the
+            # working directory
+            working_data_path = os.path.join(working_dir, data_file_name)
+            _materialize_data(data_path, working_data_path)
+
+            # mark the batch as not yet uploaded
+            open(os.path.join(
+                working_dir, settings.UPLOAD_PENDING_FILE_NAME), 'w').close()
+        else:
+            _write_shards(
+                working_dir=working_dir,
+                current_commit=current_commit,
+                definition_dir=definition_dir,
+                data_path=data_path,
+                shard_size=shard_size)
+
+        # publish the batch directory
+        os.rename(working_dir, batch_dir)
+    except BaseException:
+        shutil.rmtree(working_dir, ignore_errors=True)
+        raise
 
-        # validate the batch data (data.jsonl)
-        with open(data_path, 'r') as data_file:
-            for i, ln in enumerate(data_file):
-                try:
-                    json.loads(ln.rstrip())
-                except ValueError:
-                    raise ValueError(
-                        f'Line {i+1} of {data_path} did not validate as'
-                        f' JSON. Please make sure file is in JSON Lines'
-                        f' format.')
+    return batch_dir
 
-        # copy the batch data (data.jsonl) to the working directory
-        working_data_path = os.path.join(working_dir, data_file_name)
-        shutil.copyfile(data_path, working_data_path)
 
-        # copy the working_dir to the correct location
-        shutil.copytree(working_dir, batch_dir)
+def _write_batch_files(
+        working_dir,
+        batch_id,
+        current_commit,
+        definition_dir):
+    """Write the files common to every batch directory.
 
-    return batch_dir
+    Write the README, COMMIT and BATCHID files, and copy the definition
+    directory, into ``working_dir``.
+    """
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    readme_file_name, _ = batch_dir_subpaths['readme']
+    commit_file_name, _ = batch_dir_subpaths['commit']
+    batchid_file_name, _ = batch_dir_subpaths['batchid']
+    definition_dir_name, definition_dir_subpaths = \
+        batch_dir_subpaths['definition']
+
+    # write the README file
+    readme_path = os.path.join(working_dir, readme_file_name)
+    with open(readme_path, 'w') as readme_file:
+        readme_file.write(settings.BATCH_README)
+
+    # write the COMMIT file
+    commit_path = os.path.join(working_dir, commit_file_name)
+    with open(commit_path, 'w') as commit_file:
+        commit_file.write(current_commit)
+
+    # write the BATCHID file
+    batchid_path = os.path.join(working_dir, batchid_file_name)
+    with open(batchid_path, 'w') as batchid_file:
+        batchid_file.write(batch_id)
+
+    # copy the definition data to the working directory
+    working_definition_dir = os.path.join(
+        working_dir, definition_dir_name)
+    os.mkdir(working_definition_dir)
+    for _, (file_name, _) in definition_dir_subpaths.items():
+        shutil.copyfile(
+            os.path.join(definition_dir, file_name),
+            os.path.join(working_definition_dir, file_name))
+
+
+def _write_shards(
+        working_dir,
+        current_commit,
+        definition_dir,
+        data_path,
+        shard_size):
+    """Split the data into shards and write them into ``working_dir``.
+
+    Validate and split the data at ``data_path`` in a single streaming
+    pass, writing a complete batch directory for every ``shard_size``
+    lines and a manifest listing the shards.
+    """
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    data_file_name, _ = batch_dir_subpaths['data']
+    shard_manifest_file_name, _ = batch_dir_subpaths['shard_manifest']
+    shards_dir_name, shards_dir_subpaths = batch_dir_subpaths['shards']
+    shard_dir_name, _ = shards_dir_subpaths['shard_dir']
 
+    working_shards_dir = os.path.join(working_dir, shards_dir_name)
+    os.mkdir(working_shards_dir)
 
-def estimate_batch_cost(definition_dir, data_path):
+    shard_paths = []
+    shard_data_file = None
+    try:
+        with open(data_path, 'rb') as data_file:
+            for i, ln in enumerate(data_file):
+                _validate_data_line(data_path, i+1, ln)
+
+                if i % shard_size == 0:
+                    if shard_data_file is not None:
+                        shard_data_file.close()
+
+                    shard_id = str(uuid.uuid4())
+                    shard_path = os.path.join(
+                        shards_dir_name,
+                        shard_dir_name.format(batch_id=shard_id))
+                    working_shard_dir = os.path.join(working_dir, shard_path)
+                    os.mkdir(working_shard_dir)
+
+                    _write_batch_files(
+                        working_dir=working_shard_dir,
+                        batch_id=shard_id,
+                        current_commit=current_commit,
+                        definition_dir=definition_dir)
+
+                    # mark the shard as not yet uploaded
+                    open(os.path.join(
+                        working_shard_dir,
+                        settings.UPLOAD_PENDING_FILE_NAME), 'w').close()
+
+                    shard_data_file = open(
+                        os.path.join(working_shard_dir, data_file_name), 'wb')
+                    shard_paths.append(shard_path)
+
+                shard_data_file.write(ln)
+    finally:
+        if shard_data_file is not None:
+            shard_data_file.close()
+
+    shard_manifest_path = os.path.join(working_dir, shard_manifest_file_name)
+    with open(shard_manifest_path, 'w') as shard_manifest_file:
+        json.dump({
+            'shard_size': shard_size,
+            'shards': shard_paths
+        }, shard_manifest_file)
+
+    logger.info(f'Split {data_path} into {len(shard_paths)} shards.')
+
+
+def estimate_batch_cost(definition_dir, data_path, n_hits=None):
     """
     Estimate the cost of a batch.
 
@@ -155,6 +357,9 @@ def estimate_batch_cost(definition_dir, data_path):
         the path to the batch's definition directory.
     data_path : str
         the path to the batch's data file.
+    n_hits : Optional[int]
+        the number of HITs in the batch, if already known. If ``None``,
+        the HITs are counted from ``data_path``.
 
     Returns
     -------
@@ -183,8 +388,9 @@ def estimate_batch_cost(definition_dir, data_path):
     with open(hit_properties_path, 'r') as hit_properties_file:
         hit_properties = json.load(hit_properties_file)
 
-    with open(data_path, "r") as data_file:
-        n_hits = sum(1 for ln in data_file if ln.strip() != '')
+    if n_hits is None:
+        with open(data_path, "r") as data_file:
+            n_hits = sum(1 for ln in data_file if ln.strip() != '')
 
     # Estimate cost
 
@@ -196,28 +402,548 @@ def estimate_batch_cost(definition_dir, data_path):
     return estimated_cost
 
 
+_render_worker_template = None
+"""The question template compiled for the current render worker."""
+
+_render_worker_variables = None
+"""The variables used by the current render worker's template."""
+
+
+def _initialize_render_worker(question_template_source):
+    """Compile the question template for the current render worker."""
+    global _render_worker_template
+    global _render_worker_variables
+    _render_worker_template = utils.templates.get_template(
+        question_template_source)
+    _render_worker_variables = utils.templates.get_template_variables(
+        question_template_source)
+
+
+def _check_question(question):
+    """Return a description of what's wrong with ``question``, if anything.
+
+    Parameters
+    ----------
+    question : str
+        a rendered question.
+
+    Returns
+    -------
+    Optional[str]
+        a string describing why ``question`` is invalid, or ``None`` if
+        it's valid.
+    """
+    question_size = len(question.encode('utf-8'))
+    if question_size > settings.MAX_QUESTION_SIZE:
+        return (
+            f'question is {question_size} bytes, which exceeds the'
+            f' limit of {settings.MAX_QUESTION_SIZE} bytes.')
+
+    try:
+        ElementTree.fromstring(question)
+    except ElementTree.ParseError as error:
+        return f'question is not valid XML: {error}'
+
+    return None
+
+
+def _render_chunk(chunk):
+    """Render and check the questions for a chunk of data lines.
+
+    Parameters
+    ----------
+    chunk : List[Tuple[int, str]]
+        a list of ``(line_number, line)`` pairs from the data file.
+
+    Returns
+    -------
+    List[Tuple[int, Optional[str], Optional[str]]]
+        a list of ``(line_number, question, error)`` triples, where
+        ``question`` is the rendered question (or ``None`` if rendering
+        failed) and ``error`` describes why the question failed to
+        render or is invalid (or is ``None`` if it's valid).
+    """
+    results = []
+    for line_number, ln in chunk:
+        try:
+            ln_data = json.loads(ln.rstrip())
+            question = _render_worker_template.render(**ln_data)
+        except Exception as error:
+            results.append(
+                (line_number, None, f'failed to render: {error}'))
+            continue
+
+        results.append((line_number, question, _check_question(question)))
+
+    return results
+
+
+def _plan_chunk(chunk):
+    """Summarize a chunk of data lines for a batch's plan.
+
+    Parameters
+    ----------
+    chunk : List[Tuple[int, str]]
+        a list of ``(line_number, line)`` pairs from the data file.
+
+    Returns
+    -------
+    List[Tuple[int, Optional[int], Optional[str], List[str], bytes]]
+        a list of ``(line_number, size, error, missing_variables,
+        digest)`` tuples, where ``size`` is the size of the rendered
+        question in bytes (or ``None`` if it failed to render), ``error``
+        describes why the question failed to render or is invalid (or is
+        ``None``), ``missing_variables`` lists the template variables
+        missing from the line's data, and ``digest`` is a hash of the
+        line's data for finding duplicates.
+    """
+    results = []
+    for line_number, ln in chunk:
+        try:
+            ln_data = json.loads(ln)
+        except ValueError:
+            results.append(
+                (line_number, None, 'line is not valid JSON.', [], b''))
+            continue
+
+        digest = hashlib.blake2b(
+            json.dumps(ln_data, sort_keys=True).encode('utf-8'),
+            digest_size=16).digest()
+
+        if not isinstance(ln_data, dict):
+            results.append(
+                (line_number, None, 'line is not a JSON object.', [], digest))
+            continue
+
+        missing_variables = sorted(_render_worker_variables - ln_data.keys())
+
+        try:
+            question = _render_worker_template.render(**ln_data)
+        except Exception as error:
+            results.append((
+                line_number,
+                None,
+                f'failed to render: {error}',
+                missing_variables,
+                digest))
+            continue
+
+        results.append((
+            line_number,
+            len(question.encode('utf-8')),
+            _check_question(question),
+            missing_variables,
+            digest))
+
+    return results
+
+
+def _iter_data_chunks(data_path, chunk_size):
+    """Yield chunks of ``(line_number, line)`` pairs from ``data_path``.
+
+    Empty lines are logged and skipped.
+    """
+    chunk = []
+    with open(data_path, 'r') as data_file:
+        for i, ln in enumerate(data_file):
+            if ln.strip() == '':
+                logger.warning(f'Line {i+1} in {data_path} is empty. Skipping.')
+                continue
+
+            chunk.append((i+1, ln))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def _iter_rendered_questions(rendered_questions_path):
+    """Yield ``(line_number, question)`` pairs from a render cache."""
+    with gzip.open(rendered_questions_path, 'rt') as rendered_questions_file:
+        for ln in rendered_questions_file:
+            line_number, question = json.loads(ln)
+            yield line_number, question
+
+
+def render_batch(
+        batch_dir,
+        jobs=1):
+    """Render and check the question for every HIT in a batch.
+
+    Render the question template with each line of the batch's data,
+    checking that every question is well-formed XML within MTurk's size
+    limit. Rendering is spread across a pool of ``jobs`` processes, and
+    the questions are written (in data order) to a compressed cache in
+    the batch directory, which ``upload_batch`` then streams from. If any
+    question fails to render or is invalid, no cache is written and a
+    ``ValueError`` describing the problems is raised, so that errors are
+    found before any HITs are created.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the batch directory.
+    jobs : int
+        the number of processes to render questions with. Defaults to
+        ``1``, which renders in the current process.
+
+    Returns
+    -------
+    int
+        the number of questions rendered.
+    """
+    if jobs < 1:
+        raise ValueError('jobs must be at least 1.')
+
+    # construct all necessary paths
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    definition_dir_name, definition_dir_subpaths = \
+        batch_dir_subpaths['definition']
+    question_template_file_name, _ = \
+        definition_dir_subpaths['question_template']
+    data_file_name, _ = batch_dir_subpaths['data']
+
+    question_template_path = os.path.join(
+        batch_dir,
+        definition_dir_name,
+        question_template_file_name)
+    data_path = os.path.join(
+        batch_dir, data_file_name)
+    rendered_questions_path = os.path.join(
+        batch_dir, settings.RENDERED_QUESTIONS_FILE_NAME)
+    working_rendered_questions_path = f'{rendered_questions_path}.tmp'
+
+    with open(question_template_path, 'r') as question_template_file:
+        question_template_source = question_template_file.read()
+
+    logger.info(f'Rendering questions for {data_path}.')
+
+    if jobs == 1:
+        _initialize_render_worker(question_template_source)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_initialize_render_worker,
+            initargs=(question_template_source,))
+
+    n_questions = 0
+    errors = []
+    try:
+        with executor, utils.metrics.timer('render_batch'), gzip.open(
+                working_rendered_questions_path,
+                'wt',
+                compresslevel=1) as rendered_questions_file:
+            chunk_futures = utils.concurrency.bounded_map(
+                executor=executor,
+                fn=_render_chunk,
+                iterable=_iter_data_chunks(
+                    data_path, settings.RENDER_CHUNK_SIZE),
+                max_pending=2 * jobs)
+            for chunk_future in chunk_futures:
+                for line_number, question, error in chunk_future.result():
+                    if error is not None:
+                        errors.append(f'Line {line_number}: {error}')
+                        continue
+
+                    n_questions += 1
+                    if not errors:
+                        rendered_questions_file.write(
+                            json.dumps([line_number, question]) + '\n')
+
+        if errors:
+            raise ValueError(
+                f'{len(errors)} questions in {data_path} failed to render'
+                f' or were invalid. The first few errors were:'
+                f'\n' + '\n'.join(errors[:10]))
+    except BaseException:
+        # the file may not exist if opening it is what failed.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(working_rendered_questions_path)
+        raise
+
+    os.replace(working_rendered_questions_path, rendered_questions_path)
+
+    logger.info(f'Rendered {n_questions} questions.')
+
+    return n_questions
+
+
+def plan_batch(
+        definition_dir,
+        data_path,
+        jobs=1):
+    """Plan a batch without writing or uploading anything.
+
+    Make a single streaming pass over ``data_path`` across a pool of
+    ``jobs`` processes, rendering every question and reporting on what
+    uploading the batch would involve and any problems it would hit.
+
+    Parameters
+    ----------
+    definition_dir : str
+        the path to the definition directory.
+    data_path : str
+        the path to a JSONL file holding the data that should be used to
+        generate the HITs in the batch.
+    jobs : int
+        the number of processes to render questions with. Defaults to
+        ``1``, which renders in the current process.
+
+    Returns
+    -------
+    Dict
+        A dictionary with the following form::
+
+            {
+                'row_count': row_count,
+                'estimated_cost': estimated_cost,
+                'question_sizes': question_sizes,
+                'invalid_rows': invalid_rows,
+                'missing_variables': missing_variables,
+                'duplicate_rows': duplicate_rows
+            }
+
+        where ``row_count`` is the number of non-empty lines in the
+        data, ``estimated_cost`` is the estimated cost of the batch in
+        USD, and ``question_sizes`` is a dictionary giving the
+        ``"min"``, ``"mean"``, ``"p50"``, ``"p90"``, ``"p99"`` and
+        ``"max"`` size of the rendered questions in bytes. The remaining
+        values are dictionaries with a ``"count"`` of the affected rows
+        and a list of ``"examples"``: dictionaries with a ``"line"`` key
+        and, respectively, an ``"error"``, a ``"variables"`` or a
+        ``"duplicate_of"`` key.
+    """
+    if jobs < 1:
+        raise ValueError('jobs must be at least 1.')
+
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    _, definition_dir_subpaths = batch_dir_subpaths['definition']
+    question_template_file_name, _ = \
+        definition_dir_subpaths['question_template']
+
+    question_template_path = os.path.join(
+        definition_dir, question_template_file_name)
+
+    with open(question_template_path, 'r') as question_template_file:
+        question_template_source = question_template_file.read()
+
+    logger.info(f'Planning batch for {data_path}.')
+
+    if jobs == 1:
+        _initialize_render_worker(question_template_source)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_initialize_render_worker,
+            initargs=(question_template_source,))
+
+    def problems():
+        return {'count': 0, 'examples': []}
+
+    def record(problem, example):
+        problem['count'] += 1
+        if len(problem['examples']) < settings.PLAN_MAX_EXAMPLES:
+            problem['examples'].append(example)
+
+    row_count = 0
+    question_sizes = array.array('q')
+    invalid_rows = problems()
+    missing_variables = problems()
+    duplicate_rows = problems()
+    first_lines = {}
+    with executor:
+        chunk_futures = utils.concurrency.bounded_map(
+            executor=executor,
+            fn=_plan_chunk,
+            iterable=_iter_data_chunks(data_path, settings.RENDER_CHUNK_SIZE),
+            max_pending=2 * jobs)
+        for chunk_future in chunk_futures:
+            for line_number, size, error, variables, digest \
+                    in chunk_future.result():
+                row_count += 1
+                if size is not None:
+                    question_sizes.append(size)
+                if error is not None:
+                    record(invalid_rows, {
+                        'line': line_number,
+                        'error': error
+                    })
+                if variables:
+                    record(missing_variables, {
+                        'line': line_number,
+                        'variables': variables
+                    })
+                if digest:
+                    first_line = first_lines.setdefault(digest, line_number)
+                    if first_line != line_number:
+                        record(duplicate_rows, {
+                            'line': line_number,
+                            'duplicate_of': first_line
+                        })
+
+    sorted_sizes = sorted(question_sizes)
+
+    def percentile(q):
+        if not sorted_sizes:
+            return None
+        return sorted_sizes[
+            min(len(sorted_sizes) - 1, int(q * len(sorted_sizes)))]
+
+    plan = {
+        'row_count': row_count,
+        'estimated_cost': estimate_batch_cost(
+            definition_dir, data_path, n_hits=row_count),
+        'question_sizes': {
+            'min': percentile(0.),
+            'mean': (
+                sum(sorted_sizes) / len(sorted_sizes)
+                if sorted_sizes else None
+            ),
+            'p50': percentile(.5),
+            'p90': percentile(.9),
+            'p99': percentile(.99),
+            'max': sorted_sizes[-1] if sorted_sizes else None
+        },
+        'invalid_rows': invalid_rows,
+        'missing_variables': missing_variables,
+        'duplicate_rows': duplicate_rows
+    }
+
+    logger.info(f'Finished planning batch for {data_path}.')
+
+    return plan
+
+
+def _create_hit(
+        client,
+        hittype_id,
+        hit_properties,
+        requester_annotation,
+        unique_request_token,
+        question):
+    """Create a single HIT and return its HIT ID.
+
+    If a HIT was already created with ``unique_request_token`` (for
+    example, by a request that timed out or by an earlier, interrupted
+    upload), return the existing HIT's ID instead of creating a new one.
+    """
+    try:
+        hit_response = client.create_hit_with_hit_type(
+            HITTypeId=hittype_id,
+            Question=question,
+            RequesterAnnotation=requester_annotation,
+            UniqueRequestToken=unique_request_token,
+            **hit_properties)
+    except botocore.exceptions.ClientError as error:
+        # MTurk reports a reused token with a HitAlreadyExists code in
+        # the error's TurkErrorCode field, and the existing HIT's ID in
+        # its message. Older versions of botocore don't parse the
+        # TurkErrorCode field, so fall back to the message.
+        message = error.response.get('Error', {}).get('Message', '')
+        turk_error_code = error.response.get('TurkErrorCode')
+        if turk_error_code is not None:
+            hit_already_exists = \
+                turk_error_code == HIT_ALREADY_EXISTS_ERROR_CODE
+        else:
+            hit_already_exists = 'HitAlreadyExists' in message \
+                or 'already exists' in message
+        match = HIT_ALREADY_EXISTS_PATTERN.search(message)
+        if not hit_already_exists or match is None:
+            raise
+        hit_id = match.group('hit_id')
+        logger.debug(
+            f'HIT (ID: {hit_id}) already exists for request token'
+            f' {unique_request_token}.')
+        return hit_id
+
+    return hit_response['HIT']['HITId']
+
+
 def upload_batch(
         client,
-        batch_dir):
+        batch_dir,
+        jobs=1):
     """Upload a batch to MTurk.
 
     Upload a batch to MTurk by creating HITs for it. To create a batch,
     use the ``initialize_batch_directory`` function.
 
+    Up to ``jobs`` HITs are created concurrently through ``client``,
+    while questions are rendered and results collected in the order of
+    the data file. A failure to create an individual HIT is
+    logged and reported in the return value rather than aborting the
+    upload, so that the HITs which were created are still recorded.
+
+    Each HIT is recorded in an append-only journal in the batch
+    directory as soon as it's created, and each creation request carries
+    a unique request token derived from the batch ID and the data line.
+    Calling this function again on a batch whose upload was interrupted
+    or had failures resumes the upload, skipping every line that already
+    has a HIT. Since MTurk only remembers request tokens for 24 hours,
+    interrupted uploads should be resumed within that time.
+
     Parameters
     ----------
     client : MTurk.Client
         a boto3 client for MTurk.
     batch_dir : str
         the path to the batch directory.
+    jobs : int
+        the number of HITs to create concurrently. Defaults to ``1``.
 
     Returns
     -------
-    hittype_id : str
-        the HIT Type ID for the HIT Type created for the batch.
-    hit_ids : List[str]
-        the HIT IDs for the newly created HITs.
+    Dict
+        A dictionary with the following form::
+
+            {
+                'hittype_id': hittype_id,
+                'hit_ids': hit_ids,
+                'failures': failures
+            }
+
+        where ``hittype_id`` is the HIT Type ID for the HIT Type created
+        for the batch, ``hit_ids`` are the HIT IDs for all the batch's
+        HITs in data order, and ``failures`` is a list of dictionaries
+        with ``"line"`` and ``"error"`` keys describing the data lines
+        for which HIT creation failed.
     """
+    return utils.aio.run(upload_batch_async(
+        client=client,
+        batch_dir=batch_dir,
+        concurrency=jobs))
+
+
+async def upload_batch_async(
+        client,
+        batch_dir,
+        concurrency=1):
+    """Upload a batch to MTurk asynchronously.
+
+    See ``upload_batch`` for details.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    batch_dir : str
+        the path to the batch directory.
+    concurrency : int
+        the number of HITs to create concurrently. Defaults to ``1``.
+
+    Returns
+    -------
+    Dict
+        the batch's HIT Type ID, HIT IDs and failures, as returned by
+        ``upload_batch``.
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1.')
+
     # construct all necessary paths
     _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
     definition_dir_name, definition_dir_subpaths = \
@@ -246,13 +972,27 @@ def upload_batch(
         hit_properties_file_name)
     data_path = os.path.join(
         batch_dir, data_file_name)
+    incomplete_file_path = os.path.join(
+        batch_dir, settings.INCOMPLETE_FILE_NAME)
+    journal_path = os.path.join(
+        batch_dir, settings.UPLOAD_JOURNAL_FILE_NAME)
+    rendered_questions_path = os.path.join(
+        batch_dir, settings.RENDERED_QUESTIONS_FILE_NAME)
+
+    # check whether the batch has already been uploaded
+    if os.path.isfile(incomplete_file_path):
+        with open(incomplete_file_path, 'r') as incomplete_file:
+            ids = json.load(incomplete_file)
+        if not ids.get('failures'):
+            logger.info(
+                f'Every HIT in {batch_dir} has already been created.')
+            return ids
 
     # load relevant data
     with open(batchid_path, 'r') as batchid_file:
         batch_id = batchid_file.read().rstrip()
 
-    with open(question_template_path, 'r') as question_template_file:
-        question_template = jinja2.Template(question_template_file.read())
+    question_template = utils.templates.load_template(question_template_path)
 
     with open(hittype_properties_path, 'r') as hittype_properties_file:
         hittype_properties = json.load(hittype_properties_file)
@@ -260,45 +1000,145 @@ def upload_batch(
     with open(hit_properties_path, 'r') as hit_properties_file:
         hit_properties = json.load(hit_properties_file)
 
-    logger.debug(f'Creating HIT Type with properties: {hittype_properties}')
-
-    hittype_response = client.create_hit_type(**hittype_properties)
-    hittype_id = hittype_response['HITTypeId']
-
-    logger.debug(f'New HIT Type (ID: {hittype_id}) created.')
-
-    hit_ids = []
-    with open(data_path, 'r') as data_file:
-        for i, ln in enumerate(data_file):
-            if ln.strip() == '':
-                logger.warning(f'Line {i+1} in {data_path} is empty. Skipping.')
+    hittype_id, line_hit_ids = utils.batch.read_upload_journal(journal_path)
+    if line_hit_ids:
+        logger.info(
+            f'Resuming upload of batch {batch_id}. {len(line_hit_ids)} HITs'
+            f' were already created.')
+
+    with open(journal_path, 'a+') as journal_file, \
+            utils.aio.AsyncClient(client, concurrency) as async_client:
+        # if the process died midway through writing an entry, start the
+        # new entries on a fresh line.
+        if journal_file.tell() > 0:
+            journal_file.seek(journal_file.tell() - 1)
+            if journal_file.read(1) != '\n':
+                journal_file.write('\n')
+
+        if hittype_id is None:
+            logger.debug(
+                f'Creating HIT Type with properties: {hittype_properties}')
+
+            hittype_response = await async_client.create_hit_type(
+                **hittype_properties)
+            hittype_id = hittype_response['HITTypeId']
+
+            journal_file.write(json.dumps({'hittype_id': hittype_id}) + '\n')
+            journal_file.flush()
+
+            logger.debug(f'New HIT Type (ID: {hittype_id}) created.')
+
+        requester_annotation = f'batch={batch_id}'
+
+        def questions():
+            """Yield ``(line_number, question)`` pairs for new HITs."""
+            if os.path.isfile(rendered_questions_path):
+                logger.debug(
+                    f'Reading rendered questions from'
+                    f' {rendered_questions_path}.')
+                for line_number, question in _iter_rendered_questions(
+                        rendered_questions_path):
+                    if line_number in line_hit_ids:
+                        continue
+
+                    yield line_number, question
+
+                return
+
+            with open(data_path, 'r') as data_file:
+                for i, ln in enumerate(data_file):
+                    if ln.strip() == '':
+                        logger.warning(
+                            f'Line {i+1} in {data_path} is empty. Skipping.')
+                        continue
+                    elif i+1 in line_hit_ids:
+                        continue
+                    else:
+                        logger.debug(f'Creating HIT {i+1} using data: {ln}')
+
+                    ln_data = json.loads(ln.rstrip())
+                    with utils.metrics.timer('render'):
+                        question = question_template.render(**ln_data)
+                    yield i+1, question
+
+        async def create_hit(line_number_and_question):
+            line_number, question = line_number_and_question
+            unique_request_token = \
+                settings.UNIQUE_REQUEST_TOKEN_TEMPLATE.format(
+                    batch_id=batch_id,
+                    line_number=line_number)
+            try:
+                hit_id = await async_client.call(
+                    _create_hit,
+                    client=client,
+                    hittype_id=hittype_id,
+                    hit_properties=hit_properties,
+                    requester_annotation=requester_annotation,
+                    unique_request_token=unique_request_token,
+                    question=question)
+            except (botocore.exceptions.BotoCoreError,
+                    botocore.exceptions.ClientError) as error:
+                return line_number, None, error
+
+            # journal the HIT immediately rather than in data order, so
+            # that as few HITs as possible go unrecorded if the process
+            # dies.
+            journal_file.write(json.dumps({
+                'line': line_number,
+                'hit_id': hit_id
+            }) + '\n')
+            journal_file.flush()
+
+            return line_number, hit_id, None
+
+        failures = []
+        created_hits = utils.aio.map_bounded(
+            fn=create_hit,
+            iterable=questions(),
+            max_pending=2 * concurrency)
+        async for line_number, hit_id, error in created_hits:
+            if error is not None:
+                logger.error(
+                    f'Failed to create HIT for line {line_number} in'
+                    f' {data_path}: {error}')
+                failures.append({
+                    'line': line_number,
+                    'error': str(error)
+                })
                 continue
-            else:
-                logger.debug(f'Creating HIT {i+1} using data: {ln}')
 
-            ln_data = json.loads(ln.rstrip())
-            question = question_template.render(**ln_data)
-            requester_annotation = f'batch={batch_id}'
-            hit_response = client.create_hit_with_hit_type(
-                HITTypeId=hittype_id,
-                Question=question,
-                RequesterAnnotation=requester_annotation,
-                **hit_properties)
-            hit_id = hit_response['HIT']['HITId']
             logger.debug(f'Created New HIT (ID: {hit_id}).')
-            hit_ids.append(hit_id)
+            line_hit_ids[line_number] = hit_id
 
     ids = {
         'hittype_id': hittype_id,
-        'hit_ids': hit_ids
+        'hit_ids': [
+            line_hit_ids[line_number]
+            for line_number in sorted(line_hit_ids)
+        ],
+        'failures': failures
     }
 
-    incomplete_file_path = os.path.join(
-        batch_dir, settings.INCOMPLETE_FILE_NAME)
     with open(incomplete_file_path, 'w') as incomplete_file:
         json.dump(ids, incomplete_file)
 
-    logger.info(f'Created {i+1} HITs.')
+    # the upload has run through, so the batch's HITs can be tracked
+    # through the INCOMPLETE file.
+    upload_pending_file_path = os.path.join(
+        batch_dir, settings.UPLOAD_PENDING_FILE_NAME)
+    if os.path.isfile(upload_pending_file_path):
+        os.remove(upload_pending_file_path)
+
+    # the rendered questions are only needed to resume the upload
+    if not failures and os.path.isfile(rendered_questions_path):
+        os.remove(rendered_questions_path)
+
+    logger.info(f'Batch {batch_id} has {len(ids["hit_ids"])} HITs.')
+    if failures:
+        logger.error(
+            f'Failed to create {len(failures)} HITs. See {data_path} lines:'
+            f' {", ".join(str(failure["line"]) for failure in failures)}.'
+            f' To retry them, resume the upload.')
 
     return ids
 
@@ -307,9 +1147,16 @@ def create_batch(
         client,
         definition_dir,
         data_path,
-        save_dir):
+        save_dir,
+        jobs=1,
+        render_jobs=1,
+        shard_size=None):
     """Create a batch, writing it to disk and uploading it to MTurk.
 
+    Every question is rendered and checked before any HITs are created,
+    so that a bad template or data line can't leave a partially uploaded
+    batch.
+
     Parameters
     ----------
     client : MTurk.Client
@@ -321,6 +1168,14 @@ def create_batch(
         generate the HITs in the batch.
     save_dir : str
         the path to the directory in which to write the batch directory.
+    jobs : int
+        the number of HITs to create concurrently. Defaults to ``1``.
+    render_jobs : int
+        the number of processes to render questions with. Defaults to
+        ``1``.
+    shard_size : Optional[int]
+        the maximum number of HITs in each of the batch's shards, or
+        ``None`` to not shard the batch. Defaults to ``None``.
 
     Returns
     -------
@@ -332,17 +1187,60 @@ def create_batch(
     batch_dir = initialize_batch_directory(
         definition_dir=definition_dir,
         data_path=data_path,
-        save_dir=save_dir)
+        save_dir=save_dir,
+        shard_size=shard_size)
+
+    logger.info('Rendering questions.')
+
+    for shard_dir in utils.batch.get_shard_dirs(batch_dir):
+        render_batch(batch_dir=shard_dir, jobs=render_jobs)
 
     logger.info('Uploading batch to MTurk.')
 
-    ids = upload_batch(client=client, batch_dir=batch_dir)
+    resume_batch(client=client, batch_dir=batch_dir, jobs=jobs)
 
     logger.info('HIT Creation Complete.')
 
     return batch_dir
 
 
+def resume_batch(
+        client,
+        batch_dir,
+        jobs=1):
+    """Upload every HIT in a batch which hasn't been created yet.
+
+    Upload the batch, or each of its shards in turn if it's sharded,
+    skipping every HIT that was already created by an earlier upload.
+    See ``upload_batch`` for details.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    batch_dir : str
+        the path to the batch directory.
+    jobs : int
+        the number of HITs to create concurrently. Defaults to ``1``.
+
+    Returns
+    -------
+    List[Dict]
+        the failures from uploading the batch. Each failure is a
+        dictionary with ``"batch_dir"``, ``"line"`` and ``"error"`` keys,
+        giving the batch directory (or shard) and line in its data for
+        which HIT creation failed.
+    """
+    failures = []
+    for shard_dir in utils.batch.get_shard_dirs(batch_dir):
+        ids = upload_batch(client=client, batch_dir=shard_dir, jobs=jobs)
+        failures.extend(
+            {'batch_dir': shard_dir, **failure}
+            for failure in ids['failures'])
+
+    return failures
+
+
 def create_qualificationtype(
         client,
         definition_dir,
@@ -1,10 +1,8 @@
 """Functions for deleting HITs from MTurk"""
 
-import json
 import logging
-import os
 
-from amti import settings
+from amti import utils
 
 
 logger = logging.getLogger(__name__)
@@ -35,44 +33,99 @@ def delete_hit(
 
 def delete_batch(
         client,
-        batch_dir):
+        batch_dir,
+        jobs=1):
     """Delete the batch of HITs represented by ``batch_dir`` from MTurk.
 
-    Only batches that have their results collected can be deleted.
+    Only batches that have their results collected can be deleted. If
+    the batch is sharded, the saved HITs from every shard are deleted.
+    Deleted HITs are recorded as ``"Disposed"`` in the status cache of
+    batch directories (see ``amti.utils.cache``); archives are left
+    unchanged.
 
     Parameters
     ----------
     client : MTurk.Client
         a boto3 client for MTurk.
     batch_dir : str
-        the path to the batch directory.
+        the path to the batch directory or archive.
+    jobs : int
+        the number of HITs to delete concurrently. Defaults to ``1``.
 
     Returns
     -------
     None.
     """
-    batch_dir_name, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
-    batchid_file_name, _ = batch_dir_subpaths['batchid']
-    results_dir_name, results_dir_subpaths = batch_dir_subpaths['results']
-    hit_dir_name, hit_dir_subpaths = results_dir_subpaths['hit_dir']
-    hit_file_name, _ = hit_dir_subpaths['hit']
+    utils.aio.run(delete_batch_async(
+        client=client,
+        batch_dir=batch_dir,
+        concurrency=jobs))
 
-    batchid_file_path = os.path.join(
-        batch_dir, batchid_file_name)
-    results_dir = os.path.join(batch_dir, results_dir_name)
 
-    with open(batchid_file_path) as batchid_file:
-        batch_id = batchid_file.read().strip()
+async def delete_batch_async(
+        client,
+        batch_dir,
+        concurrency=1):
+    """Delete the batch of HITs represented by ``batch_dir`` asynchronously.
 
-    logger.info(f'Deleting batch {batch_id}.')
+    See ``delete_batch`` for details.
 
-    for dir_path, dir_names, file_names in os.walk(results_dir):
-        if hit_file_name in file_names:
-            # read the HIT ID from the HIT's file
-            hit_file_path = os.path.join(dir_path, hit_file_name)
-            with open(hit_file_path, 'r') as hit_file:
-                hit_id = json.load(hit_file)['HIT']['HITId']
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    batch_dir : str
+        the path to the batch directory or archive.
+    concurrency : int
+        the number of HITs to delete concurrently. Defaults to ``1``.
 
-            logger.debug(f'Deleting HIT (ID: {hit_id}).')
+    Returns
+    -------
+    None.
+    """
+    with utils.results.BatchReader(batch_dir) as batch_reader:
+        batch_id = batch_reader.batch_id
+        shard_hit_ids = [
+            (shard_path, results_reader.hit_ids())
+            for shard_path, results_reader in zip(
+                batch_reader.shard_paths(),
+                batch_reader.results_readers())
+        ]
+
+    logger.info(f'Deleting batch {batch_id}.')
 
-            client.delete_hit(HITId=hit_id)
+    # the status cache lives in each (unsharded) batch directory, so
+    # there's none to update when deleting from an archive.
+    update_cache = not utils.archive.is_archive(batch_dir)
+
+    deleted_hit_ids = {shard_path: [] for shard_path, _ in shard_hit_ids}
+    with utils.aio.AsyncClient(client, concurrency) as async_client:
+        async def delete_saved_hit(shard_path_and_hit_id):
+            shard_path, hit_id = shard_path_and_hit_id
+            await async_client.call(
+                delete_hit,
+                client=client,
+                hit_id=hit_id)
+
+            return shard_path, hit_id
+
+        deleted_hits = utils.aio.map_bounded(
+            fn=delete_saved_hit,
+            iterable=(
+                (shard_path, hit_id)
+                for shard_path, hit_ids in shard_hit_ids
+                for hit_id in hit_ids
+            ),
+            max_pending=2 * concurrency)
+        try:
+            async for shard_path, hit_id in deleted_hits:
+                deleted_hit_ids[shard_path].append(hit_id)
+        finally:
+            if update_cache:
+                for shard_path, hit_ids in deleted_hit_ids.items():
+                    utils.cache.update_status_cache(
+                        batch_dir=shard_path,
+                        hit_statuses={
+                            hit_id: 'Disposed'
+                            for hit_id in hit_ids
+                        })
@@ -6,6 +6,7 @@ import os
 import datetime
 
 from amti import settings
+from amti import utils
 
 
 logger = logging.getLogger(__name__)
@@ -13,7 +14,8 @@ logger = logging.getLogger(__name__)
 
 def expire_batch(
         client,
-        batch_dir):
+        batch_dir,
+        jobs=1):
     """Expire all the (unanswered) HITs in the batch.
 
     Parameters
@@ -22,6 +24,8 @@ def expire_batch(
         a boto3 client for MTurk.
     batch_dir : str
         the path to the directory for the batch.
+    jobs : int
+        the number of HITs to expire concurrently. Defaults to ``1``.
 
     Returns
     -------
@@ -35,6 +39,34 @@ def expire_batch(
 
         where ``batch_id`` is the UUID for the batch.
     """
+    return utils.aio.run(expire_batch_async(
+        client=client,
+        batch_dir=batch_dir,
+        concurrency=jobs))
+
+
+async def expire_batch_async(
+        client,
+        batch_dir,
+        concurrency=1):
+    """Expire all the (unanswered) HITs in the batch asynchronously.
+
+    See ``expire_batch`` for details.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    batch_dir : str
+        the path to the directory for the batch.
+    concurrency : int
+        the number of HITs to expire concurrently. Defaults to ``1``.
+
+    Returns
+    -------
+    Dict[str, int]
+        the batch's ID, as returned by ``expire_batch``.
+    """
     # construct important paths
     batch_dir_name, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
     batchid_file_name, _ = batch_dir_subpaths['batchid']
@@ -48,6 +80,28 @@ def expire_batch(
     with open(batchid_file_path) as batchid_file:
         batch_id = batchid_file.read().strip()
 
+    if utils.batch.is_sharded(batch_dir):
+        shard_dirs = utils.batch.get_incomplete_shard_dirs(batch_dir)
+        if not shard_dirs:
+            raise ValueError(
+                f'No shard of {batch_dir} has an {incomplete_file_name}'
+                f' file. Please make sure that the directory is a batch'
+                f' that has open HITs to be expired.')
+
+        logger.info(
+            f'Expiring HITs in {len(shard_dirs)} shards of batch'
+            f' {batch_id}.')
+
+        for shard_dir in shard_dirs:
+            await expire_batch_async(
+                client=client,
+                batch_dir=shard_dir,
+                concurrency=concurrency)
+
+        return {
+            'batch_id': batch_id
+        }
+
     if not os.path.isfile(incomplete_file_path):
         raise ValueError(
             f'No {incomplete_file_name} file was found in {batch_dir}.'
@@ -58,10 +112,41 @@ def expire_batch(
 
     logger.info(f'Expiring HITs in batch {batch_id}.')
 
-    for hit_id in hit_ids:
-        hit = client.update_expiration_for_hit(
-            HITId=hit_id,
-            ExpireAt=datetime.datetime.now())
+    # HITs known to be reviewable or disposed can't be worked anymore,
+    # so there's no need to expire them.
+    closed_hit_statuses = utils.cache.get_cached_statuses(
+        batch_dir=batch_dir,
+        hit_ids=hit_ids)
+    if closed_hit_statuses:
+        logger.info(
+            f'Skipping {len(closed_hit_statuses)} HITs that are already'
+            f' closed.')
+
+    expired_hit_ids = []
+    with utils.aio.AsyncClient(client, concurrency) as async_client:
+        async def expire_hit(hit_id):
+            await async_client.update_expiration_for_hit(
+                HITId=hit_id,
+                ExpireAt=datetime.datetime.now())
+
+            return hit_id
+
+        expired_hits = utils.aio.map_bounded(
+            fn=expire_hit,
+            iterable=(
+                hit_id
+                for hit_id in hit_ids
+                if hit_id not in closed_hit_statuses
+            ),
+            max_pending=2 * concurrency)
+        try:
+            async for hit_id in expired_hits:
+                expired_hit_ids.append(hit_id)
+        finally:
+            # the expired HITs' cached statuses are out of date
+            utils.cache.update_status_cache(
+                batch_dir=batch_dir,
+                hit_statuses={hit_id: None for hit_id in expired_hit_ids})
 
     logger.info(f'All HITs in batch {batch_id} are now expired.')
 
@@ -1,5 +1,9 @@
 """Actions for extracting data from batches"""
 
-from amti.actions.extraction import (
-    tabular,
-    xml)
+from amti.utils.lazy import lazy_submodules
+
+
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'tabular',
+    'xml'
+])
@@ -1,15 +1,11 @@
 """A function for extracting batch data into a tabular format."""
 
 import csv
-import html
 import json
 import logging
-import os
-from xml.dom import minidom
 
 import click
 
-from amti import settings
 from amti import utils
 
 
@@ -27,6 +23,102 @@ TABULAR_SUPPORTED_FILE_FORMATS = [
 # ``amti.clis.extraction.tabular.tabular`` if you edit this constant.
 
 
+TABULAR_HIT_COLUMNS = [
+    'HITId',
+    'AssignmentDurationInSeconds',
+    'AutoApprovalDelayInSeconds',
+    'Expiration',
+    'CreationTime'
+]
+"""Columns copied from each assignment's HIT into the table."""
+
+
+TABULAR_ASSIGNMENT_COLUMNS = [
+    'AssignmentId',
+    'WorkerId',
+    'AssignmentStatus',
+    'AutoApprovalTime',
+    'AcceptTime',
+    'SubmitTime',
+    'ApprovalTime'
+]
+"""Columns copied from each assignment into the table."""
+
+
+def _check_field_names(field_names):
+    """Raise a ``ValueError`` if form fields collide with metadata columns.
+
+    Form fields share the table's columns with the HIT and assignment
+    metadata, so a form field with the same name as a metadata column
+    would overwrite it.
+    """
+    colliding_field_names = [
+        field_name
+        for field_name in field_names
+        if field_name in TABULAR_HIT_COLUMNS
+        or field_name in TABULAR_ASSIGNMENT_COLUMNS
+    ]
+    if colliding_field_names:
+        raise ValueError(
+            f'The form fields {", ".join(colliding_field_names)} have the'
+            f' same names as metadata columns of the table. Please rename'
+            f' them in the question template.')
+
+
+def _get_row(hit, assignment):
+    """Return the row of the table for ``assignment``."""
+    row = {}
+
+    # add relevant metadata from the HIT
+    for column in TABULAR_HIT_COLUMNS:
+        row[column] = hit['HIT'][column]
+
+    # add relevant metadata from the assignment
+    for column in TABULAR_ASSIGNMENT_COLUMNS:
+        row[column] = assignment[column]
+
+    # parse the response and add it to the row
+    with utils.metrics.timer('parse_answer_xml'):
+        answers = utils.answers.parse_answers(
+            assignment['Answer'], hit_id=row['HITId'])
+    _check_field_names(answers)
+    row.update(answers)
+
+    return row
+
+
+def _get_field_names(batch_reader):
+    """Return the form fields of the assignments in ``batch_reader``.
+
+    The fields come from the schemas saved with the batch's results when
+    they're up to date, and otherwise from a pass over the results that
+    only looks for the answers' question identifiers.
+    """
+    field_names = batch_reader.field_names()
+    if field_names is None:
+        logger.info(
+            'The batch has no up-to-date schema. Reading the form fields'
+            ' from its results.')
+
+        field_names = {}
+        for _, assignments in batch_reader:
+            for assignment in assignments:
+                field_names.update(dict.fromkeys(
+                    utils.answers.get_question_identifiers(
+                        assignment['Answer'])))
+        field_names = list(field_names)
+
+    # see ``amti.utils.answers.parse_answers``.
+    field_names = [
+        field_name
+        for field_name in field_names
+        if field_name != utils.answers.DO_NOT_REDIRECT_FIELD
+    ]
+    _check_field_names(field_names)
+
+    return field_names
+
+
 def tabular(
         batch_dir,
         output_path,
@@ -39,10 +131,17 @@ def tabular(
     the assignment's metadata. The table will be written to
     ``output_path`` in the format specified by ``file_format``.
 
+    Rows are written as the results are read, so the memory used doesn't
+    grow with the size of the batch. A CSV table has a column for every
+    form field found in any assignment, which are known from the schema
+    saved along with the results (see
+    ``amti.utils.results.update_schema``), or else from a first pass
+    over the results.
+
     Parameters
     ----------
     batch_dir : str
-        the path to the batch's directory.
+        the path to the batch's directory or archive.
     output_path : str
         the path where the output file should be saved.
     file_format : str
@@ -59,121 +158,43 @@ def tabular(
             'file_format must be one of {formats}.'.format(
                 formats=', '.join(TABULAR_SUPPORTED_FILE_FORMATS)))
 
-    # construct important paths
-    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
-    batchid_file_name, _ = batch_dir_subpaths['batchid']
-    results_dir_name, results_dir_subpaths = batch_dir_subpaths['results']
-    _, hit_dir_subpaths = results_dir_subpaths['hit_dir']
-    hit_file_name, _ = hit_dir_subpaths['hit']
-    assignments_file_name, _ = hit_dir_subpaths['assignments']
+    with utils.results.BatchReader(batch_dir) as batch_reader, \
+            click.open_file(output_path, 'w') as output_file:
+        batch_id = batch_reader.batch_id
 
-    batchid_file_path = os.path.join(
-        batch_dir, batchid_file_name)
-    results_dir = os.path.join(batch_dir, results_dir_name)
+        logger.info(
+            f'Beginning to extract batch {batch_id} to tabular format.')
 
-    with open(batchid_file_path) as batchid_file:
-        batch_id = batchid_file.read().strip()
+        rows = (
+            _get_row(hit, assignment)
+            for hit, assignments in batch_reader
+            for assignment in assignments
+        )
 
-    logger.info(
-        f'Beginning to extract batch {batch_id} to tabular format.')
-
-    rows = []
-    for dir_path, dir_names, file_names in os.walk(results_dir):
-        hit = None
-        assignments = None
-        for file_name in file_names:
-            if file_name == hit_file_name:
-                hit_path = os.path.join(dir_path, file_name)
-                with open(hit_path, 'r') as hit_file:
-                    hit = json.load(hit_file)
-            elif file_name == assignments_file_name:
-                assignments_path = os.path.join(
-                    dir_path, assignments_file_name)
-                with open(assignments_path, 'r') as assignments_file:
-                    assignments = [
-                        json.loads(ln.strip())
-                        for ln in assignments_file
-                    ]
-            else:
-                logger.warning(
-                    f'Unexected file ({file_name}) located in'
-                    f' {dir_path}')
-
-        if hit is None or assignments is None:
-            # if both ``hit`` and ``assignments`` are ``None``, then
-            # this directory is simply not one we're interested in;
-            # however, if exactly one is ``None`` then there's likely
-            # been an error.
-            if hit is None and assignments is not None:
-                logger.warning(
-                    f'Found assignments but no HIT in {dir_path}.')
-            elif hit is not None and assignments is None:
-                logger.warning(
-                    f'Found HIT but no assignments in {dir_path}.')
-            continue
-
-        for assignment in assignments:
-            row = {}
-
-            # add relevant metadata from the HIT
-            row['HITId'] = hit['HIT']['HITId']
-            row['AssignmentDurationInSeconds'] =\
-                hit['HIT']['AssignmentDurationInSeconds']
-            row['AutoApprovalDelayInSeconds'] =\
-                hit['HIT']['AutoApprovalDelayInSeconds']
-            row['Expiration'] = hit['HIT']['Expiration']
-            row['CreationTime'] = hit['HIT']['CreationTime']
-
-            # add relevant metadata from the assignment
-            row['AssignmentId'] = assignment['AssignmentId']
-            row['WorkerId'] = assignment['WorkerId']
-            row['AssignmentStatus'] = assignment['AssignmentStatus']
-            row['AutoApprovalTime'] = assignment['AutoApprovalTime']
-            row['AcceptTime'] = assignment['AcceptTime']
-            row['SubmitTime'] = assignment['SubmitTime']
-            row['ApprovalTime'] = assignment['ApprovalTime']
-
-            # parse the response and add it to the row
-            xml = minidom.parseString(assignment['Answer'])
-            for answer_tag in xml.getElementsByTagName('Answer'):
-                [question_identifier_tag] =\
-                    answer_tag.getElementsByTagName(
-                        'QuestionIdentifier')
-                question_identifier = utils.xml.get_node_text(
-                    question_identifier_tag)
-
-                if question_identifier == 'doNotRedirect':
-                    # some workers on Mechanical Turk modify their
-                    # browser requests to send a 'doNotRedirect'
-                    # field when posting results.
-                    logger.warning(
-                        f'Found a "doNotRedirect" field in'
-                        f' {dir_path}. Dropping the field.')
-                    continue
-
-                [free_text_tag] = answer_tag.getElementsByTagName(
-                    'FreeText')
-                free_text = html.unescape(
-                    utils.xml.get_node_text(free_text_tag))
-
-                row[question_identifier] = free_text
-
-            rows.append(row)
-
-    with click.open_file(output_path, 'w') as output_file:
         if file_format == 'csv':
             csv_writer = csv.DictWriter(
                 output_file,
-                fieldnames=rows[0].keys())
+                fieldnames=(
+                    TABULAR_HIT_COLUMNS
+                    + TABULAR_ASSIGNMENT_COLUMNS
+                    + _get_field_names(batch_reader)))
             csv_writer.writeheader()
             csv_writer.writerows(rows)
         elif file_format == 'json':
-            json.dump(rows, output_file)
+            # write the same output as ``json.dump(list(rows))``, one row
+            # at a time.
+            output_file.write('[')
+            for i, row in enumerate(rows):
+                if i > 0:
+                    output_file.write(', ')
+                output_file.write(json.dumps(row))
+            output_file.write(']')
         elif file_format == 'jsonl':
-            output_file.write('\n'.join([
-                json.dumps(row)
-                for row in rows
-            ]))
+            for i, row in enumerate(rows):
+                with utils.metrics.timer('write_jsonl'):
+                    if i > 0:
+                        output_file.write('\n')
+                    output_file.write(json.dumps(row))
         else:
             raise NotImplementedError(
                 f'Support for {file_format} has not been implemented.')
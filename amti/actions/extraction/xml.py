@@ -1,13 +1,12 @@
 """A function for extracting data from a batch as XML"""
 
-import json
 import logging
 import os
 import shutil
 import tempfile
-from xml.dom import minidom
 
 from amti import settings
+from amti import utils
 
 
 logger = logging.getLogger(__name__)
@@ -29,7 +28,7 @@ def xml(
     Parameters
     ----------
     batch_dir : str
-        the path to the batch's directory.
+        the path to the batch's directory or archive.
     output_dir : str
         the path to the directory in which to save the output.
 
@@ -38,19 +37,12 @@ def xml(
     None.
     """
     # construct important paths
-    batch_dir_name, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
-    batchid_file_name, _ = batch_dir_subpaths['batchid']
-    results_dir_name, results_dir_subpaths = batch_dir_subpaths['results']
-    _, hit_dir_subpaths = results_dir_subpaths['hit_dir']
-    hit_file_name, _ = hit_dir_subpaths['hit']
-    assignments_file_name, _ = hit_dir_subpaths['assignments']
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    _, results_dir_subpaths = batch_dir_subpaths['results']
+    hit_dir_name, _ = results_dir_subpaths['hit_dir']
 
-    batchid_file_path = os.path.join(
-        batch_dir, batchid_file_name)
-    results_dir = os.path.join(batch_dir, results_dir_name)
-
-    with open(batchid_file_path) as batchid_file:
-        batch_id = batchid_file.read().strip()
+    with utils.results.BatchReader(batch_dir) as batch_reader:
+        batch_id = batch_reader.batch_id
 
     logger.info(
         f'Beginning to extract batch {batch_id} to XML.')
@@ -59,27 +51,23 @@ def xml(
         batch_id=batch_id)
     xml_dir_path = os.path.join(output_dir, xml_dir_name)
     with tempfile.TemporaryDirectory() as working_dir:
-        for dir_path, dir_names, file_names in os.walk(results_dir):
-            if hit_file_name in file_names:
-                hit_dir_name = os.path.split(dir_path)[-1]
-                hit_dir = os.path.join(working_dir, hit_dir_name)
-                os.mkdir(hit_dir)
-
-                assignments_path = os.path.join(
-                    dir_path, assignments_file_name)
-                with open(assignments_path, 'r') as assignments_file:
-                    for ln in assignments_file:
-                        assignment = json.loads(ln.rstrip())
-                        assignment_id = assignment['AssignmentId']
-                        xml = minidom.parseString(assignment['Answer'])
-
-                        xml_file_name = settings.XML_FILE_NAME_TEMPLATE.format(
-                            assignment_id=assignment_id)
-                        xml_output_path = os.path.join(
-                            hit_dir, xml_file_name)
-                        with open(xml_output_path, 'w') as xml_output_file:
-                            xml_output_file.write(
-                                xml.toprettyxml(indent='  '))
+        for hit, assignments in utils.results.iter_batch_results(batch_dir):
+            hit_dir = os.path.join(
+                working_dir,
+                hit_dir_name.format(hit_id=hit['HIT']['HITId']))
+            os.mkdir(hit_dir)
+
+            for assignment in assignments:
+                assignment_id = assignment['AssignmentId']
+                with utils.metrics.timer('parse_answer_xml'):
+                    answer_xml = utils.answers.format_answer_xml(
+                        assignment['Answer'], indent='  ')
+
+                xml_file_name = settings.XML_FILE_NAME_TEMPLATE.format(
+                    assignment_id=assignment_id)
+                xml_output_path = os.path.join(hit_dir, xml_file_name)
+                with open(xml_output_path, 'w') as xml_output_file:
+                    xml_output_file.write(answer_xml)
 
         shutil.copytree(working_dir, xml_dir_path)
 
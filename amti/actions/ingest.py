@@ -0,0 +1,251 @@
+"""Functions for ingesting MTurk event notifications into batches"""
+
+import collections
+import json
+import logging
+import math
+import os
+import time
+
+from amti import settings
+from amti import utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def _read_incomplete_shards(batch_dir):
+    """Return the HIT Type ID and HIT IDs for each incomplete shard."""
+    incomplete_file_name = settings.INCOMPLETE_FILE_NAME
+
+    shard_dirs = utils.batch.get_incomplete_shard_dirs(batch_dir)
+    if not shard_dirs:
+        raise ValueError(
+            f'No {incomplete_file_name} file was found in {batch_dir}.'
+            f' Please make sure that the directory is a batch that has'
+            f' HITs waiting for review.')
+
+    shards = {}
+    for shard_dir in shard_dirs:
+        incomplete_file_path = os.path.join(shard_dir, incomplete_file_name)
+        with open(incomplete_file_path) as incomplete_file:
+            shards[shard_dir] = json.load(incomplete_file)
+
+    return shards
+
+
+def configure_notifications(
+        client,
+        batch_dir,
+        destination,
+        transport='SNS',
+        event_types=None):
+    """Ask MTurk to send event notifications for a batch's HITs.
+
+    Notifications are configured per HIT Type, so other batches sharing
+    the batch's HIT Type send notifications to ``destination`` too.
+    ``ingest_events`` ignores their events.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    batch_dir : str
+        the path to the directory for the batch.
+    destination : str
+        the ARN of the SNS topic or the URL of the SQS queue to which
+        notifications should be sent.
+    transport : str
+        the transport for the notifications, ``"SNS"`` or ``"SQS"``.
+        Defaults to ``"SNS"``.
+    event_types : Optional[List[str]]
+        the types of events for which to send notifications, or ``None``
+        to use ``settings.NOTIFICATION_EVENT_TYPES``. Defaults to
+        ``None``.
+
+    Returns
+    -------
+    List[str]
+        the IDs of the HIT Types for which notifications were configured.
+    """
+    if event_types is None:
+        event_types = settings.NOTIFICATION_EVENT_TYPES
+
+    hittype_ids = sorted({
+        ids['hittype_id']
+        for ids in _read_incomplete_shards(batch_dir).values()
+        if ids.get('hittype_id') is not None
+    })
+    for hittype_id in hittype_ids:
+        logger.info(
+            f'Sending notifications for HIT Type {hittype_id} to'
+            f' {destination}.')
+        client.update_notification_settings(
+            HITTypeId=hittype_id,
+            Notification={
+                'Destination': destination,
+                'Transport': transport,
+                'Version': settings.NOTIFICATION_VERSION,
+                'EventTypes': event_types
+            },
+            Active=True)
+
+    return hittype_ids
+
+
+def ingest_events(
+        batch_dir,
+        event_source,
+        until_complete=True):
+    """Update a batch's cached HIT statuses from event notifications.
+
+    Each event that changes the status of one of the batch's HITs (see
+    ``settings.EVENT_HIT_STATUSES``) updates the HIT's entry in the
+    status cache (see ``amti.utils.cache``), so that ``status``,
+    ``review``, ``save`` and ``expire`` don't need to fetch it. Events
+    for other HITs are ignored, and events older than a HIT's cached
+    status don't override it. Updates are buffered for at most
+    ``settings.EVENTS_FLUSH_INTERVAL`` seconds before they're written.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the directory for the batch.
+    event_source : Iterable[List[Dict]]
+        the source of events, for example
+        ``amti.utils.events.webhook_events()``. See ``amti.utils.events``.
+    until_complete : bool
+        if ``True``, stop once every HIT in the batch is known to be
+        reviewable. Otherwise, stop when ``event_source`` is exhausted.
+        Defaults to ``True``.
+
+    Returns
+    -------
+    Dict[str, Any]
+        A dictionary of the form::
+
+            {
+                'batch_id': batch_id,
+                'event_count': event_count,
+                'update_count': update_count,
+                'hit_status_counts': hit_status_counts
+            }
+
+        where ``batch_id`` is the UUID for the batch, ``event_count`` is
+        the number of events for the batch's HITs, ``update_count`` is
+        the number of status updates applied to the cache and
+        ``hit_status_counts`` counts the HITs with each known status.
+    """
+    batch_dir_name, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    batchid_file_name, _ = batch_dir_subpaths['batchid']
+
+    batchid_file_path = os.path.join(batch_dir, batchid_file_name)
+    with open(batchid_file_path) as batchid_file:
+        batch_id = batchid_file.read().strip()
+
+    shard_dirs = {}
+    known_statuses = {}
+    for shard_dir, ids in _read_incomplete_shards(batch_dir).items():
+        for hit_id in ids['hit_ids']:
+            shard_dirs[hit_id] = shard_dir
+        known_statuses.update(utils.cache.get_cached_statuses(
+            batch_dir=shard_dir,
+            hit_ids=ids['hit_ids'],
+            max_age=math.inf))
+
+    reviewable_count = sum(
+        hit_status == 'Reviewable'
+        for hit_status in known_statuses.values())
+
+    logger.info(
+        f'Ingesting events for {len(shard_dirs)} HITs in batch'
+        f' {batch_id}.')
+
+    event_count = 0
+    update_count = 0
+    pending_updates = collections.defaultdict(dict)
+    last_flushed_at = time.monotonic()
+
+    def flush():
+        nonlocal update_count, reviewable_count, last_flushed_at
+
+        for shard_dir, status_updates in pending_updates.items():
+            applied_updates = utils.cache.merge_status_updates(
+                batch_dir=shard_dir,
+                status_updates=status_updates)
+            for hit_id, hit_status in applied_updates.items():
+                if known_statuses.get(hit_id) == 'Reviewable':
+                    reviewable_count -= 1
+                if hit_status == 'Reviewable':
+                    reviewable_count += 1
+
+                if hit_status is None:
+                    known_statuses.pop(hit_id, None)
+                else:
+                    known_statuses[hit_id] = hit_status
+            update_count += len(applied_updates)
+
+        pending_updates.clear()
+        last_flushed_at = time.monotonic()
+
+    # sources that can discard events are told once the events' updates
+    # are written, so that no event is lost if ingestion stops early.
+    acknowledge = getattr(event_source, 'acknowledge', lambda: None)
+
+    try:
+        if until_complete and reviewable_count == len(shard_dirs):
+            event_source = []
+
+        for events in event_source:
+            for event in events:
+                hit_id = event.get('HITId')
+                if hit_id not in shard_dirs:
+                    continue
+                event_count += 1
+
+                event_type = event.get('EventType')
+                if event_type not in settings.EVENT_HIT_STATUSES:
+                    continue
+
+                logger.debug(f'Received {event_type} for HIT {hit_id}.')
+
+                hit_status = settings.EVENT_HIT_STATUSES[event_type]
+                observed_at = utils.events.parse_event_timestamp(event)
+                shard_updates = pending_updates[shard_dirs[hit_id]]
+                if hit_id in shard_updates:
+                    # keep the latest update, preferring a known status
+                    # to an unknown one from the same second.
+                    pending_status, pending_observed_at = \
+                        shard_updates[hit_id]
+                    if (observed_at, hit_status is not None) \
+                       < (pending_observed_at, pending_status is not None):
+                        continue
+                shard_updates[hit_id] = (hit_status, observed_at)
+
+            if not events \
+               or time.monotonic() - last_flushed_at \
+               >= settings.EVENTS_FLUSH_INTERVAL:
+                flush()
+                acknowledge()
+
+            if until_complete and reviewable_count == len(shard_dirs):
+                logger.info(f'Every HIT in batch {batch_id} is Reviewable.')
+                break
+    finally:
+        flush()
+    acknowledge()
+
+    hit_status_counts = collections.defaultdict(int)
+    for hit_status in known_statuses.values():
+        hit_status_counts[hit_status] += 1
+
+    logger.info(
+        f'Ingested {event_count} events for batch {batch_id}, updating'
+        f' {update_count} HIT statuses.')
+
+    return {
+        'batch_id': batch_id,
+        'event_count': event_count,
+        'update_count': update_count,
+        'hit_status_counts': hit_status_counts
+    }
@@ -1,13 +1,14 @@
 """Functions for reviewing HITs"""
 
+import collections
 import json
 import logging
 import os
-from xml.dom import minidom
 
 import click
 
 from amti import settings
+from amti import utils
 
 
 logger = logging.getLogger(__name__)
@@ -56,7 +57,6 @@ def review_hit(
         for assignment in assignments_page['Assignments']:
             assignment_id = assignment['AssignmentId']
             assignment_status = assignment['AssignmentStatus']
-            answers_xml = minidom.parseString(assignment['Answer'])
 
             logger.info(
                 f'Assignment (ID: {assignment_id}) Status: {assignment_status}.')
@@ -75,6 +75,10 @@ def review_hit(
                 else:
                     logger.info(f'Reviewing assignment (ID: {assignment_id}).')
 
+                    with utils.metrics.timer('parse_answer_xml'):
+                        answers = utils.answers.format_answer_xml(
+                            assignment['Answer'])
+
                     click.echo(
                         'HIT ID: {hit_id}'
                         '\nAssignment ID: {assignment_id}'
@@ -84,7 +88,7 @@ def review_hit(
                         '\n{answers}'.format(
                             hit_id=hit_id,
                             assignment_id=assignment_id,
-                            answers=answers_xml.toprettyxml()))
+                            answers=answers))
 
                     assignment_action = click.prompt(
                         'Would you like to (a)ccept, (r)eject, (s)kip or'
@@ -157,9 +161,14 @@ def review_batch(
         client,
         batch_dir,
         approve_all,
-        mark_file_path):
+        mark_file_path,
+        jobs=1):
     """Manually review the HITs in a batch.
 
+    If the batch is sharded, review every shard that hasn't been saved
+    yet, writing the marked assignments from all of them to
+    ``mark_file_path``.
+
     Parameters
     ----------
     client : MTurk.Client
@@ -170,39 +179,84 @@ def review_batch(
         a flag to decide approve all submissions
     mark_file_path : str
         the path at which to save the assignment marks.
+    jobs : int
+        the number of HITs to review concurrently. Since manual review
+        prompts for input, ``jobs`` may only be greater than ``1`` when
+        ``approve_all`` is set. Defaults to ``1``.
 
     Returns
     -------
     None.
     """
+    utils.aio.run(review_batch_async(
+        client=client,
+        batch_dir=batch_dir,
+        approve_all=approve_all,
+        mark_file_path=mark_file_path,
+        concurrency=jobs))
+
+
+async def review_batch_async(
+        client,
+        batch_dir,
+        approve_all,
+        mark_file_path,
+        concurrency=1):
+    """Manually review the HITs in a batch asynchronously.
+
+    See ``review_batch`` for details.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    batch_dir : str
+        the path to the directory for the batch.
+    approve_all : bool
+        a flag to decide approve all submissions
+    mark_file_path : str
+        the path at which to save the assignment marks.
+    concurrency : int
+        the number of HITs to review concurrently. Defaults to ``1``.
+
+    Returns
+    -------
+    None.
+    """
+    if concurrency > 1 and not approve_all:
+        raise ValueError(
+            'HITs can only be reviewed concurrently when approving all'
+            ' assignments.')
+
     batch_dir_name, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
     batchid_file_name, _ = batch_dir_subpaths['batchid']
     incomplete_file_name = settings.INCOMPLETE_FILE_NAME
 
     batchid_file_path = os.path.join(
         batch_dir, batchid_file_name)
-    incomplete_file_path = os.path.join(
-        batch_dir, settings.INCOMPLETE_FILE_NAME)
 
     with open(batchid_file_path) as batchid_file:
         batch_id = batchid_file.read().strip()
 
-    if not os.path.isfile(incomplete_file_path):
-        raise ValueError(
-            f'No {incomplete_file_name} file was found in {batch_dir}.'
-            f' Please make sure that the directory is a batch that has'
-            f' HITs waiting for review.')
-    with open(incomplete_file_path) as incomplete_file:
-        hit_ids = json.load(incomplete_file)['hit_ids']
+    if utils.batch.is_sharded(batch_dir):
+        shard_dirs = utils.batch.get_incomplete_shard_dirs(batch_dir)
+        if not shard_dirs:
+            raise ValueError(
+                f'No shard of {batch_dir} has an {incomplete_file_name}'
+                f' file. Please make sure that the directory is a batch'
+                f' that has HITs waiting for review.')
+    else:
+        shard_dirs = [batch_dir]
 
     logger.info(f'Reviewing batch {batch_id}.')
 
     marked_assignments = []
-    for hit_id in hit_ids:
-        marked_assignments.extend(review_hit(
-            client=client,
-            hit_id=hit_id,
-            approve_all=approve_all))
+    with utils.aio.AsyncClient(client, concurrency) as async_client:
+        for shard_dir in shard_dirs:
+            marked_assignments.extend(await _review_shard(
+                async_client=async_client,
+                batch_dir=shard_dir,
+                approve_all=approve_all))
 
     logger.info(
         'Finished reviewing assignments. Writing out marked'
@@ -215,3 +269,64 @@ def review_batch(
         ))
 
     logger.info(f'Review of batch {batch_id} is complete.')
+
+
+async def _review_shard(
+        async_client,
+        batch_dir,
+        approve_all):
+    """Review the HITs in a single, unsharded batch directory.
+
+    Return the marked assignments.
+    """
+    incomplete_file_name = settings.INCOMPLETE_FILE_NAME
+
+    incomplete_file_path = os.path.join(
+        batch_dir, settings.INCOMPLETE_FILE_NAME)
+
+    if not os.path.isfile(incomplete_file_path):
+        raise ValueError(
+            f'No {incomplete_file_name} file was found in {batch_dir}.'
+            f' Please make sure that the directory is a batch that has'
+            f' HITs waiting for review.')
+    with open(incomplete_file_path) as incomplete_file:
+        hit_ids = json.load(incomplete_file)['hit_ids']
+
+    # only reviewable HITs are reviewed, so skip the HITs whose cached
+    # status is terminal but not reviewable (i.e., disposed of).
+    skipped_hit_statuses = {
+        hit_id: hit_status
+        for hit_id, hit_status in utils.cache.get_cached_statuses(
+            batch_dir=batch_dir,
+            hit_ids=hit_ids).items()
+        if hit_status != 'Reviewable'
+    }
+    skipped_hit_ids = set(skipped_hit_statuses)
+    skipped_status_counts = collections.Counter(
+        skipped_hit_statuses.values())
+    for hit_status, hit_count in sorted(skipped_status_counts.items()):
+        logger.info(
+            f'Skipping {hit_count} HITs with status "{hit_status}".')
+
+    # review_hit prompts on the terminal when not approving all, so it
+    # runs on the client's thread pool, which then holds a single thread.
+    async def review(hit_id):
+        return await async_client.call(
+            review_hit,
+            client=async_client.client,
+            hit_id=hit_id,
+            approve_all=approve_all)
+
+    marked_assignments = []
+    reviewed_hits = utils.aio.map_bounded(
+        fn=review,
+        iterable=(
+            hit_id
+            for hit_id in hit_ids
+            if hit_id not in skipped_hit_ids
+        ),
+        max_pending=2 * async_client.concurrency)
+    async for hit_marked_assignments in reviewed_hits:
+        marked_assignments.extend(hit_marked_assignments)
+
+    return marked_assignments
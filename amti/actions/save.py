@@ -1,10 +1,13 @@
 """Functions for saving HITs to storage"""
 
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
 import json
 import logging
 import os
 import shutil
-import tempfile
 
 from amti import settings
 from amti import utils
@@ -13,13 +16,128 @@ from amti import utils
 logger = logging.getLogger(__name__)
 
 
+def _read_save_journal(journal_path):
+    """Return the IDs of the HITs recorded in a save journal.
+
+    Parameters
+    ----------
+    journal_path : str
+        the path to the save journal.
+
+    Returns
+    -------
+    Set[str]
+        the IDs of the HITs that have been saved. Empty if the journal
+        doesn't exist.
+    """
+    saved_hit_ids = set()
+
+    if not os.path.isfile(journal_path):
+        return saved_hit_ids
+
+    with open(journal_path, 'r') as journal_file:
+        for i, ln in enumerate(journal_file):
+            try:
+                entry = json.loads(ln)
+            except ValueError:
+                # the process may have died midway through writing the
+                # last entry, in which case that HIT is saved again.
+                logger.warning(
+                    f'Line {i+1} in {journal_path} is corrupt. Skipping.')
+                continue
+
+            saved_hit_ids.add(entry['hit_id'])
+
+    return saved_hit_ids
+
+
+def _write_hit_dir(staging_dir, hit_dir, hit, assignments):
+    """Write a HIT and its assignments, then move them to ``hit_dir``.
+
+    The HIT is written to ``staging_dir`` first, so ``hit_dir`` only
+    ever holds complete results.
+    """
+    utils.results.write_hit_dir(
+        hit_dir=staging_dir,
+        hit=hit,
+        assignments=assignments)
+
+    # a previous run may have died after moving the HIT into place but
+    # before journaling it, in which case it's replaced.
+    if os.path.isdir(hit_dir):
+        shutil.rmtree(hit_dir)
+    os.rename(staging_dir, hit_dir)
+
+
 def save_batch(
         client,
-        batch_dir):
+        batch_dir,
+        jobs=1,
+        write_jobs=None,
+        layout=None):
     """Save results from turkers working a batch to disk.
 
-    In order to save the results from a batch to disk, every HIT in the
-    batch must be in a reviewable state.
+    Saving is incremental: each HIT is saved as soon as it's reviewable
+    and all of its assignments have been approved or rejected, while
+    HITs that aren't ready yet are skipped. Saved HITs are recorded in a
+    journal in the batch directory and aren't fetched again, so the
+    batch can be saved repeatedly as HITs are reviewed, with each run
+    only doing work for the HITs still outstanding. Once every HIT is
+    saved, the batch is marked complete by removing its
+    ``settings.INCOMPLETE_FILE_NAME`` file. If the batch is sharded,
+    each shard that hasn't been saved yet is saved in turn. A HIT that
+    was disposed before being saved can never be saved, so it raises a
+    ``ValueError``.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    batch_dir : str
+        the path to the batch's directory.
+    jobs : int
+        the number of HITs to fetch concurrently. Defaults to ``1``.
+    write_jobs : Optional[int]
+        the number of threads writing fetched HITs to disk, or ``None``
+        to use ``settings.SAVE_WRITE_JOBS``. Defaults to ``None``.
+    layout : Optional[str]
+        the layout in which to save the results (see
+        ``settings.RESULTS_LAYOUTS``), or ``None`` to use the layout of
+        the results saved so far, if any, and otherwise
+        ``settings.RESULTS_LAYOUT``. Defaults to ``None``.
+
+    Returns
+    -------
+    Dict[str, Any]
+        A dictionary of the form::
+
+            {
+                'batch_id': batch_id,
+                'saved_count': saved_count,
+                'unsaved_hit_ids': unsaved_hit_ids
+            }
+
+        where ``batch_id`` is the UUID for the batch, ``saved_count`` is
+        the number of HITs saved by this call and ``unsaved_hit_ids``
+        lists the HITs that weren't ready to be saved.
+    """
+    return utils.aio.run(save_batch_async(
+        client=client,
+        batch_dir=batch_dir,
+        concurrency=jobs,
+        write_jobs=write_jobs,
+        layout=layout))
+
+
+async def save_batch_async(
+        client,
+        batch_dir,
+        concurrency=1,
+        write_jobs=None,
+        layout=None):
+    """Save results from turkers working a batch to disk asynchronously.
+
+    See ``save_batch`` for details.
 
     Parameters
     ----------
@@ -27,29 +145,83 @@ def save_batch(
         a boto3 client for MTurk.
     batch_dir : str
         the path to the batch's directory.
+    concurrency : int
+        the number of HITs to fetch concurrently. Defaults to ``1``.
+    write_jobs : Optional[int]
+        the number of threads writing fetched HITs to disk, or ``None``
+        to use ``settings.SAVE_WRITE_JOBS``. Defaults to ``None``.
+    layout : Optional[str]
+        the layout in which to save the results (see
+        ``settings.RESULTS_LAYOUTS``), or ``None`` to use the layout of
+        the results saved so far, if any, and otherwise
+        ``settings.RESULTS_LAYOUT``. Defaults to ``None``.
 
     Returns
     -------
-    None.
+    Dict[str, Any]
+        See ``save_batch``.
     """
+    if write_jobs is None:
+        write_jobs = settings.SAVE_WRITE_JOBS
+    if write_jobs < 1:
+        raise ValueError('write_jobs must be at least 1.')
+    if layout is not None and layout not in settings.RESULTS_LAYOUTS:
+        raise ValueError(
+            'layout must be one of {layouts}.'.format(
+                layouts=', '.join(settings.RESULTS_LAYOUTS)))
+
     # construct important paths
     batch_dir_name, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
     batchid_file_name, _ = batch_dir_subpaths['batchid']
     results_dir_name, results_dir_subpaths = batch_dir_subpaths['results']
-    hit_dir_name, hit_dir_subpaths = results_dir_subpaths['hit_dir']
-    hit_file_name, _ = hit_dir_subpaths['hit']
-    assignments_file_name, _ = hit_dir_subpaths['assignments']
+    hit_dir_name, _ = results_dir_subpaths['hit_dir']
     incomplete_file_name = settings.INCOMPLETE_FILE_NAME
 
     batchid_file_path = os.path.join(
         batch_dir, batchid_file_name)
     incomplete_file_path = os.path.join(
         batch_dir, settings.INCOMPLETE_FILE_NAME)
+    journal_path = os.path.join(
+        batch_dir, settings.SAVE_JOURNAL_FILE_NAME)
+    staging_root_dir = os.path.join(
+        batch_dir, settings.SAVE_STAGING_DIR_NAME)
     results_dir = os.path.join(batch_dir, results_dir_name)
 
     with open(batchid_file_path) as batchid_file:
         batch_id = batchid_file.read().strip()
 
+    if utils.batch.is_sharded(batch_dir):
+        shard_dirs = utils.batch.get_incomplete_shard_dirs(batch_dir)
+        if not shard_dirs:
+            raise ValueError(
+                f'No shard of {batch_dir} has an {incomplete_file_name}'
+                f' file. Please make sure that the directory is a batch'
+                f' that has HITs waiting for review.')
+
+        logger.info(
+            f'Saving {len(shard_dirs)} shards of batch {batch_id}.')
+
+        saved_count = 0
+        unsaved_hit_ids = []
+        for shard_dir in shard_dirs:
+            shard_save = await save_batch_async(
+                client=client,
+                batch_dir=shard_dir,
+                concurrency=concurrency,
+                write_jobs=write_jobs,
+                layout=layout)
+            saved_count += shard_save['saved_count']
+            unsaved_hit_ids.extend(shard_save['unsaved_hit_ids'])
+
+        if not unsaved_hit_ids:
+            logger.info(f'Saving batch {batch_id} is complete.')
+
+        return {
+            'batch_id': batch_id,
+            'saved_count': saved_count,
+            'unsaved_hit_ids': unsaved_hit_ids
+        }
+
     if not os.path.isfile(incomplete_file_path):
         raise ValueError(
             f'No {incomplete_file_name} file was found in {batch_dir}.'
@@ -58,71 +230,216 @@ def save_batch(
     with open(incomplete_file_path) as incomplete_file:
         hit_ids = json.load(incomplete_file)['hit_ids']
 
-    logger.info(f'Retrieving HIT data for batch {batch_id}.')
-    # construct the results in a temporary directory. Using a temporary
-    # directory allows us to eagerly construct the results directory
-    # without worrying about clean up in the event of an error
-    # condition.
-    with tempfile.TemporaryDirectory() as working_dir:
-        for hit_id in hit_ids:
-            hit_dir = os.path.join(
-                working_dir,
-                hit_dir_name.format(hit_id=hit_id))
-            os.mkdir(hit_dir)
-
-            hit_file_path = os.path.join(hit_dir, hit_file_name)
-            assignments_file_path = os.path.join(
-                hit_dir, assignments_file_name)
+    saved_hit_ids = _read_save_journal(journal_path)
+    if saved_hit_ids:
+        logger.info(
+            f'Resuming save of batch {batch_id}. {len(saved_hit_ids)} HITs'
+            f' were already saved.')
 
-            logger.debug(f'Fetching HIT (ID: {hit_id}).')
-            hit = client.get_hit(HITId=hit_id)
+    # skip HITs known not to be reviewable without fetching them.
+    unsaved_hit_ids = []
+    cached_statuses = utils.cache.get_cached_statuses(
+        batch_dir=batch_dir,
+        hit_ids=hit_ids)
+
+    # a disposed HIT's results are gone, so it can never be saved.
+    disposed_hit_ids = [
+        hit_id
+        for hit_id, hit_status in cached_statuses.items()
+        if hit_id not in saved_hit_ids and hit_status == 'Disposed'
+    ]
+    if disposed_hit_ids:
+        raise ValueError(
+            f'{len(disposed_hit_ids)} HITs in {batch_dir} have status'
+            f' "Disposed", so their results can no longer be saved (for'
+            f' example, HIT {disposed_hit_ids[0]}).')
+
+    for hit_id, hit_status in cached_statuses.items():
+        if hit_id not in saved_hit_ids and hit_status != 'Reviewable':
+            logger.debug(
+                f'Skipping HIT (ID: {hit_id}) with status'
+                f' "{hit_status}".')
+            unsaved_hit_ids.append(hit_id)
+
+    pending_hit_ids = [
+        hit_id
+        for hit_id in hit_ids
+        if hit_id not in saved_hit_ids
+        and cached_statuses.get(hit_id, 'Reviewable') == 'Reviewable'
+    ]
+
+    # an interrupted conversion can leave the saved results outside of
+    # the results directory.
+    utils.results.recover_results_dir(
+        results_dir=results_dir,
+        staging_dir=os.path.join(
+            batch_dir, settings.CONVERT_STAGING_DIR_NAME))
+
+    # results already saved by an earlier run fix the layout.
+    results_layout = utils.results.get_results_layout(results_dir)
+    if results_layout is None:
+        results_layout = layout or settings.RESULTS_LAYOUT
+    elif layout is not None and layout != results_layout:
+        raise ValueError(
+            f'The results in {results_dir} are saved as {results_layout},'
+            f' not {layout}. Please convert them with convert-results'
+            f' before saving the rest of the batch as {layout}.')
+
+    logger.info(
+        f'Retrieving HIT data for {len(pending_hit_ids)} HITs in batch'
+        f' {batch_id}.')
 
-            logger.debug(f'Writing HIT (ID: {hit_id}) to {hit_file_path}.')
-            with open(hit_file_path, 'w') as hit_file:
-                json.dump(
-                    hit,
-                    hit_file, default=utils.serialization.json_helper)
+    # in the directories layout, each HIT is written to a staging
+    # directory and then renamed into the results directory, so the
+    # results directory only ever holds complete HITs. Staged HITs left
+    # behind by an earlier run that died were never journaled, so
+    # they're discarded. In the segments layout, HITs are appended to a
+    # new segment and only count once they're indexed.
+    shutil.rmtree(staging_root_dir, ignore_errors=True)
+    if results_layout == 'directories':
+        os.makedirs(staging_root_dir)
+        os.makedirs(results_dir, exist_ok=True)
+
+    saved_count = 0
+    # the form fields found in the saved assignments, in the order they
+    # were first seen, and the number of HITs they account for.
+    field_names = {}
+    schema_hit_count = 0
+    loop = asyncio.get_event_loop()
+    with open(journal_path, 'a+') as journal_file, \
+            contextlib.ExitStack() as exit_stack, \
+            utils.aio.AsyncClient(client, concurrency) as async_client, \
+            concurrent.futures.ThreadPoolExecutor(
+                max_workers=write_jobs) as writer:
+        if results_layout == 'segments':
+            segment_writer = exit_stack.enter_context(
+                utils.results.SegmentWriter(results_dir))
+
+        # if the process died midway through writing an entry, start the
+        # new entries on a fresh line.
+        if journal_file.tell() > 0:
+            journal_file.seek(journal_file.tell() - 1)
+            if journal_file.read(1) != '\n':
+                journal_file.write('\n')
+
+        async def save_hit(hit_id):
+            logger.debug(f'Fetching HIT (ID: {hit_id}).')
+            hit = await async_client.get_hit(HITId=hit_id)
 
             hit_status = hit['HIT']['HITStatus']
-            if hit_status != 'Reviewable':
+            if hit_status == 'Disposed':
                 raise ValueError(
-                    f'HIT (ID: {hit_id}) has status "{hit_status}".'
-                    f' In order to save a batch all HITs must have'
-                    f' "Reviewable" status.')
+                    f'HIT (ID: {hit_id}) has status "Disposed", so its'
+                    f' results can no longer be saved.')
+            if hit_status != 'Reviewable':
+                logger.debug(
+                    f'Skipping HIT (ID: {hit_id}) with status'
+                    f' "{hit_status}".')
+                return hit_id, False, None
 
             logger.debug(f'Fetching assignments for HIT (ID: {hit_id}).')
-            assignments_paginator = client.get_paginator(
-                'list_assignments_for_hit')
-            assignments_pages = assignments_paginator.paginate(HITId=hit_id)
-            with open(assignments_file_path, 'w') as assignments_file:
-                for i, assignments_page in enumerate(assignments_pages):
-                    logger.debug(f'Saving assignments. Page {i}.')
-                    for assignment in assignments_page['Assignments']:
-                        assignment_id = assignment['AssignmentId']
-                        assignment_status = assignment['AssignmentStatus']
-
-                        logger.debug(
-                            f'Assignment (ID: {assignment_id}) Status:'
-                            f' {assignment_status}.')
-
-                        if assignment_status not in ['Approved', 'Rejected']:
-                            raise ValueError(
-                                f'Assignment (ID: {assignment_id}) has status'
-                                f' "{assignment_status}". In order to save a'
-                                f' batch all assignments must have "Approved"'
-                                f' or "Rejected" status.')
-
-                        assignments_file.write(
-                            json.dumps(
-                                assignment,
-                                default=utils.serialization.json_helper
-                            ) + '\n')
+            assignments_pages = await async_client.paginate(
+                'list_assignments_for_hit', HITId=hit_id)
+            assignments = [
+                assignment
+                for assignments_page in assignments_pages
+                for assignment in assignments_page['Assignments']
+            ]
+
+            for assignment in assignments:
+                assignment_id = assignment['AssignmentId']
+                assignment_status = assignment['AssignmentStatus']
+
+                logger.debug(
+                    f'Assignment (ID: {assignment_id}) Status:'
+                    f' {assignment_status}.')
+
+                if assignment_status not in ['Approved', 'Rejected']:
+                    logger.debug(
+                        f'Skipping HIT (ID: {hit_id}) with assignment'
+                        f' (ID: {assignment_id}) in status'
+                        f' "{assignment_status}".')
+                    return hit_id, False, None
+
+            # serialize the HIT on the writer pool, so that disk writes
+            # overlap with fetching the next HITs rather than blocking
+            # the event loop.
+            if results_layout == 'directories':
+                hit_dir_base_name = hit_dir_name.format(hit_id=hit_id)
+                write = functools.partial(
+                    _write_hit_dir,
+                    staging_dir=os.path.join(
+                        staging_root_dir, hit_dir_base_name),
+                    hit_dir=os.path.join(results_dir, hit_dir_base_name),
+                    hit=hit,
+                    assignments=assignments)
+            else:
+                write = functools.partial(
+                    segment_writer.write,
+                    hit=hit,
+                    assignments=assignments)
+            await loop.run_in_executor(writer, write)
+
+            # journal the HIT as soon as it's in place, so that it isn't
+            # fetched again even if the process dies.
+            journal_file.write(json.dumps({'hit_id': hit_id}) + '\n')
+            journal_file.flush()
 
             logger.info(f'Finished saving HIT (ID: {hit_id}).')
 
-        shutil.copytree(working_dir, results_dir)
+            # record the form fields of the assignments in the batch's
+            # schema. A HIT with an unparseable answer is left out, so
+            # that extraction doesn't trust the schema.
+            try:
+                hit_field_names = [
+                    field_name
+                    for assignment in assignments
+                    for field_name in utils.answers.get_question_identifiers(
+                        assignment['Answer'])
+                ]
+            except ValueError:
+                logger.warning(
+                    f'Failed to parse the answers to HIT (ID: {hit_id}).')
+                hit_field_names = None
+
+            return hit_id, True, hit_field_names
+
+        # HITs are written to their own directories, so they can be
+        # saved in whatever order they're fetched.
+        saved_hits = utils.aio.map_bounded(
+            fn=save_hit,
+            iterable=pending_hit_ids,
+            max_pending=2 * concurrency + write_jobs,
+            ordered=False)
+        async for hit_id, saved, hit_field_names in saved_hits:
+            if not saved:
+                unsaved_hit_ids.append(hit_id)
+                continue
+
+            saved_count += 1
+            if hit_field_names is not None:
+                schema_hit_count += 1
+                field_names.update(dict.fromkeys(hit_field_names))
+
+    shutil.rmtree(staging_root_dir, ignore_errors=True)
+
+    utils.results.update_schema(
+        batch_dir=batch_dir,
+        field_names=list(field_names),
+        hit_count=schema_hit_count)
+
+    if unsaved_hit_ids:
+        logger.info(
+            f'Saved {saved_count} HITs from batch {batch_id}.'
+            f' {len(unsaved_hit_ids)} HITs aren\'t ready to be saved yet.')
+    else:
+        # remove the incomplete file since the batch is now complete
+        os.remove(incomplete_file_path)
 
-    # remove the incomplete file since the batch is now complete
-    os.remove(incomplete_file_path)
+        logger.info(f'Saving batch {batch_id} is complete.')
 
-    logger.info(f'Saving batch {batch_id} is complete.')
+    return {
+        'batch_id': batch_id,
+        'saved_count': saved_count,
+        'unsaved_hit_ids': unsaved_hit_ids
+    }
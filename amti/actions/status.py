@@ -4,24 +4,114 @@ import collections
 import json
 import logging
 import os
+import time
 
 from amti import settings
+from amti import utils
 
 
 logger = logging.getLogger(__name__)
 
 
+async def _list_hit_statuses(async_client, batch_id, hittype_id, hit_ids):
+    """Return the statuses of the HITs in ``hit_ids`` found by listing.
+
+    Reviewable and reviewing HITs are listed by their HIT Type, then the
+    account's HITs are listed until every HIT in ``hit_ids`` has been
+    seen. Listed HITs are matched to the batch locally, using their HIT
+    Type and the ``batch=<batch_id>`` requester annotation set when the
+    batch was uploaded.
+
+    Parameters
+    ----------
+    async_client : amti.utils.aio.AsyncClient
+        the client with which to list the HITs.
+    batch_id : str
+        the ID of the batch.
+    hittype_id : Optional[str]
+        the ID of the batch's HIT Type, or ``None`` if it's unknown.
+    hit_ids : List[str]
+        the IDs of the HITs in the batch.
+
+    Returns
+    -------
+    Dict[str, str]
+        a dictionary mapping HIT IDs to statuses, for the HITs in
+        ``hit_ids`` that were listed.
+    """
+    requester_annotation = f'batch={batch_id}'
+    unlisted_hit_ids = set(hit_ids)
+    hit_statuses = {}
+
+    async def list_hits(operation_name, **kwargs):
+        pages = async_client.iter_pages(
+            operation_name,
+            PaginationConfig={'PageSize': settings.LIST_PAGE_SIZE},
+            **kwargs)
+        async for page in pages:
+            for hit in page['HITs']:
+                if hittype_id is not None \
+                   and hit['HITTypeId'] != hittype_id:
+                    continue
+                if hit.get('RequesterAnnotation') != requester_annotation:
+                    continue
+                if hit['HITId'] not in unlisted_hit_ids:
+                    continue
+
+                unlisted_hit_ids.remove(hit['HITId'])
+                hit_statuses[hit['HITId']] = hit['HITStatus']
+            if not unlisted_hit_ids:
+                # stop early rather than listing the rest of the account
+                await pages.aclose()
+                return
+
+    if hittype_id is not None:
+        for status in ['Reviewable', 'Reviewing']:
+            if unlisted_hit_ids:
+                await list_hits(
+                    'list_reviewable_hits',
+                    HITTypeId=hittype_id,
+                    Status=status)
+    if unlisted_hit_ids:
+        await list_hits('list_hits')
+
+    return hit_statuses
+
+
 def status_batch(
         client,
-        batch_dir):
+        batch_dir,
+        jobs=1,
+        bulk=False,
+        max_age=None,
+        refresh=False):
     """Retrieve the status for a batch of HITs.
 
+    Statuses are cached in the batch directory (see
+    ``amti.utils.cache``), and only HITs without a fresh cached status
+    are retrieved from MTurk.
+
     Parameters
     ----------
     client : MTurk.Client
         a boto3 client for MTurk.
     batch_dir : str
         the path to the directory for the batch.
+    jobs : int
+        the number of HITs to retrieve concurrently. Defaults to ``1``.
+    bulk : bool
+        if ``True``, retrieve statuses by listing HITs a page at a time
+        and only retrieve HITs one at a time when they aren't listed.
+        Listing pages through every HIT on the account, so this mode
+        is fastest when the account holds few HITs outside the batch.
+        Defaults to ``False``.
+    max_age : Optional[float]
+        the age, in seconds, below which cached statuses that aren't
+        terminal are used rather than retrieved again, or ``None`` to
+        use ``settings.STATUS_CACHE_TTL``. Defaults to ``None``.
+    refresh : bool
+        if ``True``, retrieve every HIT's status, ignoring the cache.
+        Defaults to ``False``.
 
     Returns
     -------
@@ -38,7 +128,51 @@ def status_batch(
         where ``batch_id`` is the UUID for the batch, ``hit_count`` is a
         count of all the HITs in the batch and ``hit_status_counts`` is
         a dictionary counting the number of HITs with each of the
-        different statuses.
+        different statuses. For a sharded batch, the counts cover every
+        shard that hasn't been saved yet.
+    """
+    return utils.aio.run(status_batch_async(
+        client=client,
+        batch_dir=batch_dir,
+        concurrency=jobs,
+        bulk=bulk,
+        max_age=max_age,
+        refresh=refresh))
+
+
+async def status_batch_async(
+        client,
+        batch_dir,
+        concurrency=1,
+        bulk=False,
+        max_age=None,
+        refresh=False):
+    """Retrieve the status for a batch of HITs asynchronously.
+
+    See ``status_batch`` for details.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    batch_dir : str
+        the path to the directory for the batch.
+    concurrency : int
+        the number of HITs to retrieve concurrently. Defaults to ``1``.
+    bulk : bool
+        if ``True``, retrieve statuses by listing HITs. Defaults to
+        ``False``.
+    max_age : Optional[float]
+        the age, in seconds, below which cached statuses that aren't
+        terminal are used, or ``None`` to use
+        ``settings.STATUS_CACHE_TTL``. Defaults to ``None``.
+    refresh : bool
+        if ``True``, ignore cached statuses. Defaults to ``False``.
+
+    Returns
+    -------
+    Dict[str, int]
+        the batch's status, as returned by ``status_batch``.
     """
     # construct important paths
     batch_dir_name, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
@@ -53,22 +187,105 @@ def status_batch(
     with open(batchid_file_path) as batchid_file:
         batch_id = batchid_file.read().strip()
 
+    if utils.batch.is_sharded(batch_dir):
+        shard_dirs = utils.batch.get_incomplete_shard_dirs(batch_dir)
+        if not shard_dirs:
+            raise ValueError(
+                f'No shard of {batch_dir} has an {incomplete_file_name}'
+                f' file. Please make sure that the directory is a batch'
+                f' that has HITs waiting for review.')
+
+        logger.info(
+            f'Retrieving status for {len(shard_dirs)} shards of batch'
+            f' {batch_id}.')
+
+        hit_count = 0
+        hit_status_counts = collections.defaultdict(int)
+        for shard_dir in shard_dirs:
+            shard_status = await status_batch_async(
+                client=client,
+                batch_dir=shard_dir,
+                concurrency=concurrency,
+                bulk=bulk,
+                max_age=max_age,
+                refresh=refresh)
+            hit_count += shard_status['hit_count']
+            for status, count in shard_status['hit_status_counts'].items():
+                hit_status_counts[status] += count
+
+        return {
+            'batch_id': batch_id,
+            'hit_count': hit_count,
+            'hit_status_counts': hit_status_counts
+        }
+
     if not os.path.isfile(incomplete_file_path):
         raise ValueError(
             f'No {incomplete_file_name} file was found in {batch_dir}.'
             f' Please make sure that the directory is a batch that has'
             f' HITs waiting for review.')
     with open(incomplete_file_path) as incomplete_file:
-        hit_ids = json.load(incomplete_file)['hit_ids']
+        ids = json.load(incomplete_file)
+    hit_ids = ids['hit_ids']
 
     logger.info(f'Retrieving status for batch {batch_id}.')
 
-    hit_count = 0
+    if max_age is None:
+        max_age = settings.STATUS_CACHE_TTL
+
+    hit_statuses = {}
+    if not refresh:
+        hit_statuses.update(utils.cache.get_cached_statuses(
+            batch_dir=batch_dir,
+            hit_ids=hit_ids,
+            max_age=max_age))
+        logger.debug(
+            f'Using cached statuses for {len(hit_statuses)} of'
+            f' {len(hit_ids)} HITs in batch {batch_id}.')
+
+    uncached_hit_ids = [
+        hit_id
+        for hit_id in hit_ids
+        if hit_id not in hit_statuses
+    ]
+    fetched_at = time.time()
+    fetched_hit_statuses = {}
+    with utils.aio.AsyncClient(client, concurrency) as async_client:
+        if bulk and uncached_hit_ids:
+            fetched_hit_statuses.update(await _list_hit_statuses(
+                async_client=async_client,
+                batch_id=batch_id,
+                hittype_id=ids.get('hittype_id'),
+                hit_ids=uncached_hit_ids))
+            logger.debug(
+                f'Listed {len(fetched_hit_statuses)} of'
+                f' {len(uncached_hit_ids)} HITs in batch {batch_id}.')
+
+        async def get_hit_status(hit_id):
+            hit = await async_client.get_hit(HITId=hit_id)
+            return hit_id, hit['HIT']['HITStatus']
+
+        got_hit_statuses = utils.aio.map_bounded(
+            fn=get_hit_status,
+            iterable=(
+                hit_id
+                for hit_id in uncached_hit_ids
+                if hit_id not in fetched_hit_statuses
+            ),
+            max_pending=2 * concurrency)
+        async for hit_id, hit_status in got_hit_statuses:
+            fetched_hit_statuses[hit_id] = hit_status
+
+    utils.cache.update_status_cache(
+        batch_dir=batch_dir,
+        hit_statuses=fetched_hit_statuses,
+        fetched_at=fetched_at)
+    hit_statuses.update(fetched_hit_statuses)
+
+    hit_count = len(hit_statuses)
     hit_status_counts = collections.defaultdict(int)
-    for hit_id in hit_ids:
-        hit = client.get_hit(HITId=hit_id)
-        hit_count += 1
-        hit_status_counts[hit['HIT']['HITStatus']] += 1
+    for hit_status in hit_statuses.values():
+        hit_status_counts[hit_status] += 1
 
     logger.info(f'Retrieving status of batch {batch_id} is complete.')
 
@@ -77,3 +294,107 @@ def status_batch(
         'hit_count': hit_count,
         'hit_status_counts': hit_status_counts
     }
+
+
+def _next_poll_interval(
+        interval,
+        changed,
+        remaining_fraction,
+        min_interval,
+        max_interval):
+    """Return how long to wait before polling a batch's status again.
+
+    Back off while nothing changes and speed up when HITs move, and
+    never wait longer than the fraction of HITs remaining allows, so
+    that polling tightens as the batch nears completion.
+    """
+    if changed:
+        interval = interval / settings.WATCH_BACKOFF_FACTOR
+    else:
+        interval = interval * settings.WATCH_BACKOFF_FACTOR
+
+    interval = min(interval, max_interval * remaining_fraction)
+
+    return min(max(interval, min_interval), max_interval)
+
+
+def watch_batch(
+        client,
+        batch_dir,
+        jobs=1,
+        bulk=False,
+        min_interval=None,
+        max_interval=None):
+    """Poll the status of a batch until no HIT's status can change.
+
+    Polling stops once every HIT has a status in
+    ``settings.TERMINAL_HIT_STATUSES``, that is once every HIT is
+    reviewable or disposed. The interval between polls adapts to the
+    batch: it grows while no HIT's status changes, shrinks when statuses
+    change and tightens as fewer HITs remain. Each poll only retrieves
+    the HITs that aren't yet in a terminal status (see
+    ``amti.utils.cache``).
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    batch_dir : str
+        the path to the directory for the batch.
+    jobs : int
+        the number of HITs to retrieve concurrently. Defaults to ``1``.
+    bulk : bool
+        if ``True``, retrieve statuses by listing HITs. See
+        ``status_batch``. Defaults to ``False``.
+    min_interval : Optional[float]
+        the shortest time to wait between polls, in seconds, or ``None``
+        to use ``settings.WATCH_MIN_INTERVAL``. Defaults to ``None``.
+    max_interval : Optional[float]
+        the longest time to wait between polls, in seconds, or ``None``
+        to use ``settings.WATCH_MAX_INTERVAL``. Defaults to ``None``.
+
+    Returns
+    -------
+    Iterator[Tuple[Dict[str, int], Optional[float]]]
+        for each poll, the batch's status (as returned by
+        ``status_batch``) and the number of seconds until the next
+        poll, or ``None`` once every HIT is reviewable or disposed.
+    """
+    if min_interval is None:
+        min_interval = settings.WATCH_MIN_INTERVAL
+    if max_interval is None:
+        max_interval = settings.WATCH_MAX_INTERVAL
+    if min_interval > max_interval:
+        raise ValueError('min_interval must be at most max_interval.')
+
+    interval = min_interval
+    last_hit_status_counts = None
+    while True:
+        batch_status = status_batch(
+            client=client,
+            batch_dir=batch_dir,
+            jobs=jobs,
+            bulk=bulk,
+            max_age=0.)
+
+        hit_count = batch_status['hit_count']
+        hit_status_counts = dict(batch_status['hit_status_counts'])
+        remaining_count = hit_count - sum(
+            hit_status_counts.get(status, 0)
+            for status in settings.TERMINAL_HIT_STATUSES)
+        if remaining_count == 0:
+            yield batch_status, None
+
+            return
+
+        interval = _next_poll_interval(
+            interval=interval,
+            changed=hit_status_counts != last_hit_status_counts,
+            remaining_fraction=remaining_count / hit_count,
+            min_interval=min_interval,
+            max_interval=max_interval)
+        last_hit_status_counts = hit_status_counts
+
+        yield batch_status, interval
+
+        time.sleep(interval)
@@ -1,18 +1,25 @@
 """CLIs for managing HITs and their results"""
 
-from amti.clis import (
-    associate,
-    block,
-    create,
-    delete,
-    disassociate,
-    expire,
-    extract,
-    extraction,
-    notify,
-    review,
-    save,
-    status,
-    unblock,
-    preview
-)
+from amti.utils.lazy import lazy_submodules
+
+
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'archive',
+    'associate',
+    'block',
+    'convert',
+    'create',
+    'delete',
+    'disassociate',
+    'expire',
+    'extract',
+    'extraction',
+    'ingest',
+    'local',
+    'notify',
+    'review',
+    'save',
+    'status',
+    'unblock',
+    'preview'
+])
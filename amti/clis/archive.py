@@ -0,0 +1,42 @@
+"""Command line interfaces for archiving batches"""
+
+import logging
+
+import click
+
+from amti import actions
+
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(
+    context_settings={
+        'help_option_names': ['--help', '-h']
+    })
+@click.argument(
+    'batch_dir',
+    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option(
+    '--output', '-o', 'archive_path',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    help='The path at which to write the archive. Defaults to BATCH_DIR'
+         ' with a .zip extension.')
+@click.option(
+    '--remove', '-r',
+    is_flag=True,
+    help='Remove BATCH_DIR once the archive has been written and checked.')
+def archive_batch(batch_dir, archive_path, remove):
+    """Pack the completed batch in BATCH_DIR into a compressed archive.
+
+    Given a directory (BATCH_DIR) that represents a batch of HITs that
+    have all been saved, write its definition, data and results to a
+    single compressed archive. The extract commands and delete-batch can
+    read the archive in place of BATCH_DIR.
+    """
+    archive_path = actions.archive.archive_batch(
+        batch_dir=batch_dir,
+        archive_path=archive_path,
+        remove=remove)
+
+    logger.info(f'Finished archiving batch to {archive_path}.')
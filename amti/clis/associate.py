@@ -52,7 +52,7 @@ def associate_qual(file, ids, qual, name, integer_value, notify, live):
 
     NOTE: Only works with quals that both exist and are owned by the user.
     """
-    env = 'live' if live else 'sandbox'
+    env = utils.mturk.get_env(live)
 
     client = utils.mturk.get_mturk_client(env)
 
@@ -39,7 +39,7 @@ def block_workers(file, ids, reason, live):
     Given a space seperated list of WorkerIds (IDS) and/or a path to
     a CSV of WorkerIds, create a block for each worker in the list.
     """
-    env = 'live' if live else 'sandbox'
+    env = utils.mturk.get_env(live)
 
     client = utils.mturk.get_mturk_client(env)
 
@@ -0,0 +1,39 @@
+"""Command line interfaces for converting the results of batches"""
+
+import logging
+
+import click
+
+from amti import actions
+from amti import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(
+    context_settings={
+        'help_option_names': ['--help', '-h']
+    })
+@click.argument(
+    'batch_dir',
+    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option(
+    '--layout',
+    type=click.Choice(settings.RESULTS_LAYOUTS),
+    default='segments',
+    help='The layout to convert the results to: a directory per HIT'
+         ' (directories) or a few append-only files with an index'
+         ' (segments). Defaults to segments.')
+def convert_results(batch_dir, layout):
+    """Convert the results saved in BATCH_DIR to another layout.
+
+    Given a directory (BATCH_DIR) that represents a batch of HITs with
+    results saved, rewrite the results in the given layout. Extraction,
+    deletion and further saving all work with either layout.
+    """
+    actions.convert.convert_batch(
+        batch_dir=batch_dir,
+        layout=layout)
+
+    logger.info('Finished converting results.')
@@ -12,28 +12,112 @@ from amti import utils
 logger = logging.getLogger(__name__)
 
 
+def _format_plan(batch_plan):
+    """Return a human readable report for ``batch_plan``."""
+    question_sizes = '\n    '.join(
+        f'{statistic}: {size:.0f}' if size is not None else f'{statistic}: -'
+        for statistic, size in batch_plan['question_sizes'].items())
+
+    problems = []
+    for key, title in [
+            ('invalid_rows', 'Invalid Rows'),
+            ('missing_variables', 'Rows Missing Template Variables'),
+            ('duplicate_rows', 'Duplicate Rows')]:
+        problem = batch_plan[key]
+        examples = []
+        for example in problem['examples']:
+            if 'error' in example:
+                detail = example['error']
+            elif 'variables' in example:
+                detail = ', '.join(example['variables'])
+            else:
+                detail = f'duplicates line {example["duplicate_of"]}'
+            examples.append(f'\n    line {example["line"]}: {detail}')
+        if problem['count'] > len(problem['examples']):
+            examples.append(
+                f'\n    ... and {problem["count"] - len(problem["examples"])}'
+                f' more.')
+        problems.append(
+            f'\n  {title}: {problem["count"]}' + ''.join(examples))
+
+    return (
+        f'\n'
+        f'  Batch Plan:'
+        f'\n  ==========='
+        f'\n  Row Count: {batch_plan["row_count"]}'
+        f'\n  Estimated Cost: ~{batch_plan["estimated_cost"]:.2f} USD'
+        f'\n  Question Sizes (bytes):'
+        f'\n    {question_sizes}'
+        + ''.join(problems) +
+        f'\n')
+
+
 @click.command(
     context_settings={
         'help_option_names': ['--help', '-h']
     })
 @click.argument(
     'definition_dir',
+    required=False,
     type=click.Path(exists=True, file_okay=False, dir_okay=True))
 @click.argument(
     'data_path',
+    required=False,
     type=click.Path(exists=True, file_okay=True, dir_okay=False))
 @click.argument(
     'save_dir',
+    required=False,
     type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option(
+    '--resume', '-r', 'resume_dir',
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    metavar='BATCH_DIR',
+    help='Resume uploading the batch in BATCH_DIR, creating only the HITs'
+         ' which have not been created yet.')
+@click.option(
+    '--plan', '-p',
+    is_flag=True,
+    help='Report on the batch (row count, cost, question sizes and any'
+         ' problems with the data) without creating or uploading it.')
 @click.option(
     '--check-cost/--no-check-cost', '-c/-n',
     default=True,
     help="Whether to prompt for cost approval before uploading the batch.")
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    default=1,
+    help='The number of HITs to create concurrently. Requests are made on'
+         ' threads, so at most'
+         f' {settings.AIO_MAX_THREADS} are in flight at once. Defaults'
+         ' to 1.')
+@click.option(
+    '--render-jobs',
+    type=click.IntRange(min=1),
+    default=1,
+    help='The number of processes with which to render the questions'
+         ' before uploading. Defaults to 1.')
+@click.option(
+    '--shard-size', '-s',
+    type=click.IntRange(min=1),
+    help='Split the batch into shards of at most this many HITs. Each'
+         ' shard is a batch directory of its own, nested in the batch'
+         ' directory.')
 @click.option(
     '--live', '-l',
     is_flag=True,
     help='Create HITs on the live MTurk site.')
-def create_batch(definition_dir, data_path, save_dir, check_cost, live):
+def create_batch(
+        definition_dir,
+        data_path,
+        save_dir,
+        resume_dir,
+        plan,
+        check_cost,
+        jobs,
+        render_jobs,
+        shard_size,
+        live):
     """Create a batch of HITs using DEFINITION_DIR and DATA_PATH.
 
     Create a batch of HITs using DEFINITION_DIR and DATA_PATH, and then
@@ -61,12 +145,74 @@ def create_batch(definition_dir, data_path, save_dir, check_cost, live):
 
     SAVE_DIR should be a path to a directory in which the batch's data
     will be saved.
+
+    Before any HITs are created, every question is rendered (using
+    --render-jobs processes) and checked for being well-formed XML
+    within MTurk's size limit. HITs are then uploaded with up to --jobs
+    requests in flight through one MTurk client. Since uploading is bound by
+    network latency, raising --jobs speeds up large batches until MTurk
+    begins throttling requests.
+
+    Very large batches can be split into shards with --shard-size. Each
+    shard is a complete batch directory with its own batch ID, and
+    commands given the (parent) batch directory act on all its shards.
+
+    To check a batch before creating it, pass --plan. Planning renders
+    every question (using --render-jobs processes) in a single pass over
+    DATA_PATH and reports the row count, estimated cost, distribution of
+    question sizes, rows that fail to render or are invalid, rows missing
+    template variables, and duplicate rows. Nothing is written or
+    uploaded.
+
+    If an upload is interrupted or some HITs fail to be created, pass
+    the batch directory to --resume (instead of DEFINITION_DIR,
+    DATA_PATH, and SAVE_DIR) to finish uploading it. Resuming never
+    creates duplicate HITs as long as it happens within 24 hours.
     """
-    env = 'live' if live else 'sandbox'
+    if resume_dir is not None:
+        if any(arg is not None for arg in [definition_dir, data_path, save_dir]):
+            raise click.UsageError(
+                'DEFINITION_DIR, DATA_PATH, and SAVE_DIR cannot be used'
+                ' with --resume.')
+    elif any(arg is None for arg in [definition_dir, data_path, save_dir]):
+        raise click.UsageError(
+            'DEFINITION_DIR, DATA_PATH, and SAVE_DIR are required unless'
+            ' resuming a batch with --resume.')
+
+    if plan:
+        if resume_dir is not None:
+            raise click.UsageError('--plan cannot be used with --resume.')
+
+        batch_plan = actions.create.plan_batch(
+            definition_dir=definition_dir,
+            data_path=data_path,
+            jobs=render_jobs)
+
+        click.echo(_format_plan(batch_plan))
+
+        return
+
+    env = utils.mturk.get_env(live)
 
     worker_url = settings.ENVS[env]['worker_url']
 
-    client = utils.mturk.get_mturk_client(env)
+    client = utils.mturk.get_mturk_client(env, concurrency=jobs)
+
+    if resume_dir is not None:
+        logger.info(f'Resuming upload of batch directory: {resume_dir}.')
+
+        actions.create.resume_batch(
+            client=client,
+            batch_dir=resume_dir,
+            jobs=jobs)
+
+        logger.info(
+            f'Finished resuming batch directory: {resume_dir}.'
+            f'\n'
+            f'\n    Preview HITs: {worker_url}'
+            f'\n')
+
+        return
 
     estimated_cost = actions.create.estimate_batch_cost(
         definition_dir, data_path)
@@ -86,7 +232,10 @@ def create_batch(definition_dir, data_path, save_dir, check_cost, live):
         client=client,
         definition_dir=definition_dir,
         data_path=data_path,
-        save_dir=save_dir)
+        save_dir=save_dir,
+        jobs=jobs,
+        render_jobs=render_jobs,
+        shard_size=shard_size)
 
     logger.info(
         f'Finished creating batch directory: {batch_dir}.'
@@ -131,7 +280,7 @@ def create_qualificationtype(definition_dir, save_dir, live):
     SAVE_DIR should be a path to a directory in which the qualification
     type's data will be saved.
     """
-    env = 'live' if live else 'sandbox'
+    env = utils.mturk.get_env(live)
 
     requester_url = settings.ENVS[env]['requester_url']
 
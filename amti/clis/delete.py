@@ -18,21 +18,32 @@ logger = logging.getLogger(__name__)
     })
 @click.argument(
     'batch_dir',
-    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+    type=click.Path(exists=True, file_okay=True, dir_okay=True))
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    default=1,
+    help='The number of HITs to delete concurrently. Requests are made on'
+         ' threads, so at most'
+         f' {settings.AIO_MAX_THREADS} are in flight at once. Defaults'
+         ' to 1.')
 @click.option(
     '--live', '-l',
     is_flag=True,
     help='Delete HITs from the live MTurk site.')
-def delete_batch(batch_dir, live):
+def delete_batch(batch_dir, jobs, live):
     """Delete the batch of HITs defined in BATCH_DIR.
 
-    Given a directory (BATCH_DIR) that represents a batch of HITs with
-    HITs, delete all the HITs from MTurk.
+    Given a directory or archive (BATCH_DIR) that represents a batch of
+    HITs with HITs, delete all the HITs from MTurk.
     """
-    env = 'live' if live else 'sandbox'
+    env = utils.mturk.get_env(live)
 
-    client = utils.mturk.get_mturk_client(env)
+    client = utils.mturk.get_mturk_client(env, concurrency=jobs)
 
-    actions.delete.delete_batch(client=client, batch_dir=batch_dir)
+    actions.delete.delete_batch(
+        client=client,
+        batch_dir=batch_dir,
+        jobs=jobs)
 
     logger.info('Finished deleting batch.')
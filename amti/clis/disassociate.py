@@ -48,7 +48,7 @@ def disassociate_qual(file, ids, qual, name, reason, live):
 
     NOTE: Only works with quals that both exist and are owned by the user.
     """
-    env = 'live' if live else 'sandbox'
+    env = utils.mturk.get_env(live)
 
     client = utils.mturk.get_mturk_client(env)
 
@@ -19,23 +19,32 @@ logger = logging.getLogger(__name__)
 @click.argument(
     'batch_dir',
     type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    default=1,
+    help='The number of HITs to expire concurrently. Requests are made on'
+         ' threads, so at most'
+         f' {settings.AIO_MAX_THREADS} are in flight at once. Defaults'
+         ' to 1.')
 @click.option(
     '--live', '-l',
     is_flag=True,
     help='Expire the HITs from the live MTurk site.')
-def expire_batch(batch_dir, live):
+def expire_batch(batch_dir, jobs, live):
     """Expire all the HITs defined in BATCH_DIR.
 
     Given a directory (BATCH_DIR) that represents a batch of HITs in MTurk,
     expire all the unanswered HITs.
     """
-    env = 'live' if live else 'sandbox'
+    env = utils.mturk.get_env(live)
 
-    client = utils.mturk.get_mturk_client(env)
+    client = utils.mturk.get_mturk_client(env, concurrency=jobs)
 
     batch_expire = actions.expire.expire_batch(
         client=client,
-        batch_dir=batch_dir)
+        batch_dir=batch_dir,
+        jobs=jobs)
 
     batch_id = batch_expire['batch_id']
 
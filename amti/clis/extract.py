@@ -4,14 +4,20 @@ import logging
 
 import click
 
-# import extraction directly to avoid a circular import
-from amti.clis import extraction
+from amti.utils import lazy
 
 
 logger = logging.getLogger(__name__)
 
 
 @click.group(
+    cls=lazy.LazyGroup,
+    lazy_subcommands={
+        # tabular
+        'tabular': 'amti.clis.extraction.tabular:tabular',
+        # xml
+        'xml': 'amti.clis.extraction.xml:xml'
+    },
     context_settings={
         'help_option_names': ['--help', '-h']
     })
@@ -24,16 +30,5 @@ def extract():
     pass
 
 
-subcommands = [
-    # tabular
-    extraction.tabular.tabular,
-    # xml
-    extraction.xml.xml
-]
-
-for subcommand in subcommands:
-    extract.add_command(subcommand)
-
-
 if __name__ == '__main__':
     extract()
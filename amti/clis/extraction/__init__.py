@@ -1,5 +1,9 @@
 """Commands for extracting batch data into various formats"""
 
-from amti.clis.extraction import (
-    tabular,
-    xml)
+from amti.utils.lazy import lazy_submodules
+
+
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'tabular',
+    'xml'
+])
@@ -0,0 +1,132 @@
+"""Command line interfaces for ingesting MTurk event notifications"""
+
+import contextlib
+import logging
+
+import click
+
+from amti import actions
+from amti import settings
+from amti import utils
+
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(
+    context_settings={
+        'help_option_names': ['--help', '-h']
+    })
+@click.argument(
+    'batch_dir',
+    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option(
+    '--webhook', '-w',
+    is_flag=True,
+    help='Receive notifications on a local HTTP webhook, for example one'
+         ' subscribed to the SNS topic MTurk sends notifications to.')
+@click.option(
+    '--host',
+    default='127.0.0.1',
+    help='The host on which the webhook listens. Defaults to 127.0.0.1.')
+@click.option(
+    '--port', '-p',
+    type=click.IntRange(min=0, max=65535),
+    default=settings.EVENTS_WEBHOOK_PORT,
+    help='The port on which the webhook listens. Defaults to'
+         f' {settings.EVENTS_WEBHOOK_PORT}.')
+@click.option(
+    '--queue-dir', '-q',
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    help='Read notifications from the JSON files in this directory,'
+         ' removing each file once it\'s ingested.')
+@click.option(
+    '--follow', '-f',
+    is_flag=True,
+    help='Keep waiting for new files in --queue-dir instead of stopping'
+         ' once it\'s empty.')
+@click.option(
+    '--until-complete/--forever',
+    default=True,
+    help='Whether to stop once every HIT in the batch is Reviewable.'
+         ' Defaults to stopping.')
+@click.option(
+    '--configure', '-c', 'destination',
+    help='Before ingesting, ask MTurk to send notifications for the'
+         ' batch\'s HIT Type to this destination: the ARN of an SNS topic'
+         ' or the URL of an SQS queue.')
+@click.option(
+    '--transport',
+    type=click.Choice(['SNS', 'SQS']),
+    default='SNS',
+    help='The transport for --configure. Defaults to SNS.')
+@click.option(
+    '--live', '-l',
+    is_flag=True,
+    help='Configure notifications on the live MTurk site.')
+def ingest_events(
+        batch_dir,
+        webhook,
+        host,
+        port,
+        queue_dir,
+        follow,
+        until_complete,
+        destination,
+        transport,
+        live):
+    """Ingest event notifications for the batch in BATCH_DIR.
+
+    Update the cached statuses of the batch's HITs from the event
+    notifications MTurk sends (such as HITReviewable), so that
+    status-batch, review-batch, save-batch and expire-batch don't have
+    to fetch them. Notifications are received either on a local webhook
+    (--webhook) or from a directory of JSON files (--queue-dir).
+    """
+    if webhook == (queue_dir is not None):
+        raise click.UsageError(
+            'Exactly one of --webhook or --queue-dir is required.')
+    if follow and queue_dir is None:
+        raise click.UsageError('--follow requires --queue-dir.')
+
+    if destination is not None:
+        env = utils.mturk.get_env(live)
+
+        client = utils.mturk.get_mturk_client(env)
+
+        actions.ingest.configure_notifications(
+            client=client,
+            batch_dir=batch_dir,
+            destination=destination,
+            transport=transport)
+
+    if webhook:
+        event_source = utils.events.webhook_events(host=host, port=port)
+    else:
+        event_source = utils.events.queue_dir_events(
+            queue_dir=queue_dir, follow=follow)
+
+    with contextlib.closing(event_source):
+        try:
+            batch_events = actions.ingest.ingest_events(
+                batch_dir=batch_dir,
+                event_source=event_source,
+                until_complete=until_complete)
+        except KeyboardInterrupt:
+            logger.info('Stopped ingesting events.')
+            return
+
+    hit_status_counts = '\n    '.join(
+        f'{status}: {count}'
+        for status, count in batch_events['hit_status_counts'].items())
+
+    click.echo(
+      f'\n'
+        f'  Ingested Events:'
+      f'\n  ================'
+      f'\n  Batch ID: {batch_events["batch_id"]}'
+      f'\n  Events: {batch_events["event_count"]}'
+      f'\n  Status Updates: {batch_events["update_count"]}'
+      f'\n  Known HIT Status Counts:'
+      f'\n    {hit_status_counts}'
+      f'\n')
@@ -0,0 +1,120 @@
+"""Command line interfaces for the local stand-in for MTurk"""
+
+import logging
+
+import click
+
+from amti import local
+from amti import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(
+    context_settings={
+        'help_option_names': ['--help', '-h']
+    })
+@click.option(
+    '--host',
+    default='127.0.0.1',
+    help='The host on which to listen. Defaults to 127.0.0.1.')
+@click.option(
+    '--port', '-p',
+    type=click.IntRange(min=0),
+    default=settings.LOCAL_SERVER_PORT,
+    help=f'The port on which to listen. Defaults to'
+         f' {settings.LOCAL_SERVER_PORT}.')
+@click.option(
+    '--latency',
+    type=click.FloatRange(min=0),
+    default=0.,
+    help='The number of seconds each request takes. Defaults to 0.')
+@click.option(
+    '--latency-jitter',
+    type=click.FloatRange(min=0),
+    default=0.,
+    help='The maximum number of seconds of random latency to add to each'
+         ' request. Defaults to 0.')
+@click.option(
+    '--max-rate',
+    type=click.FloatRange(min=0),
+    help='The number of requests per second to serve before throttling.'
+         ' By default, requests are never throttled.')
+@click.option(
+    '--failure-rate',
+    type=click.FloatRange(min=0, max=1),
+    default=0.,
+    help='The probability with which each request fails. Defaults to 0.')
+@click.option(
+    '--worker-delay',
+    type=click.FloatRange(min=0),
+    default=1.,
+    help='The number of seconds between simulated workers submitting'
+         ' assignments to each HIT. Defaults to 1.')
+@click.option(
+    '--worker-count',
+    type=click.IntRange(min=1),
+    default=20,
+    help='The number of simulated workers. Defaults to 20.')
+@click.option(
+    '--seed',
+    type=int,
+    help='The seed for the random number generator.')
+@click.option(
+    '--event-interval',
+    type=click.FloatRange(min=0.01),
+    default=1.,
+    help='The number of seconds between deliveries of event'
+         ' notifications to the destinations configured for HIT Types.'
+         ' Defaults to 1.')
+def serve_local(
+        host,
+        port,
+        latency,
+        latency_jitter,
+        max_rate,
+        failure_rate,
+        worker_delay,
+        worker_count,
+        seed,
+        event_interval):
+    """Serve a local stand-in for MTurk.
+
+    Serve an in-memory imitation of MTurk's requester API, with simulated
+    workers that submit answers to each HIT. To point other commands at
+    it, set the AMTI_ENV environment variable to "local" (and, if not
+    using the default host and port, AMTI_LOCAL_ENDPOINT_URL to the
+    server's URL).
+
+    Latency, throttling and failures can be injected in order to test or
+    benchmark amti offline. All state is lost when the server stops.
+
+    HIT Types configured to send event notifications have them posted to
+    their destination (an HTTP URL, or a directory to write them to),
+    for example to test "amti ingest-events".
+    """
+    local_mturk = local.backend.LocalMTurk(
+        latency=latency,
+        latency_jitter=latency_jitter,
+        max_rate=max_rate,
+        failure_rate=failure_rate,
+        worker_delay=worker_delay,
+        worker_count=worker_count,
+        seed=seed)
+
+    server = local.server.make_server(local_mturk, host=host, port=port)
+
+    event_poster = local.events.EventPoster(
+        local_mturk, interval=event_interval)
+    event_poster.start()
+
+    logger.info(f'Serving local MTurk at {server.url}.')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info('Shutting down the local MTurk server.')
+    finally:
+        event_poster.stop()
+        server.server_close()
@@ -45,7 +45,7 @@ def notify_workers(file, ids, subject, message, message_file, live):
     Given a space seperated list of WorkerIds (IDS), or a path to
     a CSV of WorkerIds, send a notification to each worker. 
     """
-    env = 'live' if live else 'sandbox'
+    env = utils.mturk.get_env(live)
 
     client = utils.mturk.get_mturk_client(env)
 
@@ -9,9 +9,9 @@ import re
 from xml.etree import ElementTree
 
 import click
-import jinja2
 
 from amti import settings
+from amti import utils
 
 
 logger = logging.getLogger(__name__)
@@ -44,7 +44,8 @@ class Server(server.HTTPServer):
 
             html_template_string = html_content.text
 
-            self.template = jinja2.Template(html_template_string)
+            self.template = utils.templates.get_template(
+                html_template_string)
 
         with open(self.data_path, 'r') as data_file:
             self.data = [json.loads(ln) for ln in data_file]
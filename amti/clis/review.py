@@ -2,7 +2,6 @@
 
 import logging
 
-import boto3
 import click
 
 from amti import actions
@@ -39,21 +38,33 @@ logger = logging.getLogger(__name__)
     default='-',
     help='The path to the file in which to save the marked assignments.'
          ' Defaults to STDOUT.')
-def review_batch(batch_dir, live, approve_all, mark_file_path):
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    default=1,
+    help='The number of HITs to review concurrently. Requires --approve-all'
+         ' when greater than 1. Requests are made on threads, so at most'
+         f' {settings.AIO_MAX_THREADS} are in flight at once. Defaults'
+         ' to 1.')
+def review_batch(batch_dir, live, approve_all, mark_file_path, jobs):
     """Review the batch of HITs defined in BATCH_DIR.
 
     Given a directory (BATCH_DIR) that represents a batch of HITs with
     HITs out in MTurk and waiting for review, manually review each of
     the ready HITs at the command line.
     """
-    env = 'live' if live else 'sandbox'
+    if jobs > 1 and not approve_all:
+        raise click.UsageError('--jobs greater than 1 requires --approve-all.')
+
+    env = utils.mturk.get_env(live)
 
-    client = utils.mturk.get_mturk_client(env)
+    client = utils.mturk.get_mturk_client(env, concurrency=jobs)
 
     actions.review.review_batch(
         client=client,
         batch_dir=batch_dir,
         approve_all=approve_all,
-        mark_file_path=mark_file_path)
+        mark_file_path=mark_file_path,
+        jobs=jobs)
 
     logger.info('Finished reviewing batch.')
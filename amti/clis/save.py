@@ -19,24 +19,57 @@ logger = logging.getLogger(__name__)
 @click.argument(
     'batch_dir',
     type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    default=1,
+    help='The number of HITs to save concurrently. Requests are made on'
+         ' threads, so at most'
+         f' {settings.AIO_MAX_THREADS} are in flight at once. Defaults'
+         ' to 1.')
+@click.option(
+    '--write-jobs',
+    type=click.IntRange(min=1),
+    default=settings.SAVE_WRITE_JOBS,
+    help='The number of threads writing HITs to disk. Defaults to'
+         f' {settings.SAVE_WRITE_JOBS}.')
+@click.option(
+    '--layout',
+    type=click.Choice(settings.RESULTS_LAYOUTS),
+    help='The layout in which to save the results: a directory per HIT'
+         ' (directories) or a few append-only files with an index'
+         ' (segments). Defaults to the layout of the results saved so'
+         f' far, or {settings.RESULTS_LAYOUT}.')
 @click.option(
     '--live', '-l',
     is_flag=True,
     help='Save HITs from the live MTurk site.')
-def save_batch(batch_dir, live):
+def save_batch(batch_dir, jobs, write_jobs, layout, live):
     """Save results from the batch of HITs defined in BATCH_DIR.
 
     Given a directory (BATCH_DIR) that represents a batch of HITs with
-    HITs out in MTurk, all of which have been reviewed and either
-    approved or rejected, collect the results and save them into
-    BATCH_DIR.
+    HITs out in MTurk, collect the results of each HIT that has been
+    reviewed, with all of its assignments either approved or rejected,
+    and save them into BATCH_DIR. HITs that aren't ready are skipped, and
+    HITs saved by earlier runs aren't fetched again, so save-batch can be
+    rerun as HITs are reviewed until the whole batch is saved.
     """
-    env = 'live' if live else 'sandbox'
+    env = utils.mturk.get_env(live)
 
-    client = utils.mturk.get_mturk_client(env)
+    client = utils.mturk.get_mturk_client(env, concurrency=jobs)
 
-    actions.save.save_batch(
+    batch_save = actions.save.save_batch(
         client=client,
-        batch_dir=batch_dir)
+        batch_dir=batch_dir,
+        jobs=jobs,
+        write_jobs=write_jobs,
+        layout=layout)
 
-    logger.info('Finished saving batch.')
+    unsaved_count = len(batch_save['unsaved_hit_ids'])
+    if unsaved_count:
+        logger.info(
+            f'Saved {batch_save["saved_count"]} HITs. {unsaved_count} HITs'
+            f' aren\'t ready to be saved yet; run save-batch again once'
+            f' they\'re reviewed.')
+    else:
+        logger.info('Finished saving batch.')
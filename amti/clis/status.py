@@ -1,6 +1,8 @@
 """Command line interfaces for viewing the statuses of HITs"""
 
 import logging
+import os
+import subprocess
 
 import click
 
@@ -12,6 +14,62 @@ from amti import utils
 logger = logging.getLogger(__name__)
 
 
+def _format_status(batch_status):
+    """Return a summary of ``batch_status`` for the terminal."""
+    batch_id = batch_status['batch_id']
+    hit_count = str(batch_status['hit_count'])
+    hit_status_counts = '\n    '.join(
+        f'{status}: {count}'
+        for status, count in batch_status['hit_status_counts'].items())
+
+    return (
+      f'\n'
+        f'  Batch Status:'
+      f'\n  ============='
+      f'\n  Batch ID: {batch_id}'
+      f'\n  HIT Count: {hit_count}'
+      f'\n  HIT Status Counts:'
+      f'\n    {hit_status_counts}'
+      f'\n')
+
+
+def _watch(client, batch_dir, jobs, bulk, min_interval, max_interval):
+    """Show the status of a batch, updated in place, until it's done."""
+    stdout = click.get_text_stream('stdout')
+    redraw = stdout.isatty()
+
+    # the status action logs every poll, which would break up the
+    # display, so only let it through when debugging.
+    status_logger = logging.getLogger(actions.status.__name__)
+    status_logger_level = status_logger.level
+    if not status_logger.isEnabledFor(logging.DEBUG):
+        status_logger.setLevel(logging.WARNING)
+
+    try:
+        line_count = 0
+        batch_statuses = actions.status.watch_batch(
+            client=client,
+            batch_dir=batch_dir,
+            jobs=jobs,
+            bulk=bulk,
+            min_interval=min_interval,
+            max_interval=max_interval)
+        for batch_status, interval in batch_statuses:
+            if interval is None:
+                footer = '  Every HIT is Reviewable or Disposed.'
+            else:
+                footer = \
+                    f'  Next poll in {interval:.0f}s. Press Ctrl+C to stop.'
+            output = _format_status(batch_status) + footer
+            if redraw and line_count > 0:
+                # move the cursor back up and clear the previous output
+                click.echo(f'\x1b[{line_count}F\x1b[J', nl=False)
+            click.echo(output)
+            line_count = output.count('\n') + 1
+    finally:
+        status_logger.setLevel(status_logger_level)
+
+
 @click.command(
     context_settings={
         'help_option_names': ['--help', '-h']
@@ -19,39 +77,115 @@ logger = logging.getLogger(__name__)
 @click.argument(
     'batch_dir',
     type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    default=1,
+    help='The number of HITs to retrieve concurrently. Requests are made on'
+         ' threads, so at most'
+         f' {settings.AIO_MAX_THREADS} are in flight at once. Defaults'
+         ' to 1.')
+@click.option(
+    '--bulk', '-b',
+    is_flag=True,
+    help='Retrieve statuses by listing HITs a page at a time, and only'
+         ' retrieve HITs one at a time when they aren\'t listed. Fastest'
+         ' when the account has few HITs outside the batch.')
+@click.option(
+    '--cache-ttl',
+    type=click.FloatRange(min=0),
+    help='Reuse cached statuses younger than this many seconds. Cached'
+         ' HITs that are Reviewable or Disposed are always reused.'
+         f' Defaults to {settings.STATUS_CACHE_TTL:g}.')
+@click.option(
+    '--refresh', '-r',
+    is_flag=True,
+    help='Retrieve the status of every HIT, ignoring the cache.')
+@click.option(
+    '--watch', '-w',
+    is_flag=True,
+    help='Keep polling the status, updating it in place, until every HIT'
+         ' is Reviewable or Disposed. Polling slows down while nothing changes and'
+         ' speeds up as HITs are completed.')
+@click.option(
+    '--min-interval',
+    type=click.FloatRange(min=0),
+    help='The shortest time, in seconds, to wait between polls with'
+         f' --watch. Defaults to {settings.WATCH_MIN_INTERVAL:g}.')
+@click.option(
+    '--max-interval',
+    type=click.FloatRange(min=0),
+    help='The longest time, in seconds, to wait between polls with'
+         f' --watch. Defaults to {settings.WATCH_MAX_INTERVAL:g}.')
+@click.option(
+    '--on-complete',
+    help='A shell command to run once every HIT is Reviewable or'
+         ' Disposed, with --watch. The batch directory is passed to the'
+         ' command in the AMTI_BATCH_DIR environment variable.')
 @click.option(
     '--live', '-l',
     is_flag=True,
     help='View the status of HITs from the live MTurk site.')
-def status_batch(batch_dir, live):
+@click.pass_context
+def status_batch(
+        ctx,
+        batch_dir,
+        jobs,
+        bulk,
+        cache_ttl,
+        refresh,
+        watch,
+        min_interval,
+        max_interval,
+        on_complete,
+        live):
     """View the status of the batch of HITs defined in BATCH_DIR.
 
     Given a directory (BATCH_DIR) that represents a batch of HITs with
     HITs out in MTurk and waiting for review or that have been reviewed,
     see that status of HITs in that batch.
+
+    Statuses are cached in the batch directory, so later runs only
+    retrieve the HITs that could have changed.
     """
-    env = 'live' if live else 'sandbox'
+    if on_complete is not None and not watch:
+        raise click.UsageError('--on-complete requires --watch.')
 
-    client = utils.mturk.get_mturk_client(env)
+    env = utils.mturk.get_env(live)
+
+    client = utils.mturk.get_mturk_client(env, concurrency=jobs)
+
+    if watch:
+        _watch(
+            client=client,
+            batch_dir=batch_dir,
+            jobs=jobs,
+            bulk=bulk,
+            min_interval=min_interval,
+            max_interval=max_interval)
+
+        if on_complete is not None:
+            logger.info(f'Running: {on_complete}')
+            process = subprocess.run(
+                on_complete,
+                shell=True,
+                env=dict(os.environ, AMTI_BATCH_DIR=batch_dir))
+            if process.returncode != 0:
+                logger.error(
+                    f'The --on-complete command exited with status'
+                    f' {process.returncode}.')
+                ctx.exit(process.returncode)
+
+        return
 
     batch_status = actions.status.status_batch(
         client=client,
-        batch_dir=batch_dir)
+        batch_dir=batch_dir,
+        jobs=jobs,
+        bulk=bulk,
+        max_age=cache_ttl,
+        refresh=refresh)
 
-    batch_id = batch_status['batch_id']
-    hit_count = str(batch_status['hit_count'])
-    hit_status_counts = '\n    '.join(
-        f'{status}: {count}'
-        for status, count in batch_status['hit_status_counts'].items())
-
-    click.echo(
-      f'\n'
-        f'  Batch Status:'
-      f'\n  ============='
-      f'\n  Batch ID: {batch_id}'
-      f'\n  HIT Count: {hit_count}'
-      f'\n  HIT Status Counts:'
-      f'\n    {hit_status_counts}'
-      f'\n')
+    click.echo(_format_status(batch_status))
 
     logger.info('Finished retrieving batch status.')
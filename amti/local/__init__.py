@@ -0,0 +1,10 @@
+"""A local stand-in for MTurk, for offline testing and benchmarking"""
+
+from amti.utils.lazy import lazy_submodules
+
+
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'backend',
+    'events',
+    'server'
+])
@@ -0,0 +1,740 @@
+"""An in-memory stand-in for the MTurk requester API.
+
+``LocalMTurk`` implements the requester operations ``amti`` uses, taking
+and returning the same JSON documents as MTurk's API. Simulated workers
+submit answers to each HIT as time passes, so HITs move from
+"Assignable" to "Reviewable" the way they do on MTurk. Latency,
+throttling and failures can be injected to exercise ``amti`` under the
+conditions it sees in production.
+
+Like MTurk, HIT Types can be configured to send event notifications
+(with ``UpdateNotificationSettings``). Events are queued on the
+``LocalMTurk`` instance, and ``amti.local.events`` delivers them.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from xml.sax import saxutils
+
+
+class LocalMTurkError(Exception):
+    """An error to return from the API.
+
+    Parameters
+    ----------
+    code : str
+        the error's code, for example ``"RequestError"``.
+    message : str
+        a description of the error.
+    status : int
+        the HTTP status for the error. Defaults to ``400``.
+    turk_error_code : Optional[str]
+        the MTurk-specific error code, which MTurk returns in its own
+        ``TurkErrorCode`` field, for example
+        ``"AWS.MechanicalTurk.HitAlreadyExists"``. Defaults to ``None``.
+    """
+
+    def __init__(self, code, message, status=400, turk_error_code=None):
+        super().__init__(message)
+
+        self.code = code
+        self.message = message
+        self.status = status
+        self.turk_error_code = turk_error_code
+
+    def to_response(self):
+        """Return the error's JSON document."""
+        response = {'__type': self.code, 'Message': self.message}
+        if self.turk_error_code is not None:
+            response['TurkErrorCode'] = self.turk_error_code
+
+        return response
+
+
+ANSWER_TEMPLATE = (
+    '<?xml version="1.0" encoding="ASCII"?>'
+    '<QuestionFormAnswers xmlns="http://mechanicalturk.amazonaws.com'
+    '/AWSMechanicalTurkDataSchemas/2005-10-01/QuestionFormAnswers.xsd">'
+    '{answers}'
+    '</QuestionFormAnswers>')
+"""The template for simulated answers."""
+
+ANSWER_FIELD_PATTERN = re.compile(
+    r'<(?:input|select|textarea)\b[^>]*?\bname\s*=\s*["\']([^"\']+)["\']',
+    re.IGNORECASE)
+"""A pattern matching the names of form fields in a question."""
+
+ANSWER_WORDS = [
+    'alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf',
+    'hotel', 'india', 'juliet', 'kilo', 'lima', 'mike', 'november'
+]
+"""The words from which simulated answers are drawn."""
+
+MAX_RESULTS = 100
+"""The largest page size for list operations."""
+
+
+def _new_id():
+    """Return a new, MTurk style, 30 character ID."""
+    return (uuid.uuid4().hex + uuid.uuid4().hex)[:30].upper()
+
+
+def _paginate(items, request):
+    """Return a page of ``items`` and the token for the next page."""
+    max_results = min(request.get('MaxResults', MAX_RESULTS), MAX_RESULTS)
+    try:
+        start = int(request.get('NextToken', 0))
+    except ValueError:
+        raise LocalMTurkError(
+            'RequestError', 'The NextToken is invalid.')
+
+    page = items[start:start + max_results]
+    next_token = (
+        str(start + max_results)
+        if start + max_results < len(items)
+        else None)
+
+    return page, next_token
+
+
+def _with_next_token(response, next_token):
+    if next_token is not None:
+        response['NextToken'] = next_token
+
+    return response
+
+
+class LocalMTurk:
+    """An in-memory MTurk requester API with simulated workers.
+
+    Parameters
+    ----------
+    latency : float
+        the number of seconds each request takes. Defaults to ``0``.
+    latency_jitter : float
+        the maximum number of seconds of random latency to add to each
+        request. Defaults to ``0``.
+    max_rate : Optional[float]
+        the number of requests per second to serve before throttling
+        requests, or ``None`` to never throttle. Defaults to ``None``.
+    failure_rate : float
+        the probability with which each request fails with a
+        ``ServiceFault``. Defaults to ``0``.
+    worker_delay : float
+        the number of seconds between the simulated workers' submissions
+        to each HIT. Defaults to ``1``.
+    worker_count : int
+        the number of simulated workers. Defaults to ``20``.
+    seed : Optional[int]
+        the seed for the random number generator, or ``None`` to not seed
+        it. Defaults to ``None``.
+    """
+
+    def __init__(
+            self,
+            latency=0.,
+            latency_jitter=0.,
+            max_rate=None,
+            failure_rate=0.,
+            worker_delay=1.,
+            worker_count=20,
+            seed=None):
+        if max_rate is not None and max_rate <= 0:
+            raise ValueError('max_rate must be positive.')
+
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.max_rate = max_rate
+        self.failure_rate = failure_rate
+        self.worker_delay = worker_delay
+
+        self.random = random.Random(seed)
+        self.worker_ids = [
+            'A' + hashlib.sha256(f'worker-{i}'.encode())
+            .hexdigest()[:13].upper()
+            for i in range(worker_count)
+        ]
+
+        self.lock = threading.RLock()
+        self.hittypes = {}
+        self.hits = {}
+        self.assignments = {}
+        self.hit_assignment_ids = {}
+        self.request_tokens = {}
+        self.qualification_types = {}
+        self.qualifications = {}
+        self.worker_blocks = {}
+        self.notifications = []
+        self.notification_settings = {}
+        self.events = []
+        self.request_counts = {}
+
+        self.tokens = max(1., max_rate or 0.)
+        self.tokens_updated_at = time.monotonic()
+
+    # request handling
+
+    def handle(self, operation_name, request):
+        """Handle a request to the API.
+
+        Parameters
+        ----------
+        operation_name : str
+            the name of the operation, for example ``"GetHIT"``.
+        request : Dict
+            the request's JSON document.
+
+        Returns
+        -------
+        Dict
+            the response's JSON document.
+
+        Raises
+        ------
+        LocalMTurkError
+            if the request fails.
+        """
+        delay = self.latency + self.random.uniform(0., self.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        handler = getattr(self, f'_op_{operation_name}', None)
+        if handler is None:
+            raise LocalMTurkError(
+                'UnknownOperationException',
+                f'The operation {operation_name} is not supported.')
+
+        with self.lock:
+            self.request_counts[operation_name] = \
+                self.request_counts.get(operation_name, 0) + 1
+
+            self._check_rate()
+
+            if self.random.random() < self.failure_rate:
+                raise LocalMTurkError(
+                    'ServiceFault', 'An injected failure occurred.', 500)
+
+            return handler(request)
+
+    def _check_rate(self):
+        if self.max_rate is None:
+            return
+
+        now = time.monotonic()
+        self.tokens = min(
+            max(1., self.max_rate),
+            self.tokens + (now - self.tokens_updated_at) * self.max_rate)
+        self.tokens_updated_at = now
+        if self.tokens < 1.:
+            raise LocalMTurkError('ThrottlingException', 'Rate exceeded')
+        self.tokens -= 1.
+
+    # event notifications
+
+    def _emit(self, event_type, hit, timestamp, assignment=None):
+        """Queue an event of ``event_type`` if ``hit``'s type sends it."""
+        notification_settings = self.notification_settings.get(
+            hit['HITTypeId'])
+        if notification_settings is None \
+           or not notification_settings['Active'] \
+           or event_type not in notification_settings['EventTypes']:
+            return
+
+        event = {
+            'EventType': event_type,
+            'EventTimestamp': time.strftime(
+                '%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp)),
+            'HITId': hit['HITId'],
+            'HITTypeId': hit['HITTypeId'],
+            'HITGroupId': hit['HITGroupId']
+        }
+        if assignment is not None:
+            event['AssignmentId'] = assignment['AssignmentId']
+            event['WorkerId'] = assignment['WorkerId']
+
+        self.events.append(
+            (notification_settings['Destination'], event))
+
+    def advance(self):
+        """Bring every HIT up to the current time, emitting its events.
+
+        HITs are otherwise only brought up to date when a request
+        touches them, so call this periodically to deliver events as
+        they happen.
+        """
+        with self.lock:
+            for hit in self.hits.values():
+                self._advance(hit)
+
+    def pop_events(self):
+        """Remove and return the queued events.
+
+        Returns
+        -------
+        List[Tuple[str, Dict]]
+            the destination and the event, for each queued event.
+        """
+        with self.lock:
+            events, self.events = self.events, []
+
+        return events
+
+    # simulated workers
+
+    def _new_hit(self, hittype_id, request):
+        now = time.time()
+        hittype = self.hittypes[hittype_id]
+        hit_id = _new_id()
+        question = request['Question']
+
+        hit = {
+            'HITId': hit_id,
+            'HITTypeId': hittype_id,
+            'HITGroupId': hittype_id,
+            'CreationTime': now,
+            'Title': hittype['Title'],
+            'Description': hittype['Description'],
+            'Question': question,
+            'Keywords': hittype.get('Keywords', ''),
+            'HITStatus': 'Assignable',
+            'MaxAssignments': request.get('MaxAssignments', 1),
+            'Reward': hittype['Reward'],
+            'AutoApprovalDelayInSeconds': hittype.get(
+                'AutoApprovalDelayInSeconds', 2592000),
+            'Expiration': now + request['LifetimeInSeconds'],
+            'AssignmentDurationInSeconds': hittype[
+                'AssignmentDurationInSeconds'],
+            'QualificationRequirements': hittype.get(
+                'QualificationRequirements', []),
+            'HITReviewStatus': 'NotReviewed',
+            'NumberOfAssignmentsPending': 0,
+            'NumberOfAssignmentsAvailable': request.get('MaxAssignments', 1),
+            'NumberOfAssignmentsCompleted': 0
+        }
+        if 'RequesterAnnotation' in request:
+            hit['RequesterAnnotation'] = request['RequesterAnnotation']
+
+        self.hits[hit_id] = hit
+        self.hit_assignment_ids[hit_id] = []
+
+        # schedule the simulated workers' submissions
+        fields = [
+            field
+            for field in ANSWER_FIELD_PATTERN.findall(question)
+            if field != 'assignmentId'
+        ] or ['answer']
+        workers = self.random.sample(
+            self.worker_ids, min(hit['MaxAssignments'], len(self.worker_ids)))
+        hit['_Submissions'] = [
+            (now + self.worker_delay * (i + 1), worker_id, fields)
+            for i, worker_id in enumerate(workers)
+        ]
+
+        return hit
+
+    def _advance(self, hit):
+        """Bring ``hit`` and its assignments up to the current time."""
+        now = time.time()
+
+        submissions = hit['_Submissions']
+        while submissions and submissions[0][0] <= min(now, hit['Expiration']):
+            submit_time, worker_id, fields = submissions.pop(0)
+            answers = ''.join(
+                '<Answer>'
+                f'<QuestionIdentifier>{saxutils.escape(field)}'
+                '</QuestionIdentifier>'
+                f'<FreeText>{self.random.choice(ANSWER_WORDS)}</FreeText>'
+                '</Answer>'
+                for field in fields)
+            assignment_id = _new_id()
+            self.assignments[assignment_id] = {
+                'AssignmentId': assignment_id,
+                'WorkerId': worker_id,
+                'HITId': hit['HITId'],
+                'AssignmentStatus': 'Submitted',
+                'AutoApprovalTime':
+                    submit_time + hit['AutoApprovalDelayInSeconds'],
+                'AcceptTime': submit_time - self.worker_delay / 2,
+                'SubmitTime': submit_time,
+                'Answer': ANSWER_TEMPLATE.format(answers=answers)
+            }
+            self.hit_assignment_ids[hit['HITId']].append(assignment_id)
+            self._emit(
+                'AssignmentSubmitted',
+                hit,
+                submit_time,
+                self.assignments[assignment_id])
+
+        assignments = [
+            self.assignments[assignment_id]
+            for assignment_id in self.hit_assignment_ids[hit['HITId']]
+        ]
+        for assignment in assignments:
+            if (assignment['AssignmentStatus'] == 'Submitted'
+                    and assignment['AutoApprovalTime'] <= now):
+                assignment['AssignmentStatus'] = 'Approved'
+                assignment['ApprovalTime'] = assignment['AutoApprovalTime']
+                self._emit(
+                    'AssignmentApproved',
+                    hit,
+                    assignment['ApprovalTime'],
+                    assignment)
+
+        if hit['HITStatus'] == 'Assignable' and (
+                len(assignments) >= hit['MaxAssignments']
+                or hit['Expiration'] <= now):
+            hit['HITStatus'] = 'Reviewable'
+            if len(assignments) < hit['MaxAssignments']:
+                self._emit('HITExpired', hit, hit['Expiration'])
+            self._emit('HITReviewable', hit, now)
+
+        hit['NumberOfAssignmentsAvailable'] = (
+            hit['MaxAssignments'] - len(assignments)
+            if hit['HITStatus'] == 'Assignable'
+            else 0)
+        hit['NumberOfAssignmentsCompleted'] = sum(
+            assignment['AssignmentStatus'] in ['Approved', 'Rejected']
+            for assignment in assignments)
+
+        return hit
+
+    def _get_hit(self, hit_id):
+        if hit_id not in self.hits:
+            raise LocalMTurkError(
+                'RequestError', f'Hit {hit_id} does not exist.')
+
+        return self._advance(self.hits[hit_id])
+
+    def _get_assignment(self, assignment_id):
+        if assignment_id not in self.assignments:
+            raise LocalMTurkError(
+                'RequestError',
+                f'Assignment {assignment_id} does not exist.')
+
+        return self.assignments[assignment_id]
+
+    @staticmethod
+    def _public(hit):
+        return {
+            key: value
+            for key, value in hit.items()
+            if not key.startswith('_')
+        }
+
+    # HIT types and HITs
+
+    def _op_CreateHITType(self, request):
+        # like MTurk, identical properties yield the same HIT Type.
+        hittype_id = hashlib.sha256(
+            json.dumps(request, sort_keys=True).encode()
+        ).hexdigest()[:30].upper()
+        self.hittypes.setdefault(hittype_id, dict(request))
+
+        return {'HITTypeId': hittype_id}
+
+    def _op_CreateHITWithHITType(self, request):
+        hittype_id = request['HITTypeId']
+        if hittype_id not in self.hittypes:
+            raise LocalMTurkError(
+                'RequestError', f'HIT Type {hittype_id} does not exist.')
+
+        token = request.get('UniqueRequestToken')
+        if token is not None and token in self.request_tokens:
+            hit_id = self.request_tokens[token]
+            raise LocalMTurkError(
+                'RequestError',
+                f'The HIT with ID "{hit_id}" already exists.',
+                turk_error_code='AWS.MechanicalTurk.HitAlreadyExists')
+
+        hit = self._new_hit(hittype_id, request)
+        if token is not None:
+            self.request_tokens[token] = hit['HITId']
+
+        return {'HIT': self._public(hit)}
+
+    def _op_CreateHIT(self, request):
+        hittype_properties = {
+            key: request[key]
+            for key in [
+                'AutoApprovalDelayInSeconds',
+                'AssignmentDurationInSeconds',
+                'Reward',
+                'Title',
+                'Keywords',
+                'Description',
+                'QualificationRequirements'
+            ]
+            if key in request
+        }
+        hittype_id = self._op_CreateHITType(hittype_properties)['HITTypeId']
+
+        return self._op_CreateHITWithHITType(
+            dict(request, HITTypeId=hittype_id))
+
+    def _op_UpdateNotificationSettings(self, request):
+        hittype_id = request['HITTypeId']
+        if hittype_id not in self.hittypes:
+            raise LocalMTurkError(
+                'RequestError', f'HIT Type {hittype_id} does not exist.')
+
+        notification_settings = self.notification_settings.get(hittype_id)
+        if 'Notification' in request:
+            notification = request['Notification']
+            notification_settings = {
+                'Destination': notification['Destination'],
+                'Transport': notification['Transport'],
+                'EventTypes': list(notification['EventTypes']),
+                'Active': request.get('Active', True)
+            }
+        elif notification_settings is None:
+            raise LocalMTurkError(
+                'RequestError',
+                f'HIT Type {hittype_id} has no notification settings.')
+        if 'Active' in request:
+            notification_settings['Active'] = request['Active']
+
+        self.notification_settings[hittype_id] = notification_settings
+
+        return {}
+
+    def _op_GetHIT(self, request):
+        return {'HIT': self._public(self._get_hit(request['HITId']))}
+
+    def _op_ListHITs(self, request):
+        # only bring the listed HITs up to date, so listing every HIT a
+        # page at a time takes time linear in the number of HITs.
+        page, next_token = _paginate(list(self.hits.values()), request)
+        page = [self._public(self._advance(hit)) for hit in page]
+
+        return _with_next_token(
+            {'NumResults': len(page), 'HITs': page},
+            next_token)
+
+    def _op_ListReviewableHITs(self, request):
+        status = request.get('Status', 'Reviewable')
+        hits = [
+            self._public(hit)
+            for hit in map(self._advance, self.hits.values())
+            if hit['HITStatus'] == status
+            and request.get('HITTypeId', hit['HITTypeId']) == hit['HITTypeId']
+        ]
+        page, next_token = _paginate(hits, request)
+
+        return _with_next_token(
+            {'NumResults': len(page), 'HITs': page},
+            next_token)
+
+    def _op_UpdateExpirationForHIT(self, request):
+        hit = self._get_hit(request['HITId'])
+        hit['Expiration'] = max(request['ExpireAt'], time.time())
+        if hit['HITStatus'] == 'Assignable' \
+                and hit['Expiration'] <= time.time():
+            hit['HITStatus'] = 'Reviewable'
+            hit['NumberOfAssignmentsAvailable'] = 0
+            self._emit('HITExpired', hit, hit['Expiration'])
+            self._emit('HITReviewable', hit, time.time())
+
+        return {}
+
+    def _op_UpdateHITReviewStatus(self, request):
+        hit = self._get_hit(request['HITId'])
+        if request.get('Revert', False):
+            hit['HITStatus'] = 'Reviewable'
+        elif hit['HITStatus'] == 'Reviewable':
+            hit['HITStatus'] = 'Reviewing'
+
+        return {}
+
+    def _op_DeleteHIT(self, request):
+        hit = self._get_hit(request['HITId'])
+        if hit['HITStatus'] not in ['Reviewable', 'Reviewing']:
+            raise LocalMTurkError(
+                'RequestError',
+                f'This HIT is currently in the state \'{hit["HITStatus"]}\'.'
+                f' This operation can be called with a status of:'
+                f' Reviewing, Reviewable')
+        assignment_ids = self.hit_assignment_ids[hit['HITId']]
+        if any(
+                self.assignments[assignment_id]['AssignmentStatus']
+                == 'Submitted'
+                for assignment_id in assignment_ids):
+            raise LocalMTurkError(
+                'RequestError',
+                'This HIT has assignments that must be approved or'
+                ' rejected before it can be deleted.')
+
+        for assignment_id in assignment_ids:
+            del self.assignments[assignment_id]
+        del self.hit_assignment_ids[hit['HITId']]
+        del self.hits[hit['HITId']]
+
+        self._emit('HITDisposed', hit, time.time())
+
+        return {}
+
+    # assignments
+
+    def _op_ListAssignmentsForHIT(self, request):
+        hit = self._get_hit(request['HITId'])
+        statuses = request.get(
+            'AssignmentStatuses', ['Submitted', 'Approved', 'Rejected'])
+        assignments = [
+            dict(self.assignments[assignment_id])
+            for assignment_id in self.hit_assignment_ids[hit['HITId']]
+            if self.assignments[assignment_id]['AssignmentStatus']
+            in statuses
+        ]
+        page, next_token = _paginate(assignments, request)
+
+        return _with_next_token(
+            {'NumResults': len(page), 'Assignments': page},
+            next_token)
+
+    def _op_GetAssignment(self, request):
+        assignment = self._get_assignment(request['AssignmentId'])
+        hit = self._get_hit(assignment['HITId'])
+
+        return {
+            'Assignment': dict(assignment),
+            'HIT': self._public(hit)
+        }
+
+    def _op_ApproveAssignment(self, request):
+        assignment = self._get_assignment(request['AssignmentId'])
+        allowed_statuses = ['Submitted']
+        if request.get('OverrideRejection', False):
+            allowed_statuses.append('Rejected')
+        if assignment['AssignmentStatus'] not in allowed_statuses:
+            raise LocalMTurkError(
+                'RequestError',
+                f'This operation can be called with a status of:'
+                f' {", ".join(allowed_statuses)}')
+
+        assignment['AssignmentStatus'] = 'Approved'
+        assignment['ApprovalTime'] = time.time()
+        assignment.pop('RejectionTime', None)
+        if 'RequesterFeedback' in request:
+            assignment['RequesterFeedback'] = request['RequesterFeedback']
+
+        self._emit(
+            'AssignmentApproved',
+            self.hits[assignment['HITId']],
+            assignment['ApprovalTime'],
+            assignment)
+
+        return {}
+
+    def _op_RejectAssignment(self, request):
+        assignment = self._get_assignment(request['AssignmentId'])
+        if assignment['AssignmentStatus'] != 'Submitted':
+            raise LocalMTurkError(
+                'RequestError',
+                'This operation can be called with a status of: Submitted')
+
+        assignment['AssignmentStatus'] = 'Rejected'
+        assignment['RejectionTime'] = time.time()
+        assignment['RequesterFeedback'] = request['RequesterFeedback']
+
+        self._emit(
+            'AssignmentRejected',
+            self.hits[assignment['HITId']],
+            assignment['RejectionTime'],
+            assignment)
+
+        return {}
+
+    # workers and qualifications
+
+    def _op_NotifyWorkers(self, request):
+        if len(request['WorkerIds']) > MAX_RESULTS:
+            raise LocalMTurkError(
+                'RequestError',
+                f'At most {MAX_RESULTS} workers can be notified at once.')
+
+        self.notifications.append({
+            'Subject': request['Subject'],
+            'MessageText': request['MessageText'],
+            'WorkerIds': list(request['WorkerIds'])
+        })
+
+        return {'NotifyWorkersFailureStatuses': []}
+
+    def _op_CreateQualificationType(self, request):
+        if any(
+                qualification_type['Name'] == request['Name']
+                for qualification_type in self.qualification_types.values()):
+            raise LocalMTurkError(
+                'RequestError',
+                f'You have already created a QualificationType with this'
+                f' name: {request["Name"]}')
+
+        qualification_type_id = _new_id()
+        qualification_type = dict(
+            request,
+            QualificationTypeId=qualification_type_id,
+            CreationTime=time.time(),
+            IsRequestable=True)
+        self.qualification_types[qualification_type_id] = qualification_type
+
+        return {'QualificationType': dict(qualification_type)}
+
+    def _op_ListQualificationTypes(self, request):
+        query = request.get('Query', '').lower()
+        qualification_types = [
+            dict(qualification_type)
+            for qualification_type in self.qualification_types.values()
+            if query in qualification_type['Name'].lower()
+        ]
+        page, next_token = _paginate(qualification_types, request)
+
+        return _with_next_token(
+            {'NumResults': len(page), 'QualificationTypes': page},
+            next_token)
+
+    def _op_AssociateQualificationWithWorker(self, request):
+        qualification_type_id = request['QualificationTypeId']
+        if qualification_type_id not in self.qualification_types:
+            raise LocalMTurkError(
+                'RequestError',
+                f'QualificationType {qualification_type_id} does not'
+                f' exist.')
+
+        self.qualifications[(qualification_type_id, request['WorkerId'])] = \
+            request.get('IntegerValue', 1)
+
+        return {}
+
+    def _op_DisassociateQualificationFromWorker(self, request):
+        self.qualifications.pop(
+            (request['QualificationTypeId'], request['WorkerId']), None)
+
+        return {}
+
+    def _op_CreateWorkerBlock(self, request):
+        self.worker_blocks[request['WorkerId']] = request['Reason']
+
+        return {}
+
+    def _op_DeleteWorkerBlock(self, request):
+        self.worker_blocks.pop(request['WorkerId'], None)
+
+        return {}
+
+    def _op_ListWorkerBlocks(self, request):
+        worker_blocks = [
+            {'WorkerId': worker_id, 'Reason': reason}
+            for worker_id, reason in self.worker_blocks.items()
+        ]
+        page, next_token = _paginate(worker_blocks, request)
+
+        return _with_next_token(
+            {'NumResults': len(page), 'WorkerBlocks': page},
+            next_token)
+
+    def _op_GetAccountBalance(self, request):
+        return {'AvailableBalance': '10000.00'}
@@ -0,0 +1,154 @@
+"""Delivery of event notifications from the local stand-in for MTurk.
+
+MTurk sends event notifications to Amazon SNS or SQS. The local
+stand-in instead delivers them to the destination configured for the
+HIT Type:
+
+- an ``http://`` or ``https://`` URL, to which notifications are posted
+  wrapped in an SNS message, the way an SNS topic delivers them to an
+  HTTP subscription.
+- a ``file://`` URL or a directory path, in which each notification is
+  written as a JSON file, like a queue drained to disk.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+
+from amti import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+LOCAL_ACCOUNT_ID = '000000000000'
+"""The account ID sending the local stand-in's notifications."""
+
+
+def make_event_document(events):
+    """Return an MTurk event notification document holding ``events``.
+
+    Parameters
+    ----------
+    events : List[Dict]
+        the events for the notification.
+
+    Returns
+    -------
+    Dict
+        the event notification document.
+    """
+    return {
+        'EventDocId': str(uuid.uuid4()),
+        'SourceAccount': LOCAL_ACCOUNT_ID,
+        'CustomerId': LOCAL_ACCOUNT_ID,
+        'EventDocVersion': settings.NOTIFICATION_VERSION,
+        'Events': events
+    }
+
+
+def deliver_event_document(destination, event_document):
+    """Deliver ``event_document`` to ``destination``.
+
+    Parameters
+    ----------
+    destination : str
+        an HTTP(S) URL, a ``file://`` URL or a directory path.
+    event_document : Dict
+        the event notification document to deliver.
+
+    Returns
+    -------
+    None.
+    """
+    parsed_destination = urllib.parse.urlparse(destination)
+
+    if parsed_destination.scheme in ['http', 'https']:
+        message = {
+            'Type': 'Notification',
+            'MessageId': str(uuid.uuid4()),
+            'TopicArn': f'arn:aws:sns:us-east-1:{LOCAL_ACCOUNT_ID}:amti-local',
+            'Message': json.dumps(event_document),
+            'Timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        }
+        request = urllib.request.Request(
+            destination,
+            data=json.dumps(message).encode('utf-8'),
+            headers={
+                'Content-Type': 'text/plain; charset=UTF-8',
+                'x-amz-sns-message-type': 'Notification'
+            },
+            method='POST')
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+    else:
+        queue_dir = (
+            urllib.parse.unquote(parsed_destination.path)
+            if parsed_destination.scheme == 'file'
+            else destination)
+        file_name = (
+            f'{time.time():.6f}-{event_document["EventDocId"]}.json')
+        tmp_path = os.path.join(queue_dir, f'.{file_name}.tmp')
+        with open(tmp_path, 'w') as event_document_file:
+            json.dump(event_document, event_document_file)
+        os.replace(tmp_path, os.path.join(queue_dir, file_name))
+
+
+class EventPoster(threading.Thread):
+    """A background thread delivering the events from ``local_mturk``.
+
+    Every ``interval`` seconds, the poster brings the HITs up to date
+    and delivers the queued events, one notification per destination.
+    Events that can't be delivered are retried on the next round. Call
+    ``stop`` to stop the thread.
+
+    Parameters
+    ----------
+    local_mturk : amti.local.backend.LocalMTurk
+        the stand-in for MTurk whose events to deliver.
+    interval : float
+        the number of seconds between deliveries. Defaults to ``1``.
+    """
+
+    def __init__(self, local_mturk, interval=1.):
+        super().__init__(daemon=True)
+
+        self.local_mturk = local_mturk
+        self.interval = interval
+        self.pending_events = {}
+        self.stopped = threading.Event()
+
+    def deliver(self):
+        """Deliver the events queued so far."""
+        self.local_mturk.advance()
+        for destination, event in self.local_mturk.pop_events():
+            self.pending_events.setdefault(destination, []).append(event)
+
+        for destination in list(self.pending_events):
+            events = self.pending_events[destination]
+            try:
+                deliver_event_document(
+                    destination, make_event_document(events))
+            except (OSError, ValueError) as error:
+                logger.warning(
+                    f'Failed to deliver {len(events)} events to'
+                    f' {destination}: {error}')
+                continue
+
+            logger.debug(f'Delivered {len(events)} events to {destination}.')
+            del self.pending_events[destination]
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.deliver()
+
+    def stop(self):
+        """Stop delivering events, after delivering the last ones."""
+        self.stopped.set()
+        self.join()
+        self.deliver()
@@ -0,0 +1,182 @@
+"""Servers for the local stand-in for MTurk.
+
+The HTTP server speaks the same JSON protocol as MTurk's requester API,
+so boto3 clients pointed at it (for example, by using the ``"local"``
+environment) work unchanged. ``serve_in_process`` instead answers a
+client's requests directly, skipping sockets altogether.
+"""
+
+import http.server
+import json
+import logging
+import socketserver
+import threading
+import uuid
+
+from botocore.awsrequest import AWSResponse
+
+from amti.local import backend
+
+
+logger = logging.getLogger(__name__)
+
+
+TARGET_PREFIX = 'MTurkRequesterServiceV20170117.'
+"""The prefix of the X-Amz-Target header for MTurk operations."""
+
+
+def _handle(local_mturk, target, body):
+    """Return the status and body responding to an API request."""
+    try:
+        if not target.startswith(TARGET_PREFIX):
+            raise backend.LocalMTurkError(
+                'UnknownOperationException',
+                f'The target {target} is not supported.')
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            raise backend.LocalMTurkError(
+                'SerializationException', 'The request is not JSON.')
+
+        status = 200
+        response = local_mturk.handle(target[len(TARGET_PREFIX):], request)
+    except backend.LocalMTurkError as error:
+        status = error.status
+        response = error.to_response()
+
+    return status, json.dumps(response).encode('utf-8')
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serve requests to the API from ``self.server.local_mturk``."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        target = self.headers.get('X-Amz-Target', '')
+        content_length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(content_length)
+
+        status, response_body = _handle(self.server.local_mturk, target, body)
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/x-amz-json-1.1')
+        self.send_header('Content-Length', str(len(response_body)))
+        self.send_header('x-amzn-RequestId', str(uuid.uuid4()))
+        self.end_headers()
+        self.wfile.write(response_body)
+
+    def log_message(self, format, *args):
+        logger.debug(f'{self.address_string()} - {format % args}')
+
+
+class _ThreadingHTTPServer(
+        socketserver.ThreadingMixIn,
+        http.server.HTTPServer):
+    daemon_threads = True
+
+
+def make_server(local_mturk, host='127.0.0.1', port=0):
+    """Return an HTTP server for ``local_mturk``.
+
+    Parameters
+    ----------
+    local_mturk : amti.local.backend.LocalMTurk
+        the stand-in for MTurk to serve.
+    host : str
+        the host on which to listen. Defaults to ``"127.0.0.1"``.
+    port : int
+        the port on which to listen, or ``0`` to pick a free port.
+        Defaults to ``0``.
+
+    Returns
+    -------
+    http.server.HTTPServer
+        the server. Its ``url`` attribute holds the endpoint URL for it.
+    """
+    server = _ThreadingHTTPServer((host, port), _RequestHandler)
+    server.local_mturk = local_mturk
+    server.url = f'http://{host}:{server.server_address[1]}'
+
+    return server
+
+
+def start_server(local_mturk, host='127.0.0.1', port=0):
+    """Serve ``local_mturk`` from a background thread.
+
+    Call ``shutdown`` and then ``server_close`` on the returned server to
+    stop it.
+
+    Parameters
+    ----------
+    local_mturk : amti.local.backend.LocalMTurk
+        the stand-in for MTurk to serve.
+    host : str
+        the host on which to listen. Defaults to ``"127.0.0.1"``.
+    port : int
+        the port on which to listen, or ``0`` to pick a free port.
+        Defaults to ``0``.
+
+    Returns
+    -------
+    http.server.HTTPServer
+        the running server. Its ``url`` attribute holds the endpoint URL
+        for it.
+    """
+    server = make_server(local_mturk, host=host, port=port)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    logger.debug(f'Serving local MTurk at {server.url}.')
+
+    return server
+
+
+class _RawResponse:
+    """A stand-in for the raw HTTP response botocore reads bodies from."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def serve_in_process(client, local_mturk):
+    """Answer every request from ``client`` with ``local_mturk``.
+
+    Requests still go through botocore's serialization, retries and
+    event hooks (including rate limiting), but are answered in the
+    calling thread instead of being sent over the network.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    local_mturk : amti.local.backend.LocalMTurk
+        the stand-in for MTurk with which to answer requests.
+
+    Returns
+    -------
+    None.
+    """
+    def before_send(request, **kwargs):
+        target = request.headers.get('X-Amz-Target', b'')
+        if isinstance(target, bytes):
+            target = target.decode('utf-8')
+        status, response_body = _handle(local_mturk, target, request.body)
+
+        return AWSResponse(
+            request.url,
+            status,
+            {
+                'Content-Type': 'application/x-amz-json-1.1',
+                'x-amzn-RequestId': str(uuid.uuid4())
+            },
+            _RawResponse(response_body))
+
+    service_id = client.meta.service_model.service_id.hyphenize()
+    # register last, so that other handlers (like the rate limiter) see
+    # the request before it's answered.
+    client.meta.events.register_last(f'before-send.{service_id}', before_send)
@@ -1,11 +1,102 @@
 """Constants and default settings that ship with ``amti``"""
 
+import os
+
 
 # AWS client configuration
 
 MAX_ATTEMPTS = 25
 """The number of retries to perform for requests."""
 
+MIN_POOL_CONNECTIONS = 10
+"""The smallest connection pool to give an MTurk client."""
+
+LIST_PAGE_SIZE = 100
+"""The number of results to request per page, MTurk's maximum."""
+
+AIO_MAX_THREADS = 64
+"""The most threads an ``amti.utils.aio.AsyncClient`` makes requests on."""
+# boto3 clients block, so each request in flight occupies a thread.
+# Concurrency beyond this queues for a thread rather than adding more.
+
+RATE_LIMITS = {
+    'create_hit_type': 5.,
+    'create_hit_with_hit_type': 20.,
+    'get_hit': 50.,
+    'list_hits': 10.,
+    'list_reviewable_hits': 10.,
+    'list_assignments_for_hit': 50.,
+    'approve_assignment': 20.,
+    'reject_assignment': 20.,
+    'update_expiration_for_hit': 20.,
+    'delete_hit': 20.,
+    'notify_workers': 2.,
+    'associate_qualification_with_worker': 10.,
+    'disassociate_qualification_from_worker': 10.,
+    'create_worker_block': 10.,
+    'delete_worker_block': 10.
+}
+"""The budgets, in requests per second, for MTurk operations.
+
+Operations are keyed by their client method names. Each operation's
+rate starts at its budget, drops when MTurk throttles it and recovers
+back up to the budget as requests succeed.
+"""
+
+RATE_LIMIT_DEFAULT = 10.
+"""The budget, in requests per second, for operations not in RATE_LIMITS."""
+
+RATE_LIMIT_MIN_RATE = 0.5
+"""The lowest rate, in requests per second, throttling can reduce to."""
+
+RATE_LIMIT_BURST_SECONDS = 1.
+"""The number of seconds of requests that may be sent in a burst."""
+
+RATE_LIMIT_DECREASE_FACTOR = 0.5
+"""The factor by which to multiply an operation's rate when throttled."""
+
+RATE_LIMIT_INCREASE_STEP = 0.1
+"""The amount by which to raise an operation's rate on each success."""
+
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded'
+}
+"""The error codes with which MTurk responds to throttled requests."""
+
+
+# metrics configuration
+
+METRICS_DURATION_BUCKETS = [
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1., 2.5, 5., 10., 30., 60.
+]
+"""The upper bounds, in seconds, of the buckets for duration metrics."""
+
+
+# profiling configuration
+
+PROFILE_FILE_NAME_TEMPLATE = 'amti-{command_name}-{timestamp}.{extension}'
+"""The template for the names of profile files."""
+
+PROFILE_TOP_N = 50
+"""The number of lines to report in memory profiles."""
+
+
+# template configuration
+
+TEMPLATE_CACHE_DIR = os.path.join(
+    os.path.expanduser(os.getenv('XDG_CACHE_HOME', '~/.cache')),
+    'amti',
+    'templates')
+"""The directory in which to cache compiled templates."""
+
+TEMPLATE_CACHE_SIZE = 50
+"""The number of compiled templates to keep in memory per process."""
+
 
 # Mechanical Turk environment values
 
@@ -21,8 +112,35 @@ ENVS = {
         'endpoint_url': 'https://mturk-requester-sandbox.us-east-1.amazonaws.com',
         'worker_url': 'https://workersandbox.mturk.com/',
         'requester_url': 'https://requestersandbox.mturk.com/'
+    },
+    'local': {
+        'region_name': 'us-east-1',
+        'endpoint_url': os.getenv(
+            'AMTI_LOCAL_ENDPOINT_URL', 'http://127.0.0.1:8765'),
+        'worker_url': os.getenv(
+            'AMTI_LOCAL_ENDPOINT_URL', 'http://127.0.0.1:8765'),
+        'requester_url': os.getenv(
+            'AMTI_LOCAL_ENDPOINT_URL', 'http://127.0.0.1:8765'),
+        # the local server doesn't check credentials, so use placeholders
+        # rather than requiring AWS credentials to be configured.
+        'credentials': {
+            'aws_access_key_id': 'local',
+            'aws_secret_access_key': 'local'
+        }
     }
 }
+"""The MTurk environments, and the values for connecting to each.
+
+The ``"local"`` environment is served by ``amti serve-local`` (see
+``amti.local``). Commands use it in place of the sandbox when the
+``AMTI_ENV`` environment variable is set to ``"local"``.
+"""
+
+DEFAULT_ENV = os.getenv('AMTI_ENV', 'sandbox')
+"""The environment to use when ``--live`` isn't passed."""
+
+LOCAL_SERVER_PORT = 8765
+"""The default port for ``amti serve-local``."""
 
 # MTURK overhead multiplier
 TURK_OVERHEAD_FACTOR = 1.2
@@ -57,6 +175,23 @@ See the A Mechanical Turk Interface documentation for details.
 #    |  |  |- assignments.jsonl : results from the assignments
 #    |  |- ...
 #
+# Results may instead be saved in segments (see ``RESULTS_LAYOUTS``), in
+# which case the results directory has the following structure:
+#
+#    |- results : results from the HITs on the MTurk site
+#    |  |- INDEX : the location of each HIT's record in the segments
+#    |  |- segment-$N.jsonl : records holding a HIT and its assignments
+#    |  |- ...
+#
+# A batch may instead be split into shards, each of which is a complete
+# batch directory of its own. A sharded batch has no data or results of
+# its own; instead, it has the following in their place:
+#
+#    |- SHARDS : a JSON manifest listing the batch's shards in order
+#    |- shards : the batch's shards
+#    |  |- batch-$SHARDID : a batch directory for a single shard
+#    |  |- ...
+#
 # The following data structure maps a logical name for a structure (such
 # as 'readme' for the 'README' file) to a pair giving the path name for
 # that structure and the substructure of that structure (an empty
@@ -80,7 +215,15 @@ BATCH_DIR_STRUCTURE = ('batch-{batch_id}', {
         'hit_dir': ('hit-{hit_id}', {
             'hit': ('hit.jsonl', {}),
             'assignments': ('assignments.jsonl', {})
-        })
+        }),
+        'index': ('INDEX', {}),
+        'segment': ('segment-{segment_number:05d}.jsonl', {})
+    }),
+    'shard_manifest': ('SHARDS', {}),
+    'shards': ('shards', {
+        # each shard directory has the same structure as a batch
+        # directory.
+        'shard_dir': ('batch-{batch_id}', {})
     })
 })
 
@@ -90,6 +233,129 @@ BATCH_DIR_STRUCTURE = ('batch-{batch_id}', {
 # ID).
 INCOMPLETE_FILE_NAME = '_INCOMPLETE'
 
+# the name of the file used to denote a batch, or a shard of one, whose
+# upload hasn't finished. It's written when the batch directory is
+# initialized and removed once its upload writes the INCOMPLETE file, so
+# that shards that were never uploaded aren't mistaken for saved ones.
+UPLOAD_PENDING_FILE_NAME = '_UPLOAD_PENDING'
+
+# the name of the append-only journal recording each HIT as it's created
+# while uploading a batch. The journal allows an interrupted upload to
+# be resumed without creating duplicate HITs.
+UPLOAD_JOURNAL_FILE_NAME = '_UPLOAD_JOURNAL'
+
+# the name of the append-only journal recording each HIT as it's saved.
+# The journal allows a batch to be saved incrementally, without fetching
+# HITs that were saved by an earlier run.
+SAVE_JOURNAL_FILE_NAME = '_SAVE_JOURNAL'
+
+# the name of the directory in which HITs are written while saving a
+# batch, before they're moved into the results directory.
+SAVE_STAGING_DIR_NAME = '_SAVE_STAGING'
+
+# the name of the file recording the form fields found in a batch's
+# saved assignments, so that tabular extraction knows its columns
+# without reading the results twice.
+SCHEMA_FILE_NAME = '_SCHEMA'
+
+# the name of the directory in which results are written while
+# converting them to another layout, before they replace the originals.
+CONVERT_STAGING_DIR_NAME = '_CONVERT_STAGING'
+
+# the layouts in which a batch's results can be saved: a directory per
+# HIT, or a few append-only segment files with an index locating each
+# HIT's record. Segments are much faster to write and scan for large
+# batches. See ``amti.utils.results``.
+RESULTS_LAYOUTS = ['directories', 'segments']
+
+# the layout used when saving a batch that has no results yet.
+RESULTS_LAYOUT = 'directories'
+
+# the size, in bytes, above which a new segment is started when saving
+# results in segments.
+RESULTS_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# the name of the archive written for a batch directory by ``amti
+# archive-batch``, next to the batch directory.
+ARCHIVE_FILE_NAME_TEMPLATE = '{batch_dir_name}.zip'
+
+# the name of the gzipped JSON lines file caching the rendered question
+# for each line of a batch's data. Questions are rendered and checked
+# before uploading begins, and then streamed from this file.
+RENDERED_QUESTIONS_FILE_NAME = '_RENDERED_QUESTIONS.jsonl.gz'
+
+# the name of the file caching the last known status of each HIT in a
+# batch, along with when it was fetched. See ``amti.utils.cache``.
+STATUS_CACHE_FILE_NAME = '_STATUS_CACHE'
+
+# the name of the file locked while updating a batch's status cache, so
+# that concurrent updates (e.g., from ``amti ingest-events`` and ``amti
+# status-batch``) don't overwrite each other.
+STATUS_CACHE_LOCK_FILE_NAME = '_STATUS_CACHE.lock'
+
+# HIT statuses that can't change unless the requester acts on the HIT.
+# Cached HITs with these statuses don't need to be fetched again.
+TERMINAL_HIT_STATUSES = ['Reviewable', 'Disposed']
+
+# the default age, in seconds, below which cached non-terminal HIT
+# statuses are trusted by ``amti status-batch``.
+STATUS_CACHE_TTL = 60.
+
+# the default number of threads writing fetched HITs to disk while
+# saving a batch, so that serializing results overlaps with fetching.
+SAVE_WRITE_JOBS = 4
+
+# how each type of MTurk event notification changes the status of its
+# HIT: to the given status, or to an unknown one (``None``), in which
+# case the HIT's cached status is dropped. Other events don't change the
+# HIT's status.
+EVENT_HIT_STATUSES = {
+    'HITCreated': 'Assignable',
+    'HITReviewable': 'Reviewable',
+    'HITDisposed': 'Disposed',
+    'HITExtended': None,
+    'HITExpired': None,
+    'AssignmentAccepted': None,
+    'AssignmentAbandoned': None,
+    'AssignmentReturned': None,
+    'AssignmentSubmitted': None
+}
+
+# the event types for which ``amti ingest-events --configure`` asks MTurk
+# to send notifications.
+NOTIFICATION_EVENT_TYPES = [
+    'AssignmentSubmitted',
+    'AssignmentReturned',
+    'AssignmentAbandoned',
+    'HITReviewable',
+    'HITExpired',
+    'HITDisposed'
+]
+
+# the version of MTurk's event notification documents.
+NOTIFICATION_VERSION = '2014-08-15'
+
+# the number of seconds to buffer events before writing them to the
+# status cache, when ingesting events.
+EVENTS_FLUSH_INTERVAL = 1.
+
+# the default port for the webhook receiving event notifications.
+EVENTS_WEBHOOK_PORT = 8766
+
+# the shortest and longest intervals, in seconds, between polls when
+# watching a batch's status with ``amti status-batch --watch``.
+WATCH_MIN_INTERVAL = 5.
+WATCH_MAX_INTERVAL = 300.
+
+# the factor by which to lengthen the interval between polls when no
+# HIT's status changed since the last poll, or to shorten it otherwise.
+WATCH_BACKOFF_FACTOR = 2.
+
+# template for the token sent with each HIT creation request. MTurk
+# refuses to create a second HIT with the same token (for 24 hours), so
+# retried requests can't create duplicate HITs.
+UNIQUE_REQUEST_TOKEN_TEMPLATE = '{batch_id}-{line_number}'
+
 # template for the directories that contain the XML answers for an
 # assignment
 XML_DIR_NAME_TEMPLATE = 'batch-{batch_id}-xml'
@@ -97,6 +363,16 @@ XML_DIR_NAME_TEMPLATE = 'batch-{batch_id}-xml'
 XML_FILE_NAME_TEMPLATE = 'assignment-{assignment_id}.xml'
 
 
+MAX_QUESTION_SIZE = 64 * 1024
+"""The maximum size (in bytes) MTurk allows for a HIT's question XML."""
+
+RENDER_CHUNK_SIZE = 256
+"""The number of data lines sent to a render worker at a time."""
+
+PLAN_MAX_EXAMPLES = 20
+"""The number of example rows to list for each problem in a plan."""
+
+
 HITTYPE_PROPERTIES = {
     'AutoApprovalDelayInSeconds': int,
     'AssignmentDurationInSeconds': int,
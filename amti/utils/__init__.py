@@ -1,9 +1,26 @@
 """Utilities for ``amti``"""
 
-from amti.utils import (
-    log,
-    mturk,
-    serialization,
-    validation,
-    workers,
-    xml)
+from amti.utils import lazy
+
+
+__getattr__, __dir__ = lazy.lazy_submodules(__name__, [
+    'aio',
+    'answers',
+    'archive',
+    'batch',
+    'cache',
+    'concurrency',
+    'events',
+    'lazy',
+    'log',
+    'metrics',
+    'mturk',
+    'profiling',
+    'ratelimit',
+    'results',
+    'serialization',
+    'templates',
+    'validation',
+    'workers',
+    'xml'
+])
@@ -0,0 +1,211 @@
+"""Utilities for driving MTurk with asyncio.
+
+boto3 clients are blocking, so ``AsyncClient`` runs each call on a
+thread pool shared by the client and exposes it as a coroutine. Per-HIT
+work is then written as coroutines and driven by ``map_bounded``, which
+keeps a bounded number of them in flight from a single event loop.
+
+The transport is not non-blocking: each request in flight still holds a
+thread. The pool is capped at ``settings.AIO_MAX_THREADS`` threads, so
+at most that many requests are in flight at once, however high the
+concurrency. Further calls wait for a free thread.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import logging
+
+from amti import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncClient:
+    """An awaitable wrapper around a boto3 client for MTurk.
+
+    Every client method is available as a coroutine function taking the
+    same keyword arguments, for example::
+
+        hit = await async_client.get_hit(HITId=hit_id)
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    concurrency : int
+        the maximum number of requests to have in flight at once. At
+        most ``settings.AIO_MAX_THREADS`` are, since each takes a
+        thread.
+    """
+
+    def __init__(self, client, concurrency):
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1.')
+
+        if concurrency > settings.AIO_MAX_THREADS:
+            logger.warning(
+                f'Only {settings.AIO_MAX_THREADS} of the {concurrency}'
+                f' requested concurrent requests can be in flight at once,'
+                f' since each takes a thread. See'
+                f' settings.AIO_MAX_THREADS.')
+
+        self.client = client
+        self.concurrency = concurrency
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(concurrency, settings.AIO_MAX_THREADS))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Shut down the thread pool used to make requests."""
+        self.executor.shutdown(wait=True)
+
+    async def call(self, fn, *args, **kwargs):
+        """Run the blocking callable ``fn`` on the client's thread pool."""
+        loop = asyncio.get_event_loop()
+
+        return await loop.run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def paginate(self, operation_name, **kwargs):
+        """Return the list of pages from paginating ``operation_name``."""
+        paginator = self.client.get_paginator(operation_name)
+
+        return await self.call(
+            lambda: list(paginator.paginate(**kwargs)))
+
+    async def iter_pages(self, operation_name, **kwargs):
+        """Yield the pages from paginating ``operation_name`` as they come.
+
+        Unlike ``paginate``, only one page is held at a time and the
+        caller can stop early without requesting the remaining pages.
+        """
+        pages = iter(
+            self.client.get_paginator(operation_name).paginate(**kwargs))
+        done = object()
+        while True:
+            page = await self.call(next, pages, done)
+            if page is done:
+                return
+            yield page
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        async def call(**kwargs):
+            return await self.call(method, **kwargs)
+
+        return call
+
+
+async def map_bounded(fn, iterable, max_pending, ordered=True):
+    """Yield the results of the coroutine function ``fn`` on ``iterable``.
+
+    Schedule ``fn(item)`` for every item in ``iterable``, keeping at
+    most ``max_pending`` of them scheduled at once, and yield their
+    results. ``iterable`` is consumed lazily, so arbitrarily long inputs
+    are processed in bounded memory. If a call raises an exception, the
+    remaining calls are cancelled and the exception propagates.
+
+    Parameters
+    ----------
+    fn : Callable[..., Awaitable]
+        the coroutine function to apply to each item.
+    iterable : Iterable
+        the items to which ``fn`` should be applied.
+    max_pending : int
+        the maximum number of scheduled calls to ``fn`` whose results
+        have not yet been yielded.
+    ordered : bool
+        if ``True``, yield the results in the same order as the items.
+        Otherwise, yield them as they complete, so a slow call doesn't
+        hold up the others. Defaults to ``True``.
+
+    Returns
+    -------
+    AsyncIterator
+        the results of ``fn`` for each item.
+    """
+    if max_pending < 1:
+        raise ValueError('max_pending must be at least 1.')
+
+    if not ordered:
+        async for result in _map_bounded_unordered(fn, iterable, max_pending):
+            yield result
+
+        return
+
+    pending = collections.deque()
+    try:
+        for item in iterable:
+            pending.append(asyncio.ensure_future(fn(item)))
+            if len(pending) >= max_pending:
+                yield await pending.popleft()
+
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _map_bounded_unordered(fn, iterable, max_pending):
+    """Yield the results of ``fn`` on ``iterable`` as they complete."""
+    pending = set()
+    done = collections.deque()
+    try:
+        items = iter(iterable)
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(fn(item)))
+
+            if not pending:
+                return
+
+            finished, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            done.extend(finished)
+            while done:
+                yield done.popleft().result()
+    finally:
+        for task in pending:
+            task.cancel()
+        # retrieve the exceptions of finished calls that won't be
+        # yielded, so they aren't reported as never retrieved.
+        for task in done:
+            if not task.cancelled():
+                task.exception()
+
+
+def run(coroutine):
+    """Run ``coroutine`` to completion on a new event loop.
+
+    Parameters
+    ----------
+    coroutine : Coroutine
+        the coroutine to run.
+
+    Returns
+    -------
+    Any
+        the coroutine's result.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
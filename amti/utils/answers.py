@@ -0,0 +1,248 @@
+"""Utilities for parsing the answers to assignments.
+
+Mechanical Turk returns the answers to an assignment as a
+``QuestionFormAnswers`` XML document in the assignment's ``Answer``
+field, for example::
+
+    <QuestionFormAnswers xmlns="...">
+      <Answer>
+        <QuestionIdentifier>example_field</QuestionIdentifier>
+        <FreeText>the worker's answer</FreeText>
+      </Answer>
+    </QuestionFormAnswers>
+
+The functions here read these documents in a single pass of the expat
+parser, without building a DOM, which is several times faster than
+``xml.dom.minidom`` (see ``benchmarks/answers.py``). Malformed documents
+raise a ``ValueError``.
+"""
+
+import html
+import logging
+from xml.parsers import expat
+
+
+logger = logging.getLogger(__name__)
+
+
+DO_NOT_REDIRECT_FIELD = 'doNotRedirect'
+"""A field some workers add to their answers, which is always dropped."""
+# some workers on Mechanical Turk modify their browser requests to send
+# a 'doNotRedirect' field when posting results.
+
+
+def _parse(answer_xml, handlers):
+    """Run the expat parser over ``answer_xml`` with ``handlers``."""
+    parser = expat.ParserCreate()
+    # deliver each run of text in one call, as minidom does.
+    parser.buffer_text = True
+    parser.ordered_attributes = True
+    for name, handler in handlers.items():
+        setattr(parser, name, handler)
+
+    try:
+        parser.Parse(answer_xml, True)
+    except expat.ExpatError as error:
+        raise ValueError(f'Failed to parse the answer XML: {error}.')
+
+
+def _iter_answers(answer_xml):
+    """Return the (question identifier, free text) pairs in ``answer_xml``.
+
+    Each ``Answer`` element must have exactly one ``QuestionIdentifier``
+    and one ``FreeText`` element, both with only text as content. Text
+    is returned as parsed, without unescaping HTML entities.
+    """
+    answers = []
+
+    # the texts of the QuestionIdentifier and FreeText elements in the
+    # current Answer element, if there is one.
+    answer = None
+    # the name and text of the QuestionIdentifier or FreeText element
+    # being read, if there is one.
+    field = None
+
+    def start_element(name, attributes):
+        nonlocal answer, field
+
+        if field is not None:
+            raise ValueError(
+                f'A {field[0]} element has child elements in the answer'
+                f' XML.')
+
+        if name == 'Answer':
+            if answer is not None:
+                raise ValueError(
+                    'Answer elements are nested in the answer XML.')
+            answer = {'QuestionIdentifier': [], 'FreeText': []}
+        elif answer is not None and name in answer:
+            field = (name, [])
+
+    def end_element(name):
+        nonlocal answer, field
+
+        if field is not None:
+            field_name, texts = field
+            answer[field_name].append(''.join(texts))
+            field = None
+        elif name == 'Answer':
+            question_identifiers = answer['QuestionIdentifier']
+            free_texts = answer['FreeText']
+            if len(question_identifiers) != 1 or len(free_texts) != 1:
+                raise ValueError(
+                    f'An Answer element has {len(question_identifiers)}'
+                    f' QuestionIdentifier and {len(free_texts)} FreeText'
+                    f' elements instead of one of each.')
+            answers.append((question_identifiers[0], free_texts[0]))
+            answer = None
+
+    def character_data(data):
+        if field is not None:
+            field[1].append(data)
+
+    _parse(answer_xml, {
+        'StartElementHandler': start_element,
+        'EndElementHandler': end_element,
+        'CharacterDataHandler': character_data
+    })
+
+    return answers
+
+
+def parse_answers(answer_xml, hit_id=None):
+    """Return the answers from an assignment's answer XML.
+
+    The ``doNotRedirect`` field is dropped with a warning, and HTML
+    entities in the answers are unescaped.
+
+    Parameters
+    ----------
+    answer_xml : str
+        the ``Answer`` field of an assignment.
+    hit_id : Optional[str]
+        the ID of the assignment's HIT, to include in log messages.
+        Defaults to ``None``.
+
+    Returns
+    -------
+    Dict[str, str]
+        a dictionary mapping each question identifier to its answer, in
+        the order the answers appear.
+    """
+    answers = {}
+    for question_identifier, free_text in _iter_answers(answer_xml):
+        if question_identifier == DO_NOT_REDIRECT_FIELD:
+            logger.warning(
+                f'Found a "{DO_NOT_REDIRECT_FIELD}" field in HIT'
+                f' (ID: {hit_id}). Dropping the field.')
+            continue
+
+        answers[question_identifier] = html.unescape(free_text)
+
+    return answers
+
+
+def get_question_identifiers(answer_xml):
+    """Return the question identifiers in an assignment's answer XML.
+
+    Unlike ``parse_answers``, the ``doNotRedirect`` field is kept.
+
+    Parameters
+    ----------
+    answer_xml : str
+        the ``Answer`` field of an assignment.
+
+    Returns
+    -------
+    List[str]
+        the question identifiers of the answers, in order.
+    """
+    return [
+        question_identifier
+        for question_identifier, _ in _iter_answers(answer_xml)
+    ]
+
+
+def _escape(data):
+    """Escape ``data`` for XML the way ``xml.dom.minidom`` does."""
+    return data\
+        .replace('&', '&amp;')\
+        .replace('<', '&lt;')\
+        .replace('"', '&quot;')\
+        .replace('>', '&gt;')
+
+
+def format_answer_xml(answer_xml, indent='\t'):
+    """Return ``answer_xml`` pretty-printed.
+
+    The output is the same as ``xml.dom.minidom``'s ``toprettyxml``,
+    except that processing instructions are dropped and CDATA sections
+    are written as escaped text.
+
+    Parameters
+    ----------
+    answer_xml : str
+        the ``Answer`` field of an assignment.
+    indent : str
+        the string to indent each level of elements with. Defaults to a
+        tab.
+
+    Returns
+    -------
+    str
+        the pretty-printed XML.
+    """
+    lines = ['<?xml version="1.0" ?>']
+
+    # the elements being read, as [start tag, name, children], where
+    # each child is a run of text or the lines of a child element.
+    stack = [[None, None, []]]
+
+    def start_element(name, attributes):
+        start_tag = '<' + name + ''.join(
+            f' {attributes[i]}="{_escape(attributes[i + 1])}"'
+            for i in range(0, len(attributes), 2))
+        stack.append([start_tag, name, []])
+
+    def end_element(_):
+        start_tag, name, children = stack.pop()
+        prefix = indent * (len(stack) - 1)
+        if not children:
+            element = [f'{prefix}{start_tag}/>']
+        elif len(children) == 1 and isinstance(children[0], str):
+            # an element with only text is written on one line.
+            element = [f'{prefix}{start_tag}>{_escape(children[0])}</{name}>']
+        else:
+            element = [f'{prefix}{start_tag}>']
+            for child in children:
+                if isinstance(child, str):
+                    element.append(prefix + indent + _escape(child))
+                else:
+                    element.extend(child)
+            element.append(f'{prefix}</{name}>')
+        stack[-1][2].append(element)
+
+    def character_data(data):
+        children = stack[-1][2]
+        if len(stack) == 1:
+            # text outside the document element is ignorable whitespace.
+            return
+        if children and isinstance(children[-1], str):
+            children[-1] += data
+        else:
+            children.append(data)
+
+    def comment(data):
+        stack[-1][2].append([indent * (len(stack) - 1) + f'<!--{data}-->'])
+
+    _parse(answer_xml, {
+        'StartElementHandler': start_element,
+        'EndElementHandler': end_element,
+        'CharacterDataHandler': character_data,
+        'CommentHandler': comment
+    })
+
+    for child in stack[0][2]:
+        lines.extend(child)
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,126 @@
+"""Utilities for reading batch archives.
+
+A batch archive is a ZIP file holding a completed batch directory, with
+its results in segments (see ``amti.utils.results``). The ZIP file's
+central directory serves as the archive's index of files, and the
+segment index locates each HIT within its segment, so batches can be
+read from the archive in place without unpacking it.
+
+``FileSystemSource`` and ``ArchiveSource`` give the same read-only view
+of files in a batch directory and in an archive, respectively, so that
+readers such as ``amti.utils.results.ResultsReader`` work with either.
+"""
+
+import io
+import os
+import posixpath
+import zipfile
+
+
+class FileSystemSource:
+    """Read-only access to files on the local file system."""
+
+    def isfile(self, path):
+        return os.path.isfile(path)
+
+    def isdir(self, path):
+        return os.path.isdir(path)
+
+    def listdir(self, path):
+        return os.listdir(path)
+
+    def open(self, path, mode='r'):
+        return open(path, mode)
+
+    def close(self):
+        pass
+
+
+class ArchiveSource:
+    """Read-only access to the files in a batch archive.
+
+    Paths are relative to the root of the archive. Files are
+    decompressed as they're read, and files opened in binary mode can be
+    seeked, though seeking backward decompresses the file again from its
+    start.
+
+    Parameters
+    ----------
+    archive_path : str
+        the path to the ZIP file.
+    """
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.zip_file = zipfile.ZipFile(archive_path, 'r')
+
+        self.file_names = set()
+        self.dir_children = {'': set()}
+        for name in self.zip_file.namelist():
+            if name.endswith('/'):
+                continue
+            self.file_names.add(name)
+
+            # record every ancestor directory of the file.
+            parent, child = posixpath.split(name)
+            while True:
+                self.dir_children.setdefault(parent, set()).add(child)
+                if not parent:
+                    break
+                parent, child = posixpath.split(parent)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _normalize(path):
+        path = path.replace(os.sep, '/')
+        normalized_path = posixpath.normpath(path)
+
+        return '' if normalized_path == '.' else normalized_path
+
+    def isfile(self, path):
+        return self._normalize(path) in self.file_names
+
+    def isdir(self, path):
+        return self._normalize(path) in self.dir_children
+
+    def listdir(self, path):
+        path = self._normalize(path)
+        if path not in self.dir_children:
+            raise FileNotFoundError(
+                f'No directory {path} in {self.archive_path}.')
+
+        return sorted(self.dir_children[path])
+
+    def open(self, path, mode='r'):
+        if mode not in ['r', 'rb']:
+            raise ValueError('Archives can only be opened for reading.')
+
+        member_file = self.zip_file.open(self._normalize(path), 'r')
+        if mode == 'rb':
+            return member_file
+
+        return io.TextIOWrapper(member_file, encoding='utf-8')
+
+    def close(self):
+        self.zip_file.close()
+
+
+def is_archive(path):
+    """Return ``True`` if ``path`` is a batch archive.
+
+    Parameters
+    ----------
+    path : str
+        the path to check.
+
+    Returns
+    -------
+    bool
+        ``True`` if ``path`` is a ZIP file, otherwise ``False``.
+    """
+    return os.path.isfile(path) and zipfile.is_zipfile(path)
@@ -0,0 +1,165 @@
+"""Utilities for working with batch directories."""
+
+import json
+import logging
+import os
+
+from amti import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_sharded(batch_dir):
+    """Return ``True`` if ``batch_dir`` is a sharded batch.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the batch directory.
+
+    Returns
+    -------
+    bool
+        ``True`` if ``batch_dir`` is split into shards, otherwise
+        ``False``.
+    """
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    shard_manifest_file_name, _ = batch_dir_subpaths['shard_manifest']
+
+    return os.path.isfile(os.path.join(batch_dir, shard_manifest_file_name))
+
+
+def get_shard_dirs(batch_dir):
+    """Return the paths to the shards of ``batch_dir``.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the batch directory.
+
+    Returns
+    -------
+    List[str]
+        the paths to the directories for each of the batch's shards, in
+        order. If the batch isn't sharded, the list contains only
+        ``batch_dir``.
+    """
+    if not is_sharded(batch_dir):
+        return [batch_dir]
+
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    shard_manifest_file_name, _ = batch_dir_subpaths['shard_manifest']
+
+    shard_manifest_path = os.path.join(batch_dir, shard_manifest_file_name)
+    with open(shard_manifest_path, 'r') as shard_manifest_file:
+        shard_manifest = json.load(shard_manifest_file)
+
+    return [
+        os.path.join(batch_dir, shard_path)
+        for shard_path in shard_manifest['shards']
+    ]
+
+
+def read_upload_journal(journal_path):
+    """Return the HIT Type ID and HITs recorded in an upload journal.
+
+    Parameters
+    ----------
+    journal_path : str
+        the path to the upload journal.
+
+    Returns
+    -------
+    hittype_id : Optional[str]
+        the HIT Type ID recorded in the journal, or ``None`` if the
+        journal doesn't exist or records no HIT Type.
+    line_hit_ids : Dict[int, str]
+        a dictionary mapping data line numbers to the IDs of the HITs
+        created for them.
+    """
+    hittype_id = None
+    line_hit_ids = {}
+
+    if not os.path.isfile(journal_path):
+        return hittype_id, line_hit_ids
+
+    with open(journal_path, 'r') as journal_file:
+        for i, ln in enumerate(journal_file):
+            try:
+                entry = json.loads(ln)
+            except ValueError:
+                # the process may have died midway through writing the
+                # last entry, in which case that HIT will be recovered
+                # through its request token.
+                logger.warning(
+                    f'Line {i+1} in {journal_path} is corrupt. Skipping.')
+                continue
+
+            if 'hittype_id' in entry:
+                hittype_id = entry['hittype_id']
+            else:
+                line_hit_ids[entry['line']] = entry['hit_id']
+
+    return hittype_id, line_hit_ids
+
+
+def get_unuploaded_shard_dirs(batch_dir):
+    """Return the shards of ``batch_dir`` whose upload hasn't finished.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the batch directory.
+
+    Returns
+    -------
+    List[str]
+        the paths to the directories for each of the batch's shards that
+        haven't been fully uploaded, in order. If the batch isn't
+        sharded, the list contains ``batch_dir`` if it hasn't been fully
+        uploaded.
+    """
+    return [
+        shard_dir
+        for shard_dir in get_shard_dirs(batch_dir)
+        if os.path.isfile(
+            os.path.join(shard_dir, settings.UPLOAD_PENDING_FILE_NAME))
+    ]
+
+
+def get_incomplete_shard_dirs(batch_dir):
+    """Return the shards of ``batch_dir`` with HITs that aren't saved.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the batch directory.
+
+    Returns
+    -------
+    List[str]
+        the paths to the directories for each of the batch's shards that
+        have been uploaded but not yet saved, in order. If the batch
+        isn't sharded, the list contains ``batch_dir`` if it has been
+        uploaded but not yet saved.
+
+    Raises
+    ------
+    ValueError
+        if any of the batch's shards hasn't been fully uploaded, since
+        such a shard has no HITs to track yet but isn't saved either.
+    """
+    unuploaded_shard_dirs = get_unuploaded_shard_dirs(batch_dir)
+    if unuploaded_shard_dirs:
+        raise ValueError(
+            f'{len(unuploaded_shard_dirs)} shards of {batch_dir} haven\'t'
+            f' been fully uploaded: {", ".join(unuploaded_shard_dirs)}.'
+            f' Please resume the upload with create-batch --resume first.')
+
+    return [
+        shard_dir
+        for shard_dir in get_shard_dirs(batch_dir)
+        if os.path.isfile(
+            os.path.join(shard_dir, settings.INCOMPLETE_FILE_NAME))
+    ]
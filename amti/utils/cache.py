@@ -0,0 +1,230 @@
+"""Utilities for caching the statuses of HITs in a batch.
+
+Each (unsharded) batch directory may hold a status cache recording the
+last known status of each of its HITs and when that status was fetched.
+Statuses in ``settings.TERMINAL_HIT_STATUSES`` can't change without the
+requester acting on the HIT, so they're trusted regardless of their age;
+other statuses are only trusted while they're younger than a maximum
+age.
+
+Updates to the cache read, modify and then replace it, so they hold an
+exclusive lock on a separate lock file while doing so. Locking uses
+``fcntl``, and is skipped on platforms without it.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from amti import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def _lock_status_cache(batch_dir):
+    """Hold an exclusive lock on the status cache for ``batch_dir``."""
+    if fcntl is None:
+        yield
+        return
+
+    lock_path = os.path.join(batch_dir, settings.STATUS_CACHE_LOCK_FILE_NAME)
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def read_status_cache(batch_dir):
+    """Return the status cache for ``batch_dir``.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the (unsharded) batch directory.
+
+    Returns
+    -------
+    Dict[str, Dict]
+        a dictionary mapping HIT IDs to dictionaries with ``"status"``
+        and ``"fetched_at"`` keys, holding the HIT's last known status
+        and the time (in seconds since the epoch) it was fetched. Empty
+        if the batch has no status cache.
+    """
+    status_cache_path = os.path.join(
+        batch_dir, settings.STATUS_CACHE_FILE_NAME)
+
+    if not os.path.isfile(status_cache_path):
+        return {}
+
+    with open(status_cache_path, 'r') as status_cache_file:
+        return json.load(status_cache_file)['hits']
+
+
+def write_status_cache(batch_dir, status_cache):
+    """Write ``status_cache`` as the status cache for ``batch_dir``.
+
+    The file is replaced atomically, so readers never see a partial
+    cache. To modify the cache, use ``update_status_cache`` or
+    ``merge_status_updates``, which lock it while doing so.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the (unsharded) batch directory.
+    status_cache : Dict[str, Dict]
+        the status cache, as returned by ``read_status_cache``.
+
+    Returns
+    -------
+    None.
+    """
+    status_cache_path = os.path.join(
+        batch_dir, settings.STATUS_CACHE_FILE_NAME)
+
+    tmp_path = f'{status_cache_path}.tmp'
+    with open(tmp_path, 'w') as status_cache_file:
+        json.dump({'hits': status_cache}, status_cache_file)
+    os.replace(tmp_path, status_cache_path)
+
+
+def get_cached_statuses(batch_dir, hit_ids, max_age=0.):
+    """Return the cached statuses for ``hit_ids`` that are still fresh.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the (unsharded) batch directory.
+    hit_ids : List[str]
+        the IDs of the HITs to look up.
+    max_age : float
+        the age, in seconds, below which non-terminal statuses are
+        trusted. With the default of ``0``, only terminal statuses are
+        returned.
+
+    Returns
+    -------
+    Dict[str, str]
+        a dictionary mapping HIT IDs to their cached statuses, for the
+        HITs in ``hit_ids`` with a fresh cached status.
+    """
+    status_cache = read_status_cache(batch_dir)
+    now = time.time()
+
+    cached_statuses = {}
+    for hit_id in hit_ids:
+        entry = status_cache.get(hit_id)
+        if entry is None:
+            continue
+        if entry['status'] in settings.TERMINAL_HIT_STATUSES \
+           or now - entry['fetched_at'] < max_age:
+            cached_statuses[hit_id] = entry['status']
+
+    return cached_statuses
+
+
+def update_status_cache(batch_dir, hit_statuses, fetched_at=None):
+    """Record ``hit_statuses`` in the status cache for ``batch_dir``.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the (unsharded) batch directory.
+    hit_statuses : Dict[str, Optional[str]]
+        a dictionary mapping HIT IDs to their statuses. HITs mapped to
+        ``None`` are removed from the cache, for example after an action
+        changed their status.
+    fetched_at : Optional[float]
+        the time, in seconds since the epoch, at which the statuses were
+        fetched, or ``None`` to use the current time. Defaults to
+        ``None``.
+
+    Returns
+    -------
+    None.
+    """
+    if not hit_statuses:
+        return
+
+    fetched_at = time.time() if fetched_at is None else fetched_at
+
+    with _lock_status_cache(batch_dir):
+        status_cache = read_status_cache(batch_dir)
+        for hit_id, hit_status in hit_statuses.items():
+            if hit_status is None:
+                status_cache.pop(hit_id, None)
+            else:
+                status_cache[hit_id] = {
+                    'status': hit_status,
+                    'fetched_at': fetched_at
+                }
+
+        write_status_cache(batch_dir, status_cache)
+
+    logger.debug(
+        f'Updated the cached status of {len(hit_statuses)} HITs in'
+        f' {batch_dir}.')
+
+
+def merge_status_updates(batch_dir, status_updates):
+    """Merge timestamped status updates into the cache for ``batch_dir``.
+
+    Unlike ``update_status_cache``, each update carries the time its
+    status was observed, and updates older than the cached status are
+    ignored, so updates can be merged in any order. Since MTurk's event
+    timestamps only have a resolution of one second, updates from the
+    same second as the cached status are applied.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the (unsharded) batch directory.
+    status_updates : Dict[str, Tuple[Optional[str], float]]
+        a dictionary mapping HIT IDs to their new status and the time
+        (in seconds since the epoch) at which it was observed. A status
+        of ``None`` removes the HIT from the cache.
+
+    Returns
+    -------
+    Dict[str, Optional[str]]
+        a dictionary mapping the HIT IDs whose updates were applied to
+        their new status.
+    """
+    if not status_updates:
+        return {}
+
+    with _lock_status_cache(batch_dir):
+        status_cache = read_status_cache(batch_dir)
+
+        applied_updates = {}
+        for hit_id, (hit_status, observed_at) in status_updates.items():
+            entry = status_cache.get(hit_id)
+            if entry is not None and observed_at < int(entry['fetched_at']):
+                continue
+
+            if hit_status is None:
+                status_cache.pop(hit_id, None)
+            else:
+                status_cache[hit_id] = {
+                    'status': hit_status,
+                    'fetched_at': observed_at
+                }
+            applied_updates[hit_id] = hit_status
+
+        write_status_cache(batch_dir, status_cache)
+
+    logger.debug(
+        f'Merged {len(applied_updates)} of {len(status_updates)} status'
+        f' updates into {batch_dir}.')
+
+    return applied_updates
@@ -0,0 +1,43 @@
+"""Utilities for running work concurrently."""
+
+import collections
+
+
+def bounded_map(executor, fn, iterable, max_pending):
+    """Yield futures for ``fn`` applied to each item of ``iterable``.
+
+    Submit ``fn(item)`` to ``executor`` for every item in ``iterable``,
+    yielding the resulting futures in the same order as the items. At
+    most ``max_pending`` futures are outstanding at once, so
+    ``iterable`` is consumed lazily and arbitrarily long inputs can be
+    processed in bounded memory. Unlike ``executor.map``, exceptions are
+    not raised here; callers should inspect each future themselves.
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        the executor on which to run ``fn``.
+    fn : Callable
+        the function to apply to each item.
+    iterable : Iterable
+        the items to which ``fn`` should be applied.
+    max_pending : int
+        the maximum number of submitted futures that have not yet been
+        yielded.
+
+    Returns
+    -------
+    Iterator[concurrent.futures.Future]
+        the futures for each item, in the order of ``iterable``.
+    """
+    if max_pending < 1:
+        raise ValueError('max_pending must be at least 1.')
+
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft()
+
+    while pending:
+        yield pending.popleft()
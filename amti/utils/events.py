@@ -0,0 +1,281 @@
+"""Utilities for receiving MTurk event notifications.
+
+MTurk can notify requesters of events, like ``AssignmentSubmitted`` or
+``HITReviewable``, by sending notification documents to Amazon SNS or
+SQS. An *event source* is an iterable yielding lists of events as they
+arrive. When a source is idle it yields an empty list, so that
+consumers can check whether they're done. A source may also have an
+``acknowledge`` method, which consumers call once they've persisted
+everything done with the events yielded so far, so that the source can
+discard them. Two sources are provided:
+
+- ``webhook_events`` runs an HTTP server accepting notifications, either
+  as SNS deliveries to an HTTP(S) subscription or as raw documents.
+- ``queue_dir_events`` reads notification documents from a directory,
+  one JSON file per document, for example an SQS queue drained to disk.
+
+Any other iterable with the same behavior can be used as a source.
+"""
+
+import calendar
+import http.server
+import json
+import logging
+import os
+import queue
+import socketserver
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_event_message(body):
+    """Return the events in a notification message.
+
+    Parameters
+    ----------
+    body : Union[str, bytes]
+        the message's body: either an event notification document, or an
+        SNS message wrapping one.
+
+    Returns
+    -------
+    List[Dict]
+        the events in the message. SNS messages other than notifications
+        (for example, subscription confirmations) hold no events.
+
+    Raises
+    ------
+    ValueError
+        if the message isn't valid JSON.
+    """
+    message = json.loads(body)
+
+    if 'Type' in message:
+        # an SNS message
+        if message['Type'] == 'SubscriptionConfirmation':
+            _confirm_subscription(message)
+            return []
+        if message['Type'] != 'Notification':
+            return []
+        message = json.loads(message['Message'])
+
+    return message.get('Events', [])
+
+
+def _confirm_subscription(message):
+    """Confirm an SNS subscription, if the request came from AWS."""
+    subscribe_url = message.get('SubscribeURL', '')
+    parsed_subscribe_url = urllib.parse.urlparse(subscribe_url)
+    hostname = parsed_subscribe_url.hostname or ''
+    if parsed_subscribe_url.scheme != 'https' \
+       or not hostname.endswith('.amazonaws.com'):
+        logger.warning(
+            f'Ignoring a subscription confirmation for'
+            f' {message.get("TopicArn")} with an unexpected URL:'
+            f' {subscribe_url}')
+        return
+
+    with urllib.request.urlopen(subscribe_url, timeout=10) as response:
+        response.read()
+
+    logger.info(f'Confirmed the subscription to {message.get("TopicArn")}.')
+
+
+def parse_event_timestamp(event):
+    """Return the time ``event`` occurred, in seconds since the epoch.
+
+    Parameters
+    ----------
+    event : Dict
+        an event from a notification document.
+
+    Returns
+    -------
+    float
+        the time at which the event occurred.
+    """
+    # MTurk's timestamps look like 2018-01-09T19:43:08Z, sometimes with
+    # fractional seconds.
+    timestamp, _, fraction = event['EventTimestamp'].rstrip('Z')\
+        .partition('.')
+
+    return calendar.timegm(time.strptime(timestamp, '%Y-%m-%dT%H:%M:%S')) \
+        + float(f'0.{fraction or 0}')
+
+
+class _WebhookRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Put the events posted to the webhook on ``self.server.events``."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        content_length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(content_length)
+
+        try:
+            events = parse_event_message(body)
+        except (ValueError, KeyError) as error:
+            logger.warning(f'Ignoring an invalid notification: {error}')
+            status = 400
+        else:
+            if events:
+                self.server.events.put(events)
+            status = 200
+
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(f'{self.address_string()} - {format % args}')
+
+
+class _ThreadingHTTPServer(
+        socketserver.ThreadingMixIn,
+        http.server.HTTPServer):
+    daemon_threads = True
+
+
+def webhook_events(host='127.0.0.1', port=0, idle_timeout=1.):
+    """Yield the events posted to a local webhook.
+
+    The webhook runs on a background thread until the generator is
+    closed.
+
+    Parameters
+    ----------
+    host : str
+        the host on which to listen. Defaults to ``"127.0.0.1"``.
+    port : int
+        the port on which to listen, or ``0`` to pick a free port.
+        Defaults to ``0``.
+    idle_timeout : float
+        the number of seconds to wait for events before yielding an
+        empty list. Defaults to ``1``.
+
+    Returns
+    -------
+    Iterator[List[Dict]]
+        the events in each notification posted to the webhook, and
+        empty lists when no events arrived for ``idle_timeout`` seconds.
+    """
+    server = _ThreadingHTTPServer((host, port), _WebhookRequestHandler)
+    server.events = queue.Queue()
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    logger.info(
+        f'Receiving events at http://{host}:{server.server_address[1]}.')
+
+    try:
+        while True:
+            try:
+                yield server.events.get(timeout=idle_timeout)
+            except queue.Empty:
+                yield []
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class _QueueDirEvents:
+    """The event source returned by ``queue_dir_events``."""
+
+    def __init__(self, queue_dir, follow, poll_interval):
+        self.queue_dir = queue_dir
+        self.follow = follow
+        self.poll_interval = poll_interval
+
+        # the documents whose events were yielded but not acknowledged.
+        self._delivered_paths = []
+
+    def __iter__(self):
+        while True:
+            delivered_paths = set(self._delivered_paths)
+            file_paths = [
+                os.path.join(self.queue_dir, file_name)
+                for file_name in sorted(os.listdir(self.queue_dir))
+                if file_name.endswith('.json')
+                and not file_name.startswith('.')
+            ]
+
+            yielded_events = False
+            for file_path in file_paths:
+                if file_path in delivered_paths:
+                    continue
+
+                with open(file_path, 'r') as event_file:
+                    body = event_file.read()
+                try:
+                    events = parse_event_message(body)
+                except (ValueError, KeyError) as error:
+                    invalid_file_path = f'{file_path}.invalid'
+                    logger.warning(
+                        f'Moving the invalid notification {file_path} to'
+                        f' {invalid_file_path}: {error}')
+                    os.replace(file_path, invalid_file_path)
+                    continue
+
+                self._delivered_paths.append(file_path)
+                yielded_events = True
+                yield events
+
+            if not self.follow:
+                return
+
+            if not yielded_events:
+                yield []
+            time.sleep(self.poll_interval)
+
+    def acknowledge(self):
+        """Remove the documents whose events have been yielded."""
+        for file_path in self._delivered_paths:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+        self._delivered_paths = []
+
+    def close(self):
+        pass
+
+
+def queue_dir_events(queue_dir, follow=False, poll_interval=1.):
+    """Yield the events from the notification documents in ``queue_dir``.
+
+    Documents are read in order of their file names. Each document is
+    removed when the consumer calls the source's ``acknowledge`` method
+    after handling its events, so a document whose events weren't
+    persisted is read again next time. Invalid documents are renamed
+    with an ``.invalid`` suffix. Files whose names start with ``.`` or
+    don't end in ``.json`` are ignored, so writers can create documents
+    atomically by renaming temporary files.
+
+    Parameters
+    ----------
+    queue_dir : str
+        the path to the directory holding the documents.
+    follow : bool
+        if ``True``, keep waiting for new documents instead of stopping
+        once the directory is empty. Defaults to ``False``.
+    poll_interval : float
+        the number of seconds to wait between checks for new documents
+        when following the directory. Defaults to ``1``.
+
+    Returns
+    -------
+    Iterable[List[Dict]]
+        the events from each document, and, when following the
+        directory, empty lists when there are no new documents. The
+        iterable has an ``acknowledge`` method and a ``close`` method.
+    """
+    return _QueueDirEvents(
+        queue_dir=queue_dir,
+        follow=follow,
+        poll_interval=poll_interval)
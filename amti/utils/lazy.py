@@ -0,0 +1,97 @@
+"""Utilities for importing modules and commands lazily.
+
+Most ``amti`` commands only need a few of its modules, and some of its
+dependencies (like ``boto3``) are slow to import. So, packages import
+their submodules and the CLI imports its subcommands on first use.
+"""
+
+import importlib
+import sys
+
+import click
+
+
+def lazy_submodules(package_name, submodule_names):
+    """Return module ``__getattr__`` and ``__dir__`` importing submodules.
+
+    Assign the returned functions to ``__getattr__`` and ``__dir__`` in a
+    package's ``__init__.py`` so that its submodules are imported the
+    first time they're accessed as attributes (see PEP 562).
+
+    Parameters
+    ----------
+    package_name : str
+        the name of the package, i.e. its ``__name__``.
+    submodule_names : List[str]
+        the names of the package's submodules.
+
+    Returns
+    -------
+    Tuple[Callable, Callable]
+        the package's ``__getattr__`` and ``__dir__`` functions.
+    """
+    submodule_names = frozenset(submodule_names)
+
+    def __getattr__(name):
+        if name not in submodule_names:
+            raise AttributeError(
+                f'module {package_name!r} has no attribute {name!r}')
+
+        # importing the submodule also sets it as an attribute on the
+        # package, so this function is only called once per submodule.
+        return importlib.import_module(f'{package_name}.{name}')
+
+    def __dir__():
+        return sorted(
+            set(vars(sys.modules[package_name])) | submodule_names)
+
+    return __getattr__, __dir__
+
+
+def import_object(import_path):
+    """Return the object at ``import_path``.
+
+    Parameters
+    ----------
+    import_path : str
+        the path to the object, as ``"package.module:attribute"``.
+
+    Returns
+    -------
+    Any
+        the object at ``import_path``.
+    """
+    module_name, attribute_name = import_path.split(':')
+
+    return getattr(importlib.import_module(module_name), attribute_name)
+
+
+class LazyGroup(click.Group):
+    """A click group that imports its subcommands when they're used.
+
+    Parameters
+    ----------
+    lazy_subcommands : Dict[str, str]
+        a mapping from subcommand names to the import paths of the
+        subcommands, as ``"package.module:attribute"``.
+    *args, **kwargs
+        the other arguments for ``click.Group``.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return sorted(
+            set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands \
+           and cmd_name in self.lazy_subcommands:
+            self.add_command(
+                import_object(self.lazy_subcommands[cmd_name]),
+                name=cmd_name)
+
+        return super().get_command(ctx, cmd_name)
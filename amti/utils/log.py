@@ -4,7 +4,9 @@ amti.utils.logging
 Utilities for logging.
 """
 
+import functools
 import logging
+import os
 import subprocess
 import sys
 
@@ -48,18 +50,24 @@ def config_logging(log_level, file_path=None):
             level=log_level)
 
 
+@functools.lru_cache(maxsize=None)
 def check_git_installed():
     """Return ``True`` if git is installed, otherwise return ``False``.
 
+    The result is cached, so git is only run once per process.
+
     Returns
     -------
     bool
         ``True`` if git is installed, ``False`` otherwise.
     """
-    process = subprocess.run(
-        ['git', '--version'],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL)
+    try:
+        process = subprocess.run(
+            ['git', '--version'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL)
+    except OSError:
+        return False
 
     return process.returncode == 0
 
@@ -69,7 +77,7 @@ def get_current_commit():
 
     Return the current commit of the current directory. If the current
     directory is not a git repo or if git is not installed then return
-    ``None``.
+    ``None``. The commit is looked up once per directory and process.
 
     Returns
     -------
@@ -78,22 +86,27 @@ def get_current_commit():
         ``None`` if the current directory is not a git repo or git is
         not installed.
     """
+    return _get_commit(os.getcwd())
+
+
+@functools.lru_cache(maxsize=None)
+def _get_commit(directory):
+    """Return the current commit of ``directory``."""
+    if not check_git_installed():
+        return None
+
     process = subprocess.run(
         ['git', 'rev-parse', '--verify', 'HEAD'],
+        cwd=directory,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE)
 
-    git_installed = check_git_installed()
+    if b'fatal: not a git repository' in process.stderr.lower():
+        return None
 
-    if not git_installed:
-        current_commit = None
-    elif b'fatal: not a git repository' in process.stderr.lower():
-        current_commit = None
-    else:
-        process.check_returncode()
-        current_commit = process.stdout.decode('utf-8').rstrip()
+    process.check_returncode()
 
-    return current_commit
+    return process.stdout.decode('utf-8').rstrip()
 
 
 def is_repo_clean():
@@ -111,16 +124,15 @@ def is_repo_clean():
         and ``None`` if the current working directory is not a git repo
         or if git is not installed.
     """
+    if not check_git_installed():
+        return None
+
     process = subprocess.run(
         ['git', 'status', '--porcelain'],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE)
 
-    git_installed = check_git_installed()
-
-    if not git_installed:
-        clean_repo = None
-    elif b'fatal: not a git repository' in process.stderr.lower():
+    if b'fatal: not a git repository' in process.stderr.lower():
         clean_repo = None
     else:
         process.check_returncode()
@@ -0,0 +1,378 @@
+"""Utilities for collecting and exporting metrics.
+
+``amti`` records metrics in a process-wide registry: counters, and
+histograms of durations. Every MTurk client created by ``amti`` records
+its calls (see ``install_metrics``), and the main local stages record
+how long they take using ``timer``. The registry can be written out as
+JSON or in the Prometheus text format with ``write_metrics``.
+"""
+
+import bisect
+import collections
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+from botocore import retryhandler
+
+from amti import settings
+from amti.utils import ratelimit
+
+
+logger = logging.getLogger(__name__)
+
+
+METRICS_FORMATS = [
+    'json',
+    'prometheus'
+]
+"""The formats in which metrics can be written."""
+
+
+MTURK_REQUESTS = 'amti_mturk_requests_total'
+MTURK_REQUEST_ERRORS = 'amti_mturk_request_errors_total'
+MTURK_ATTEMPTS = 'amti_mturk_attempts_total'
+MTURK_THROTTLES = 'amti_mturk_throttles_total'
+MTURK_REQUEST_DURATION = 'amti_mturk_request_duration_seconds'
+STAGE_DURATION = 'amti_stage_duration_seconds'
+
+DESCRIPTIONS = {
+    MTURK_REQUESTS: 'MTurk API calls, by operation.',
+    MTURK_REQUEST_ERRORS:
+        'MTurk API calls that failed after any retries, by operation and'
+        ' error code.',
+    MTURK_ATTEMPTS:
+        'HTTP requests sent for MTurk API calls, including retries, by'
+        ' operation.',
+    MTURK_THROTTLES: 'MTurk requests that were throttled, by operation.',
+    MTURK_REQUEST_DURATION:
+        'The duration of MTurk API calls, including retries, by'
+        ' operation.',
+    STAGE_DURATION: 'The duration of local processing stages, by stage.'
+}
+"""Descriptions of the metrics ``amti`` records."""
+
+
+class _Histogram:
+    """A histogram of observations, with cumulative buckets."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.
+
+    def observe(self, value):
+        # only the first bucket holding the value is incremented here;
+        # counts are accumulated when the histogram is exported.
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            self.bucket_counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        counts = []
+        total = 0
+        for bucket_count in self.bucket_counts:
+            total += bucket_count
+            counts.append(total)
+
+        return counts
+
+
+class MetricsRegistry:
+    """A thread-safe collection of counters and histograms.
+
+    Metrics are identified by a name and a set of labels, passed as
+    keyword arguments.
+    """
+
+    def __init__(self):
+        self.counters = collections.defaultdict(float)
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        """Add ``value`` to the counter ``name`` with ``labels``."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += value
+
+    def observe(self, name, value, **labels):
+        """Record ``value`` in the histogram ``name`` with ``labels``."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = _Histogram(
+                    settings.METRICS_DURATION_BUCKETS)
+            self.histograms[key].observe(value)
+
+    def to_json(self):
+        """Return the metrics as a JSON serializable dictionary."""
+        with self.lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'histograms': [
+                    {
+                        'name': name,
+                        'labels': dict(labels),
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'buckets': {
+                            str(bucket): count
+                            for bucket, count in zip(
+                                histogram.buckets,
+                                histogram.cumulative_counts())
+                        }
+                    }
+                    for (name, labels), histogram
+                    in sorted(self.histograms.items())
+                ]
+            }
+
+    def to_prometheus(self):
+        """Return the metrics in the Prometheus text format."""
+        def format_labels(labels):
+            if not labels:
+                return ''
+            return '{' + ','.join(
+                f'{key}="{_escape_label(value)}"'
+                for key, value in labels) + '}'
+
+        lines = []
+        with self.lock:
+            counters = collections.defaultdict(list)
+            for (name, labels), value in self.counters.items():
+                counters[name].append((labels, value))
+            for name, samples in sorted(counters.items()):
+                lines.append(f'# HELP {name} {DESCRIPTIONS.get(name, name)}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(samples):
+                    lines.append(
+                        f'{name}{format_labels(labels)}'
+                        f' {_format_value(value)}')
+
+            histograms = collections.defaultdict(list)
+            for (name, labels), histogram in self.histograms.items():
+                histograms[name].append((labels, histogram))
+            for name, samples in sorted(histograms.items()):
+                lines.append(f'# HELP {name} {DESCRIPTIONS.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(
+                        samples, key=lambda sample: sample[0]):
+                    for bucket, count in zip(
+                            histogram.buckets,
+                            histogram.cumulative_counts()):
+                        bucket_labels = labels + (('le', f'{bucket:g}'),)
+                        lines.append(
+                            f'{name}_bucket{format_labels(bucket_labels)}'
+                            f' {count}')
+                    bucket_labels = labels + (('le', '+Inf'),)
+                    lines.append(
+                        f'{name}_bucket{format_labels(bucket_labels)}'
+                        f' {histogram.count}')
+                    lines.append(
+                        f'{name}_sum{format_labels(labels)}'
+                        f' {_format_value(histogram.sum)}')
+                    lines.append(
+                        f'{name}_count{format_labels(labels)}'
+                        f' {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value)\
+        .replace('\\', '\\\\')\
+        .replace('\n', '\\n')\
+        .replace('"', '\\"')
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+@functools.lru_cache(maxsize=None)
+def get_registry():
+    """Return the metrics registry shared across the process.
+
+    Returns
+    -------
+    MetricsRegistry
+        the shared metrics registry.
+    """
+    return MetricsRegistry()
+
+
+def increment(name, value=1, **labels):
+    """Add ``value`` to the shared counter ``name`` with ``labels``."""
+    get_registry().increment(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    """Record ``value`` in the shared histogram ``name`` with ``labels``."""
+    get_registry().observe(name, value, **labels)
+
+
+@contextlib.contextmanager
+def timer(stage):
+    """Time a block of code as an observation of the stage ``stage``.
+
+    Parameters
+    ----------
+    stage : str
+        the name of the stage, for example ``"render"``.
+
+    Returns
+    -------
+    ContextManager
+        a context manager timing the block it wraps.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_registry().observe(
+            STAGE_DURATION, time.perf_counter() - start, stage=stage)
+
+
+def install_metrics(client, registry=None):
+    """Record metrics for every call ``client`` makes.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    registry : Optional[MetricsRegistry]
+        the registry in which to record metrics, or ``None`` to use the
+        one shared across the process. Defaults to ``None``.
+
+    Returns
+    -------
+    None.
+    """
+    registry = registry or get_registry()
+
+    api_to_method = {
+        api_name: method_name
+        for method_name, api_name in client.meta.method_to_api_mapping.items()
+    }
+
+    def before_call(model, context, **kwargs):
+        context['amti_metrics_start'] = time.perf_counter()
+
+    def record_call(model, context, error_code):
+        operation_name = api_to_method.get(model.name, model.name)
+        registry.increment(MTURK_REQUESTS, operation=operation_name)
+        if error_code is not None:
+            registry.increment(
+                MTURK_REQUEST_ERRORS,
+                operation=operation_name,
+                code=error_code)
+        start = context.get('amti_metrics_start')
+        if start is not None:
+            registry.observe(
+                MTURK_REQUEST_DURATION,
+                time.perf_counter() - start,
+                operation=operation_name)
+
+    def after_call(model, context, http_response, parsed, **kwargs):
+        # after-call fires once retries are done, whenever a response was
+        # received, including error responses.
+        if 200 <= http_response.status_code < 300:
+            error_code = None
+        else:
+            error_code = parsed.get('Error', {}).get('Code') \
+                or str(http_response.status_code)
+        record_call(model, context, error_code)
+
+    # botocore retries requests that failed without a response only for
+    # connection errors, and only up to the maximum number of attempts.
+    retries = client.meta.config.retries or {}
+    max_attempts = retries.get('total_max_attempts') \
+        or retries.get('max_attempts', settings.MAX_ATTEMPTS) + 1
+    retried_exceptions = tuple(
+        retryhandler.EXCEPTION_MAP['GENERAL_CONNECTION_ERROR'])
+
+    def needs_retry(
+            operation,
+            response,
+            attempts,
+            caught_exception,
+            request_dict,
+            **kwargs):
+        operation_name = api_to_method.get(operation.name, operation.name)
+        registry.increment(MTURK_ATTEMPTS, operation=operation_name)
+        if ratelimit.is_throttle(response):
+            registry.increment(MTURK_THROTTLES, operation=operation_name)
+
+        # calls that fail without a response never reach after-call, so
+        # record them here on their last attempt.
+        if caught_exception is not None and (
+                attempts >= max_attempts
+                or not isinstance(caught_exception, retried_exceptions)):
+            record_call(
+                operation,
+                request_dict['context'],
+                type(caught_exception).__name__)
+
+    service_id = client.meta.service_model.service_id.hyphenize()
+    events = client.meta.events
+    events.register(f'before-call.{service_id}', before_call)
+    events.register(f'after-call.{service_id}', after_call)
+    # the legacy retry handler raises the caught exception on the last
+    # attempt, so needs_retry must run before it to see that attempt.
+    events.register_first(f'needs-retry.{service_id}', needs_retry)
+
+
+def write_metrics(path, metrics_format=None, registry=None):
+    """Write the metrics to ``path``.
+
+    The file is written atomically, so that scrapers (for example, the
+    Prometheus node exporter's textfile collector) never see a partial
+    file.
+
+    Parameters
+    ----------
+    path : str
+        the path to which to write the metrics.
+    metrics_format : Optional[str]
+        the format in which to write the metrics, either ``"json"`` or
+        ``"prometheus"``. If ``None``, the format is ``"prometheus"``
+        when ``path`` ends in ``.prom`` and ``"json"`` otherwise.
+        Defaults to ``None``.
+    registry : Optional[MetricsRegistry]
+        the registry to write, or ``None`` to use the one shared across
+        the process. Defaults to ``None``.
+
+    Returns
+    -------
+    None.
+    """
+    registry = registry or get_registry()
+
+    if metrics_format is None:
+        metrics_format = 'prometheus' if path.endswith('.prom') else 'json'
+    if metrics_format not in METRICS_FORMATS:
+        raise ValueError(
+            f'metrics_format must be one of {", ".join(METRICS_FORMATS)}.')
+
+    if metrics_format == 'json':
+        content = json.dumps(registry.to_json(), indent=2) + '\n'
+    else:
+        content = registry.to_prometheus()
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as metrics_file:
+        metrics_file.write(content)
+    os.replace(tmp_path, path)
+
+    logger.debug(f'Wrote metrics to {path}.')
@@ -2,28 +2,75 @@
 
 import logging
 import os
+import threading
 import boto3
 from botocore.config import Config
 
 from typing import Optional
 
 from amti import settings
+from amti.utils import metrics
+from amti.utils import ratelimit
 
 
 logger = logging.getLogger(__name__)
 
 
-def get_mturk_client(env):
+def get_env(live):
+    """Return the environment in which commands should run.
+
+    Parameters
+    ----------
+    live : bool
+        whether the command was asked to run against the live MTurk
+        site.
+
+    Returns
+    -------
+    str
+        ``"live"`` if ``live`` is ``True``, otherwise
+        ``settings.DEFAULT_ENV``.
+    """
+    if live:
+        return 'live'
+
+    env = settings.DEFAULT_ENV
+    if env not in settings.ENVS or env == 'live':
+        raise ValueError(
+            f'AMTI_ENV must be one of'
+            f' {", ".join(e for e in settings.ENVS if e != "live")}.'
+            f' Use --live to run against the live MTurk site.')
+
+    return env
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_mturk_client(env, concurrency=1):
     """Return a client for Mechanical Turk.
 
     Return a client for Mechanical Turk that is configured for ``env``,
-    the environment in which we'd like to run.
+    the environment in which we'd like to run. Requests from the client
+    are limited by the rate limiter shared across the process (see
+    ``amti.utils.ratelimit``) and recorded in the process's metrics (see
+    ``amti.utils.metrics``).
+
+    Clients are cached per environment, AWS profile and region, and are
+    safe to share between threads, so repeated calls reuse the same
+    session, credentials and warm connections. The client's connection
+    pool holds at least ``concurrency`` connections; if a cached client's
+    pool is too small, it's replaced with a larger one.
 
     Parameters
     ----------
     env : str
         The environment to get a client for. The value of ``env`` should
         be one of the supported environments.
+    concurrency : int
+        The number of requests the caller will make concurrently through
+        the client. Defaults to ``1``.
 
     Returns
     -------
@@ -32,25 +79,47 @@ def get_mturk_client(env):
     """
     region_name = settings.ENVS[env]['region_name']
     endpoint_url = settings.ENVS[env]['endpoint_url']
-
     profile = os.getenv('AWS_PROFILE')
-    if profile is None:
-        logger.debug('Creating mturk session with default environment/profile values.')
-        session = boto3.session.Session()
-    else:
-        logger.debug(f'Creating mturk session with profile_name {profile}')
-        session = boto3.session.Session(profile_name=profile)
-
-    logger.debug(
-        f'Creating mturk client in region {region_name} with endpoint'
-        f' {endpoint_url}.')
-    config = Config(retries={'max_attempts': settings.MAX_ATTEMPTS})
-    client = session.client(
-        service_name='mturk',
-        region_name=region_name,
-        endpoint_url=endpoint_url,
-        config=config
-    )
+
+    max_pool_connections = max(concurrency, settings.MIN_POOL_CONNECTIONS)
+
+    key = (env, profile, region_name)
+    with _clients_lock:
+        client, client_pool_connections = _clients.get(key, (None, 0))
+        if client_pool_connections >= max_pool_connections:
+            return client
+
+        if profile is None:
+            logger.debug('Creating mturk session with default environment/profile values.')
+            session = boto3.session.Session()
+        else:
+            logger.debug(f'Creating mturk session with profile_name {profile}')
+            session = boto3.session.Session(profile_name=profile)
+
+        logger.debug(
+            f'Creating mturk client in region {region_name} with endpoint'
+            f' {endpoint_url} and {max_pool_connections} pooled'
+            f' connections.')
+        config_options = {
+            'retries': {'max_attempts': settings.MAX_ATTEMPTS},
+            'max_pool_connections': max_pool_connections
+        }
+        # older versions of botocore, including the one pinned in
+        # requirements.txt, don't support tcp_keepalive.
+        if 'tcp_keepalive' in Config.OPTION_DEFAULTS:
+            config_options['tcp_keepalive'] = True
+        config = Config(**config_options)
+        client = session.client(
+            service_name='mturk',
+            region_name=region_name,
+            endpoint_url=endpoint_url,
+            config=config,
+            **settings.ENVS[env].get('credentials', {})
+        )
+        ratelimit.install_rate_limiter(client)
+        metrics.install_metrics(client)
+
+        _clients[key] = (client, max_pool_connections)
 
     return client
 
@@ -0,0 +1,134 @@
+"""Utilities for profiling ``amti``'s CPU and memory use.
+
+Profilers are only imported and started when requested, so there's no
+overhead when profiling is off.
+"""
+
+import contextlib
+import datetime
+import logging
+import os
+
+from amti import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+PROFILE_MODES = [
+    'cpu',
+    'mem'
+]
+"""The kinds of profiling available."""
+
+PROFILE_FILE_EXTENSIONS = {
+    'cpu': 'pstats',
+    'mem': 'tracemalloc.txt'
+}
+"""The file extension for each kind of profile."""
+
+
+def get_profile_path(mode, command_name, output_dir):
+    """Return the path at which to write a profile.
+
+    Parameters
+    ----------
+    mode : str
+        the kind of profile, one of ``PROFILE_MODES``.
+    command_name : str
+        the name of the profiled command.
+    output_dir : str
+        the directory in which to write the profile.
+
+    Returns
+    -------
+    str
+        the path at which to write the profile.
+    """
+    timestamp = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
+    file_name = settings.PROFILE_FILE_NAME_TEMPLATE.format(
+        command_name=command_name,
+        timestamp=timestamp,
+        extension=PROFILE_FILE_EXTENSIONS[mode])
+
+    return os.path.join(output_dir, file_name)
+
+
+@contextlib.contextmanager
+def profile(mode, output_path):
+    """Profile the block of code this context manager wraps.
+
+    With ``"cpu"``, profile the main thread using ``cProfile`` and write
+    the stats to ``output_path`` in the ``pstats`` format. With
+    ``"mem"``, trace allocations using ``tracemalloc`` and write a report
+    of the peak memory and the ``settings.PROFILE_TOP_N`` lines
+    allocating the most memory to ``output_path``.
+
+    The profile is written even if the block raises an exception.
+
+    Parameters
+    ----------
+    mode : str
+        the kind of profiling to do, one of ``PROFILE_MODES``.
+    output_path : str
+        the path at which to write the profile.
+
+    Returns
+    -------
+    ContextManager
+        a context manager profiling the block it wraps.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(
+            f'mode must be one of {", ".join(PROFILE_MODES)}.')
+
+    if mode == 'cpu':
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(output_path)
+    elif mode == 'mem':
+        import tracemalloc
+
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            _write_memory_report(snapshot, peak, output_path)
+
+    logger.info(f'Wrote {mode} profile to {output_path}.')
+
+
+def _write_memory_report(snapshot, peak, output_path):
+    """Write a report of the top allocations in ``snapshot``."""
+    import tracemalloc
+
+    # leave out allocations made by tracemalloc itself
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__)
+    ])
+    statistics = snapshot.statistics('lineno')
+    total = sum(statistic.size for statistic in statistics)
+
+    with open(output_path, 'w') as output_file:
+        output_file.write(
+            f'Peak traced memory: {peak / 1024:.1f} KiB\n'
+            f'Traced memory at exit: {total / 1024:.1f} KiB\n'
+            f'\n'
+            f'Top {settings.PROFILE_TOP_N} lines by traced memory at'
+            f' exit:\n')
+        for i, statistic in enumerate(
+                statistics[:settings.PROFILE_TOP_N]):
+            frame = statistic.traceback[0]
+            output_file.write(
+                f'#{i + 1}: {frame.filename}:{frame.lineno}:'
+                f' {statistic.size / 1024:.1f} KiB'
+                f' in {statistic.count} blocks\n')
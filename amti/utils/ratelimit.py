@@ -0,0 +1,224 @@
+"""Utilities for rate limiting requests to MTurk.
+
+Every MTurk client created by ``amti`` shares a process-wide
+``RateLimiter``. The limiter keeps a token bucket for each operation,
+and each request (including retries) waits for a token before it's sent.
+When MTurk throttles a request, that operation's rate is cut
+multiplicatively, and each successful request raises it additively back
+towards the operation's budget, so concurrent work settles at the rate
+MTurk will sustain instead of retrying in a storm.
+"""
+
+import collections
+import functools
+import logging
+import threading
+import time
+
+from amti import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """A thread-safe token bucket with an adaptive (AIMD) rate.
+
+    Parameters
+    ----------
+    max_rate : float
+        the budget for the bucket, in requests per second. The bucket
+        starts at, and never exceeds, this rate.
+    """
+
+    def __init__(self, max_rate):
+        if max_rate <= 0:
+            raise ValueError('max_rate must be positive.')
+
+        self.max_rate = max_rate
+        self.min_rate = min(settings.RATE_LIMIT_MIN_RATE, max_rate)
+        self.rate = max_rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        """The number of tokens the bucket can hold."""
+        return max(1., self.rate * settings.RATE_LIMIT_BURST_SECONDS)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1.:
+                    self.tokens -= 1.
+                    return
+                wait = (1. - self.tokens) / self.rate
+            # sleep outside of the lock so other threads can refill.
+            time.sleep(wait)
+
+    def decrease(self):
+        """Cut the rate multiplicatively after being throttled."""
+        with self.lock:
+            self._refill()
+            self.rate = max(
+                self.min_rate,
+                self.rate * settings.RATE_LIMIT_DECREASE_FACTOR)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def increase(self):
+        """Raise the rate additively after a successful request."""
+        with self.lock:
+            self._refill()
+            self.rate = min(
+                self.max_rate,
+                self.rate + settings.RATE_LIMIT_INCREASE_STEP)
+
+
+class RateLimiter:
+    """Per-operation token buckets for MTurk requests.
+
+    Operations are named by their client method names (for example,
+    ``"create_hit_with_hit_type"``). Each operation's budget is read from
+    ``settings.RATE_LIMITS``, falling back to
+    ``settings.RATE_LIMIT_DEFAULT``.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.throttle_counts = collections.Counter()
+        self.lock = threading.Lock()
+
+    def get_bucket(self, operation_name):
+        """Return the token bucket for ``operation_name``."""
+        with self.lock:
+            if operation_name not in self.buckets:
+                self.buckets[operation_name] = TokenBucket(
+                    max_rate=settings.RATE_LIMITS.get(
+                        operation_name, settings.RATE_LIMIT_DEFAULT))
+
+            return self.buckets[operation_name]
+
+    def acquire(self, operation_name):
+        """Block until a request for ``operation_name`` may be sent."""
+        self.get_bucket(operation_name).acquire()
+
+    def record_throttle(self, operation_name):
+        """Record that a request for ``operation_name`` was throttled."""
+        bucket = self.get_bucket(operation_name)
+        bucket.decrease()
+        with self.lock:
+            self.throttle_counts[operation_name] += 1
+
+        logger.debug(
+            f'Request for {operation_name} was throttled. Reducing its'
+            f' rate to {bucket.rate:.2f} requests per second.')
+
+    def record_success(self, operation_name):
+        """Record that a request for ``operation_name`` succeeded."""
+        self.get_bucket(operation_name).increase()
+
+    def get_rates(self):
+        """Return the current rate for each operation used so far."""
+        with self.lock:
+            return {
+                operation_name: bucket.rate
+                for operation_name, bucket in self.buckets.items()
+            }
+
+    def get_throttle_counts(self):
+        """Return the number of throttled requests for each operation."""
+        with self.lock:
+            return dict(self.throttle_counts)
+
+
+@functools.lru_cache(maxsize=None)
+def get_rate_limiter():
+    """Return the rate limiter shared across the process.
+
+    Returns
+    -------
+    RateLimiter
+        the shared rate limiter.
+    """
+    return RateLimiter()
+
+
+def is_throttle(response):
+    """Return ``True`` if a botocore response was a throttling error.
+
+    Parameters
+    ----------
+    response : Optional[Tuple]
+        the ``(http_response, parsed_response)`` pair botocore passes to
+        ``needs-retry`` handlers, or ``None`` if no response was received.
+
+    Returns
+    -------
+    bool
+        ``True`` if the response was a throttling error.
+    """
+    if response is None:
+        return False
+
+    _, parsed_response = response
+    error_code = parsed_response.get('Error', {}).get('Code')
+
+    return error_code in settings.THROTTLING_ERROR_CODES
+
+
+def install_rate_limiter(client, rate_limiter=None):
+    """Limit the rate of the requests ``client`` sends.
+
+    Register handlers on ``client``'s events so that every request it
+    sends, including retries, waits on ``rate_limiter`` and every
+    successful or throttled response adjusts the operation's rate.
+
+    Parameters
+    ----------
+    client : MTurk.Client
+        a boto3 client for MTurk.
+    rate_limiter : Optional[RateLimiter]
+        the rate limiter to use, or ``None`` to use the one shared
+        across the process. Defaults to ``None``.
+
+    Returns
+    -------
+    None.
+    """
+    rate_limiter = rate_limiter or get_rate_limiter()
+
+    # botocore's events name operations by their API names, while budgets
+    # are keyed by client method names.
+    api_to_method = {
+        api_name: method_name
+        for method_name, api_name in client.meta.method_to_api_mapping.items()
+    }
+
+    def before_send(event_name, **kwargs):
+        api_name = event_name.rsplit('.', 1)[-1]
+        rate_limiter.acquire(api_to_method.get(api_name, api_name))
+        # returning None lets botocore send the request as usual.
+
+    def needs_retry(operation, response, caught_exception, **kwargs):
+        method_name = api_to_method.get(operation.name, operation.name)
+        if is_throttle(response):
+            rate_limiter.record_throttle(method_name)
+        elif response is not None and caught_exception is None \
+                and 200 <= response[0].status_code < 300:
+            # other errors say nothing about whether the rate can grow.
+            rate_limiter.record_success(method_name)
+        # returning None leaves the retry decision to botocore.
+
+    service_id = client.meta.service_model.service_id.hyphenize()
+    client.meta.events.register(f'before-send.{service_id}', before_send)
+    client.meta.events.register(f'needs-retry.{service_id}', needs_retry)
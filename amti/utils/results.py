@@ -0,0 +1,792 @@
+"""Utilities for reading and writing the results of a batch.
+
+A batch's results directory holds each saved HIT along with its
+assignments, in one of the layouts in ``settings.RESULTS_LAYOUTS``:
+
+- ``"directories"``: a directory per HIT, holding the HIT in one JSON
+  file and its assignments in a JSON lines file.
+- ``"segments"``: a few append-only JSON lines segment files, each line
+  of which is a record holding a HIT and its assignments, along with an
+  index recording the segment, byte offset and length of each HIT's
+  record and the IDs of its assignments. If a HIT is recorded more than
+  once, its last record is the one that counts.
+
+``ResultsReader`` reads either layout, so code reading results doesn't
+need to know which one a batch uses, and ``BatchReader`` reads a whole
+batch, from its directory or from an archive (see
+``amti.utils.archive``).
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+
+from amti import settings
+from amti.utils import archive
+from amti.utils import metrics
+from amti.utils import serialization
+
+
+logger = logging.getLogger(__name__)
+
+
+def _get_results_paths():
+    """Return the names of the files and directories in results."""
+    _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+    _, results_dir_subpaths = batch_dir_subpaths['results']
+    hit_dir_name, hit_dir_subpaths = results_dir_subpaths['hit_dir']
+    hit_file_name, _ = hit_dir_subpaths['hit']
+    assignments_file_name, _ = hit_dir_subpaths['assignments']
+    index_file_name, _ = results_dir_subpaths['index']
+    segment_file_name, _ = results_dir_subpaths['segment']
+
+    return {
+        'hit_dir': hit_dir_name,
+        'hit': hit_file_name,
+        'assignments': assignments_file_name,
+        'index': index_file_name,
+        'segment': segment_file_name
+    }
+
+
+def get_results_layout(results_dir, source=None):
+    """Return the layout of the results in ``results_dir``.
+
+    Parameters
+    ----------
+    results_dir : str
+        the path to the results directory.
+    source : Optional[Union[FileSystemSource, ArchiveSource]]
+        the source from which to read ``results_dir``, or ``None`` to
+        read it from the file system. See ``amti.utils.archive``.
+        Defaults to ``None``.
+
+    Returns
+    -------
+    Optional[str]
+        the layout of the results (see ``settings.RESULTS_LAYOUTS``), or
+        ``None`` if ``results_dir`` doesn't exist or is empty.
+    """
+    if source is None:
+        source = archive.FileSystemSource()
+
+    if not source.isdir(results_dir) or not source.listdir(results_dir):
+        return None
+
+    index_file_name = _get_results_paths()['index']
+    if source.isfile(os.path.join(results_dir, index_file_name)):
+        return 'segments'
+
+    return 'directories'
+
+
+def write_hit_dir(hit_dir, hit, assignments):
+    """Write a HIT and its assignments to the new directory ``hit_dir``.
+
+    Parameters
+    ----------
+    hit_dir : str
+        the path to the directory to create for the HIT.
+    hit : Dict
+        the HIT, as returned by ``get_hit``.
+    assignments : List[Dict]
+        the HIT's assignments.
+
+    Returns
+    -------
+    None.
+    """
+    results_paths = _get_results_paths()
+
+    os.mkdir(hit_dir)
+
+    hit_file_path = os.path.join(hit_dir, results_paths['hit'])
+    assignments_file_path = os.path.join(
+        hit_dir, results_paths['assignments'])
+
+    logger.debug(f'Writing HIT to {hit_file_path}.')
+    with open(hit_file_path, 'w') as hit_file:
+        json.dump(hit, hit_file, default=serialization.json_helper)
+
+    with open(assignments_file_path, 'w') as assignments_file, \
+            metrics.timer('write_jsonl'):
+        for assignment in assignments:
+            assignments_file.write(
+                json.dumps(
+                    assignment,
+                    default=serialization.json_helper
+                ) + '\n')
+
+
+def read_schema(batch_dir, source=None):
+    """Return the schema recorded for the results in ``batch_dir``.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the (unsharded) batch directory.
+    source : Optional[Union[FileSystemSource, ArchiveSource]]
+        the source from which to read ``batch_dir``, or ``None`` to read
+        it from the file system. See ``amti.utils.archive``. Defaults to
+        ``None``.
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        a dictionary with a ``"fields"`` key listing the form fields
+        found in the saved assignments, in the order they were first
+        seen, and a ``"hit_count"`` key giving the number of saved HITs
+        whose fields are included, or ``None`` if the batch has no
+        schema.
+    """
+    if source is None:
+        source = archive.FileSystemSource()
+
+    schema_path = os.path.join(batch_dir, settings.SCHEMA_FILE_NAME)
+    if not source.isfile(schema_path):
+        return None
+
+    with source.open(schema_path, 'r') as schema_file:
+        return json.load(schema_file)
+
+
+def update_schema(batch_dir, field_names, hit_count):
+    """Add the fields of newly saved HITs to the schema for ``batch_dir``.
+
+    Parameters
+    ----------
+    batch_dir : str
+        the path to the (unsharded) batch directory.
+    field_names : List[str]
+        the form fields found in the newly saved HITs' assignments.
+    hit_count : int
+        the number of newly saved HITs.
+
+    Returns
+    -------
+    None.
+    """
+    schema = read_schema(batch_dir) or {'fields': [], 'hit_count': 0}
+
+    known_field_names = set(schema['fields'])
+    for field_name in field_names:
+        if field_name not in known_field_names:
+            schema['fields'].append(field_name)
+            known_field_names.add(field_name)
+    schema['hit_count'] += hit_count
+
+    schema_path = os.path.join(batch_dir, settings.SCHEMA_FILE_NAME)
+    tmp_path = f'{schema_path}.tmp'
+    with open(tmp_path, 'w') as schema_file:
+        json.dump(schema, schema_file)
+    os.replace(tmp_path, schema_path)
+
+
+class SegmentWriter:
+    """Append HITs and their assignments to segmented results.
+
+    Each writer starts a new segment rather than appending to an
+    existing one, so a record torn by an earlier writer dying midway
+    through a write is never followed by new records. Records are
+    indexed as soon as they're written. ``write`` may be called from
+    several threads at once.
+
+    Parameters
+    ----------
+    results_dir : str
+        the path to the results directory, which is created if it
+        doesn't exist.
+    max_segment_bytes : Optional[int]
+        the size, in bytes, above which to start a new segment, or
+        ``None`` to use ``settings.RESULTS_SEGMENT_MAX_BYTES``. Defaults
+        to ``None``.
+    """
+
+    def __init__(self, results_dir, max_segment_bytes=None):
+        if max_segment_bytes is None:
+            max_segment_bytes = settings.RESULTS_SEGMENT_MAX_BYTES
+
+        results_paths = _get_results_paths()
+
+        self.results_dir = results_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.segment_file_name = results_paths['segment']
+        self.segment_number = 0
+        self.segment_file = None
+        self.lock = threading.Lock()
+
+        os.makedirs(results_dir, exist_ok=True)
+
+        self.index_file = open(
+            os.path.join(results_dir, results_paths['index']), 'a+')
+        # if a writer died midway through writing an entry, start the
+        # new entries on a fresh line.
+        if self.index_file.tell() > 0:
+            self.index_file.seek(self.index_file.tell() - 1)
+            if self.index_file.read(1) != '\n':
+                self.index_file.write('\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start_segment(self):
+        """Close the current segment and start a new one."""
+        if self.segment_file is not None:
+            self.segment_file.close()
+
+        while os.path.exists(os.path.join(
+                self.results_dir,
+                self.segment_file_name.format(
+                    segment_number=self.segment_number))):
+            self.segment_number += 1
+
+        segment_path = os.path.join(
+            self.results_dir,
+            self.segment_file_name.format(
+                segment_number=self.segment_number))
+
+        logger.debug(f'Starting segment {segment_path}.')
+        self.segment_file = open(segment_path, 'xb')
+
+    def write(self, hit, assignments):
+        """Append a HIT and its assignments, and index them.
+
+        Parameters
+        ----------
+        hit : Dict
+            the HIT, as returned by ``get_hit``.
+        assignments : List[Dict]
+            the HIT's assignments.
+
+        Returns
+        -------
+        None.
+        """
+        with metrics.timer('write_jsonl'):
+            record = json.dumps(
+                {'hit': hit, 'assignments': assignments},
+                default=serialization.json_helper
+            ).encode('utf-8') + b'\n'
+
+        with self.lock:
+            if self.segment_file is None \
+               or 0 < self.segment_file.tell() \
+               and self.segment_file.tell() + len(record) \
+               > self.max_segment_bytes:
+                self._start_segment()
+
+            offset = self.segment_file.tell()
+            self.segment_file.write(record)
+            self.segment_file.flush()
+
+            self.index_file.write(json.dumps({
+                'hit_id': hit['HIT']['HITId'],
+                'segment': os.path.basename(self.segment_file.name),
+                'offset': offset,
+                'length': len(record),
+                'assignment_ids': [
+                    assignment['AssignmentId']
+                    for assignment in assignments
+                ]
+            }) + '\n')
+            self.index_file.flush()
+
+    def close(self):
+        """Close the current segment and the index."""
+        if self.segment_file is not None:
+            self.segment_file.close()
+        self.index_file.close()
+
+
+def _read_index(index_path, source):
+    """Return the entries in a segment index, keyed by HIT ID."""
+    index = {}
+    with source.open(index_path, 'r') as index_file:
+        for i, ln in enumerate(index_file):
+            try:
+                entry = json.loads(ln)
+            except ValueError:
+                # a writer may have died midway through writing the last
+                # entry, in which case that HIT wasn't journaled as saved
+                # and will be written again.
+                logger.warning(
+                    f'Line {i+1} in {index_path} is corrupt. Skipping.')
+                continue
+
+            # later records for a HIT supersede earlier ones.
+            index.pop(entry['hit_id'], None)
+            index[entry['hit_id']] = entry
+
+    return index
+
+
+class ResultsReader:
+    """Read the HITs and assignments saved in a results directory.
+
+    Reads results in any layout (see ``settings.RESULTS_LAYOUTS``).
+    Iterating over the reader yields ``(hit, assignments)`` pairs, in
+    which ``hit`` is the HIT as returned by ``get_hit`` and
+    ``assignments`` is the list of its assignments. HITs and assignments
+    can also be looked up by ID, which only reads the requested HIT's
+    record when the results are in segments.
+
+    Parameters
+    ----------
+    results_dir : str
+        the path to the results directory. If it doesn't exist, the
+        reader has no results.
+    source : Optional[Union[FileSystemSource, ArchiveSource]]
+        the source from which to read ``results_dir``, or ``None`` to
+        read it from the file system. See ``amti.utils.archive``.
+        Defaults to ``None``.
+    """
+
+    def __init__(self, results_dir, source=None):
+        if source is None:
+            source = archive.FileSystemSource()
+
+        self.results_dir = results_dir
+        self.source = source
+        self.layout = get_results_layout(results_dir, source=source)
+        self.results_paths = _get_results_paths()
+
+        self._index = None
+        self._assignment_hit_ids = None
+
+    @property
+    def index(self):
+        """The entry for each HIT's record, when the results are segments."""
+        if self._index is None:
+            self._index = _read_index(
+                os.path.join(self.results_dir, self.results_paths['index']),
+                source=self.source)
+
+        return self._index
+
+    def _get_hit_dir(self, hit_id):
+        return os.path.join(
+            self.results_dir,
+            self.results_paths['hit_dir'].format(hit_id=hit_id))
+
+    def hit_ids(self):
+        """Return the IDs of the saved HITs.
+
+        Returns
+        -------
+        List[str]
+            the IDs of the HITs in the results.
+        """
+        if self.layout is None:
+            return []
+
+        if self.layout == 'segments':
+            return list(self.index)
+
+        prefix, suffix = self.results_paths['hit_dir'].split('{hit_id}')
+        return [
+            name[len(prefix):len(name) - len(suffix)]
+            for name in sorted(self.source.listdir(self.results_dir))
+            if name.startswith(prefix)
+            and name.endswith(suffix)
+            and self.source.isfile(os.path.join(
+                self.results_dir, name, self.results_paths['hit']))
+        ]
+
+    def _read_record(self, segment_file, entry):
+        segment_file.seek(entry['offset'])
+        record = json.loads(segment_file.read(entry['length']))
+
+        return record['hit'], record['assignments']
+
+    def _read_hit_dir(self, hit_dir):
+        hit_file_path = os.path.join(hit_dir, self.results_paths['hit'])
+        assignments_file_path = os.path.join(
+            hit_dir, self.results_paths['assignments'])
+
+        with self.source.open(hit_file_path, 'r') as hit_file:
+            hit = json.load(hit_file)
+
+        if not self.source.isfile(assignments_file_path):
+            logger.warning(f'Found HIT but no assignments in {hit_dir}.')
+            return hit, []
+
+        with self.source.open(assignments_file_path, 'r') \
+                as assignments_file:
+            assignments = [
+                json.loads(ln)
+                for ln in assignments_file
+                if ln.strip()
+            ]
+
+        return hit, assignments
+
+    def get_hit(self, hit_id):
+        """Return a saved HIT and its assignments.
+
+        Parameters
+        ----------
+        hit_id : str
+            the ID of the HIT.
+
+        Returns
+        -------
+        hit : Dict
+            the HIT, as returned by ``get_hit``.
+        assignments : List[Dict]
+            the HIT's assignments.
+        """
+        if self.layout == 'segments':
+            if hit_id not in self.index:
+                raise KeyError(hit_id)
+
+            entry = self.index[hit_id]
+            segment_path = os.path.join(self.results_dir, entry['segment'])
+            with self.source.open(segment_path, 'rb') as segment_file:
+                return self._read_record(segment_file, entry)
+
+        hit_dir = self._get_hit_dir(hit_id)
+        if self.layout is None or not self.source.isfile(
+                os.path.join(hit_dir, self.results_paths['hit'])):
+            raise KeyError(hit_id)
+
+        return self._read_hit_dir(hit_dir)
+
+    def get_assignment(self, assignment_id):
+        """Return a saved assignment.
+
+        Parameters
+        ----------
+        assignment_id : str
+            the ID of the assignment.
+
+        Returns
+        -------
+        Dict
+            the assignment.
+        """
+        if self._assignment_hit_ids is None:
+            if self.layout == 'segments':
+                self._assignment_hit_ids = {
+                    assignment_id: hit_id
+                    for hit_id, entry in self.index.items()
+                    for assignment_id in entry['assignment_ids']
+                }
+            else:
+                # without an index, every HIT has to be read.
+                self._assignment_hit_ids = {
+                    assignment['AssignmentId']: hit['HIT']['HITId']
+                    for hit, assignments in self
+                    for assignment in assignments
+                }
+
+        if assignment_id not in self._assignment_hit_ids:
+            raise KeyError(assignment_id)
+
+        _, assignments = self.get_hit(self._assignment_hit_ids[assignment_id])
+        for assignment in assignments:
+            if assignment['AssignmentId'] == assignment_id:
+                return assignment
+
+        raise KeyError(assignment_id)
+
+    def __iter__(self):
+        if self.layout is None:
+            return
+
+        if self.layout == 'segments':
+            # read each segment front to back, skipping superseded
+            # records.
+            segment_entries = {}
+            for entry in self.index.values():
+                segment_entries.setdefault(entry['segment'], []).append(entry)
+
+            for segment in sorted(segment_entries):
+                segment_path = os.path.join(self.results_dir, segment)
+                with self.source.open(segment_path, 'rb') as segment_file:
+                    for entry in sorted(
+                            segment_entries[segment],
+                            key=lambda e: e['offset']):
+                        yield self._read_record(segment_file, entry)
+
+            return
+
+        for hit_id in self.hit_ids():
+            yield self._read_hit_dir(self._get_hit_dir(hit_id))
+
+    def __len__(self):
+        return len(self.hit_ids())
+
+
+class BatchReader:
+    """Read a batch from its directory or from an archive of it.
+
+    Iterating over the reader yields the ``(hit, assignments)`` pairs
+    saved for the batch, shard by shard if it's sharded, as for
+    ``ResultsReader``.
+
+    Parameters
+    ----------
+    batch_path : str
+        the path to the batch directory or to a batch archive (see
+        ``amti.utils.archive``).
+    """
+
+    def __init__(self, batch_path):
+        self.batch_path = batch_path
+        if archive.is_archive(batch_path):
+            self.source = archive.ArchiveSource(batch_path)
+            self.root = ''
+        elif os.path.isdir(batch_path):
+            self.source = archive.FileSystemSource()
+            self.root = batch_path
+        else:
+            raise ValueError(
+                f'{batch_path} is neither a batch directory nor a batch'
+                f' archive.')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the batch's archive, if it has one."""
+        self.source.close()
+
+    @property
+    def batch_id(self):
+        """The UUID for the batch."""
+        _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+        batchid_file_name, _ = batch_dir_subpaths['batchid']
+
+        batchid_file_path = os.path.join(self.root, batchid_file_name)
+        with self.source.open(batchid_file_path, 'r') as batchid_file:
+            return batchid_file.read().strip()
+
+    def shard_paths(self):
+        """Return the paths to the batch's shards within its source.
+
+        Returns
+        -------
+        List[str]
+            the paths to the directories for each of the batch's shards,
+            in order. If the batch isn't sharded, the list contains only
+            the path to the batch itself.
+        """
+        _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+        shard_manifest_file_name, _ = batch_dir_subpaths['shard_manifest']
+
+        shard_manifest_path = os.path.join(
+            self.root, shard_manifest_file_name)
+        if not self.source.isfile(shard_manifest_path):
+            return [self.root]
+
+        with self.source.open(shard_manifest_path, 'r') \
+                as shard_manifest_file:
+            shard_manifest = json.load(shard_manifest_file)
+
+        return [
+            os.path.join(self.root, shard_path)
+            for shard_path in shard_manifest['shards']
+        ]
+
+    def results_readers(self):
+        """Return a ``ResultsReader`` for each of the batch's shards."""
+        _, batch_dir_subpaths = settings.BATCH_DIR_STRUCTURE
+        results_dir_name, _ = batch_dir_subpaths['results']
+
+        return [
+            ResultsReader(
+                os.path.join(shard_path, results_dir_name),
+                source=self.source)
+            for shard_path in self.shard_paths()
+        ]
+
+    def field_names(self):
+        """Return the form fields of the batch's assignments, if known.
+
+        The fields are read from the schema saved with each shard's
+        results (see ``update_schema``), which is only trusted if it
+        accounts for every HIT saved in the shard.
+
+        Returns
+        -------
+        Optional[List[str]]
+            the form fields found in the batch's assignments, in the
+            order they were first seen, or ``None`` if a shard has
+            results but no up-to-date schema.
+        """
+        field_names = []
+        known_field_names = set()
+        for shard_path, results_reader in zip(
+                self.shard_paths(), self.results_readers()):
+            hit_count = len(results_reader)
+            if hit_count == 0:
+                continue
+
+            schema = read_schema(shard_path, source=self.source)
+            if schema is None or schema['hit_count'] != hit_count:
+                return None
+
+            for field_name in schema['fields']:
+                if field_name not in known_field_names:
+                    field_names.append(field_name)
+                    known_field_names.add(field_name)
+
+        return field_names
+
+    def hit_ids(self):
+        """Return the IDs of the HITs saved for the batch."""
+        return [
+            hit_id
+            for results_reader in self.results_readers()
+            for hit_id in results_reader.hit_ids()
+        ]
+
+    def __iter__(self):
+        for results_reader in self.results_readers():
+            yield from results_reader
+
+
+def iter_batch_results(batch_path):
+    """Yield the HITs and assignments saved for a batch.
+
+    Parameters
+    ----------
+    batch_path : str
+        the path to the batch directory or to a batch archive. If the
+        batch is sharded, the results of each shard are read in turn.
+
+    Returns
+    -------
+    Iterator[Tuple[Dict, List[Dict]]]
+        ``(hit, assignments)`` pairs, in which ``hit`` is the HIT as
+        returned by ``get_hit`` and ``assignments`` is the list of its
+        assignments.
+    """
+    with BatchReader(batch_path) as batch_reader:
+        yield from batch_reader
+
+
+def recover_results_dir(results_dir, staging_dir):
+    """Finish or roll back an interrupted conversion of ``results_dir``.
+
+    ``convert_results_dir`` swaps the converted results into place with
+    two renames. If it was interrupted between them, ``results_dir`` is
+    missing and the results are in ``staging_dir`` and the old results
+    directory beside it. This function completes the swap if the
+    converted results are there, and otherwise restores the old results.
+
+    Parameters
+    ----------
+    results_dir : str
+        the path to the results directory.
+    staging_dir : str
+        the path at which the conversion wrote the converted results.
+
+    Returns
+    -------
+    bool
+        ``True`` if an interrupted conversion was recovered, otherwise
+        ``False``.
+    """
+    old_results_dir = f'{staging_dir}.old'
+    if not os.path.exists(old_results_dir):
+        return False
+
+    if not os.path.exists(results_dir):
+        if os.path.exists(staging_dir):
+            # the converted results were complete before the old results
+            # were moved aside.
+            logger.warning(
+                f'Finishing the interrupted conversion of {results_dir}.')
+            os.rename(staging_dir, results_dir)
+        else:
+            logger.warning(
+                f'Rolling back the interrupted conversion of'
+                f' {results_dir}.')
+            os.rename(old_results_dir, results_dir)
+            return True
+    elif os.path.exists(staging_dir):
+        raise ValueError(
+            f'{results_dir}, {staging_dir} and {old_results_dir} all exist,'
+            f' so it\'s unclear which holds the results. Please keep the'
+            f' right one as {results_dir} and remove the others.')
+
+    shutil.rmtree(old_results_dir)
+
+    return True
+
+
+def convert_results_dir(results_dir, layout, staging_dir):
+    """Convert the results in ``results_dir`` to ``layout``.
+
+    The converted results are written to ``staging_dir`` and then moved
+    into place, so ``results_dir`` holds complete results throughout,
+    apart from the moment between two renames. A conversion interrupted
+    in that moment is recovered before anything else is done (see
+    ``recover_results_dir``).
+
+    Parameters
+    ----------
+    results_dir : str
+        the path to the results directory.
+    layout : str
+        the layout to convert to. See ``settings.RESULTS_LAYOUTS``.
+    staging_dir : str
+        the path at which to write the converted results. It must be on
+        the same file system as ``results_dir`` and is replaced if it
+        exists.
+
+    Returns
+    -------
+    int
+        the number of HITs converted, or ``0`` if the results were
+        already in ``layout``.
+    """
+    if layout not in settings.RESULTS_LAYOUTS:
+        raise ValueError(
+            'layout must be one of {layouts}.'.format(
+                layouts=', '.join(settings.RESULTS_LAYOUTS)))
+
+    recover_results_dir(results_dir, staging_dir)
+
+    results_reader = ResultsReader(results_dir)
+    if results_reader.layout in [None, layout]:
+        return 0
+
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+
+    hit_count = 0
+    if layout == 'segments':
+        with SegmentWriter(staging_dir) as segment_writer:
+            for hit, assignments in results_reader:
+                segment_writer.write(hit, assignments)
+                hit_count += 1
+    else:
+        os.mkdir(staging_dir)
+        for hit, assignments in results_reader:
+            write_hit_dir(
+                hit_dir=os.path.join(
+                    staging_dir,
+                    results_reader.results_paths['hit_dir'].format(
+                        hit_id=hit['HIT']['HITId'])),
+                hit=hit,
+                assignments=assignments)
+            hit_count += 1
+
+    old_results_dir = f'{staging_dir}.old'
+    if os.path.exists(old_results_dir):
+        shutil.rmtree(old_results_dir)
+    os.rename(results_dir, old_results_dir)
+    os.rename(staging_dir, results_dir)
+    shutil.rmtree(old_results_dir)
+
+    return hit_count
@@ -0,0 +1,125 @@
+"""Utilities for loading and rendering jinja2 templates."""
+
+import functools
+import hashlib
+import logging
+import os
+
+import jinja2
+import jinja2.meta
+
+from amti import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class _SourceHashLoader(jinja2.BaseLoader):
+    """A jinja2 loader serving templates registered by source hash.
+
+    Naming each template by the hash of its source means the bytecode
+    cache is keyed by the template's content, so identical templates
+    share compiled code no matter where they're loaded from.
+    """
+
+    def __init__(self):
+        self.sources = {}
+
+    def register(self, source):
+        """Register ``source`` and return the name to load it by."""
+        name = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        self.sources[name] = source
+
+        return name
+
+    def get_source(self, environment, template):
+        if template not in self.sources:
+            raise jinja2.TemplateNotFound(template)
+
+        # since names are derived from sources, templates never go stale.
+        return self.sources[template], None, lambda: True
+
+
+@functools.lru_cache(maxsize=None)
+def get_environment():
+    """Return the jinja2 environment shared across ``amti``.
+
+    The environment is created once per process. If the template cache
+    directory can be created, compiled templates are also cached there
+    so that later runs and other processes don't need to recompile them.
+
+    Returns
+    -------
+    jinja2.Environment
+        the shared jinja2 environment.
+    """
+    cache_dir = settings.TEMPLATE_CACHE_DIR
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(cache_dir)
+    except OSError as error:
+        logger.debug(
+            f'Could not create template cache directory {cache_dir}:'
+            f' {error}. Templates will not be cached on disk.')
+        bytecode_cache = None
+
+    return jinja2.Environment(
+        loader=_SourceHashLoader(),
+        bytecode_cache=bytecode_cache,
+        cache_size=settings.TEMPLATE_CACHE_SIZE)
+
+
+def get_template(source):
+    """Return the compiled template for ``source``.
+
+    Parameters
+    ----------
+    source : str
+        the template's source.
+
+    Returns
+    -------
+    jinja2.Template
+        the compiled template.
+    """
+    environment = get_environment()
+    name = environment.loader.register(source)
+
+    return environment.get_template(name)
+
+
+def load_template(template_path):
+    """Return the compiled template stored at ``template_path``.
+
+    Parameters
+    ----------
+    template_path : str
+        the path to the template's file.
+
+    Returns
+    -------
+    jinja2.Template
+        the compiled template.
+    """
+    with open(template_path, 'r') as template_file:
+        source = template_file.read()
+
+    return get_template(source)
+
+
+def get_template_variables(source):
+    """Return the variables a template expects to be passed in.
+
+    Parameters
+    ----------
+    source : str
+        the template's source.
+
+    Returns
+    -------
+    Set[str]
+        the names of the variables used but not defined by the template.
+    """
+    environment = get_environment()
+
+    return jinja2.meta.find_undeclared_variables(environment.parse(source))
@@ -0,0 +1,206 @@
+#! /usr/bin/env python
+
+"""Benchmark parsing the answer XML of assignments.
+
+Time ``amti.utils.answers`` against the ``xml.dom.minidom`` code it
+replaced, on answer XML like the local stand-in for MTurk (see
+``amti.local``) generates:
+
+    parse: extract the answers from the XML, as ``extract tabular`` and
+      ``review-batch`` do.
+    format: pretty-print the XML, as ``extract xml`` does.
+
+For example:
+
+    python benchmarks/answers.py --fields 5 --fields 50 --number 10000
+"""
+
+import html
+import json
+import logging
+import platform
+import timeit
+from xml.dom import minidom
+
+import click
+
+from amti import local
+from amti import utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def _make_answer_xml(field_count):
+    """Return answer XML with ``field_count`` answers."""
+    return local.backend.ANSWER_TEMPLATE.format(answers=''.join(
+        '<Answer>'
+        f'<QuestionIdentifier>field_{i}</QuestionIdentifier>'
+        f'<FreeText>an &amp;quot;answer&amp;quot; to field {i}</FreeText>'
+        '</Answer>'
+        for i in range(field_count)))
+
+
+def _minidom_parse(answer_xml):
+    """Extract the answers from ``answer_xml`` using minidom."""
+    answers = {}
+    xml = minidom.parseString(answer_xml)
+    for answer_tag in xml.getElementsByTagName('Answer'):
+        [question_identifier_tag] =\
+            answer_tag.getElementsByTagName('QuestionIdentifier')
+        question_identifier = utils.xml.get_node_text(
+            question_identifier_tag)
+        [free_text_tag] = answer_tag.getElementsByTagName('FreeText')
+        answers[question_identifier] = html.unescape(
+            utils.xml.get_node_text(free_text_tag))
+
+    return answers
+
+
+def _minidom_format(answer_xml):
+    """Pretty-print ``answer_xml`` using minidom."""
+    return minidom.parseString(answer_xml).toprettyxml(indent='  ')
+
+
+OPERATIONS = [
+    ('parse', 'minidom', _minidom_parse),
+    ('parse', 'answers', utils.answers.parse_answers),
+    ('format', 'minidom', _minidom_format),
+    ('format', 'answers', lambda answer_xml: utils.answers.format_answer_xml(
+        answer_xml, indent='  '))
+]
+"""The operations to time, as (operation, implementation, function)."""
+
+
+def run_answers(field_count, number, repeat):
+    """Time each operation on answer XML with ``field_count`` answers.
+
+    Parameters
+    ----------
+    field_count : int
+        the number of answers in the answer XML.
+    number : int
+        the number of times to run each operation per timing.
+    repeat : int
+        the number of timings to take, of which the best is reported.
+
+    Returns
+    -------
+    List[Dict]
+        a dictionary of measurements for each operation.
+    """
+    answer_xml = _make_answer_xml(field_count)
+
+    # check that the implementations agree before timing them.
+    if _minidom_parse(answer_xml) != utils.answers.parse_answers(answer_xml):
+        raise ValueError('The parsed answers differ from minidom.')
+    if _minidom_format(answer_xml) != utils.answers.format_answer_xml(
+            answer_xml, indent='  '):
+        raise ValueError('The formatted XML differs from minidom.')
+
+    measurements = []
+    for operation, implementation, fn in OPERATIONS:
+        logger.info(
+            f'Timing {operation} with {implementation} on {field_count}'
+            f' fields.')
+
+        best_time = min(timeit.repeat(
+            lambda: fn(answer_xml), number=number, repeat=repeat))
+        measurements.append({
+            'fields': field_count,
+            'operation': operation,
+            'implementation': implementation,
+            'time_per_call_us': best_time / number * 1e6
+        })
+
+    return measurements
+
+
+def _format_results(results):
+    """Return a table summarizing ``results``."""
+    header = (
+        f'{"fields":>7} {"operation":<10} {"implementation":<15}'
+        f' {"time (us)":>10} {"speedup":>8}')
+    lines = [header, '-' * len(header)]
+    baselines = {
+        (measurement['fields'], measurement['operation']):
+            measurement['time_per_call_us']
+        for measurement in results['measurements']
+        if measurement['implementation'] == 'minidom'
+    }
+    for measurement in results['measurements']:
+        baseline = baselines[
+            (measurement['fields'], measurement['operation'])]
+        lines.append(
+            f'{measurement["fields"]:>7} {measurement["operation"]:<10}'
+            f' {measurement["implementation"]:<15}'
+            f' {measurement["time_per_call_us"]:>10.1f}'
+            f' {baseline / measurement["time_per_call_us"]:>7.1f}x')
+
+    return '\n'.join(lines)
+
+
+@click.command(
+    context_settings={
+        'help_option_names': ['--help', '-h']
+    })
+@click.option(
+    '--fields', '-f', 'field_counts',
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[5],
+    help='The number of answers in each assignment. May be passed'
+         ' several times to benchmark several sizes. Defaults to 5.')
+@click.option(
+    '--number', '-n',
+    type=click.IntRange(min=1),
+    default=5000,
+    help='The number of times to run each operation per timing. Defaults'
+         ' to 5000.')
+@click.option(
+    '--repeat', '-r',
+    type=click.IntRange(min=1),
+    default=3,
+    help='The number of timings to take, of which the best is reported.'
+         ' Defaults to 3.')
+@click.option(
+    '--output', '-o',
+    type=click.Path(dir_okay=False, writable=True),
+    help='The path at which to write the results as JSON.')
+@click.option(
+    '--verbose', '-v',
+    is_flag=True,
+    help='Set log level to DEBUG.')
+def answers(
+        field_counts,
+        number,
+        repeat,
+        output,
+        verbose):
+    """Benchmark parsing answer XML against minidom."""
+    utils.log.config_logging(logging.DEBUG if verbose else logging.WARNING)
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'number': number,
+            'repeat': repeat
+        },
+        'measurements': []
+    }
+    for field_count in field_counts:
+        results['measurements'].extend(run_answers(
+            field_count=field_count,
+            number=number,
+            repeat=repeat))
+
+    click.echo(_format_results(results))
+
+    if output is not None:
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    answers()
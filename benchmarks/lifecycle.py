@@ -0,0 +1,401 @@
+#! /usr/bin/env python
+
+"""Benchmark the full batch lifecycle at scale.
+
+Run every stage of a batch's lifecycle against the local stand-in for
+MTurk (see ``amti.local``), at one or more scales:
+
+    initialize -> render -> upload -> status -> review (approve all)
+      -> save -> extract tabular -> extract xml -> delete
+
+For each stage, report the wall time, the API calls made (by operation,
+including retries), the peak RSS of the process so far and the number of
+files created. Each scale runs in a fresh process, so peak RSS isn't
+carried over from one scale to the next.
+
+Results are printed as a table and, with ``--output``, written as JSON so
+that runs from different versions of ``amti`` can be compared. For
+example:
+
+    python benchmarks/lifecycle.py \\
+        --scale 1000 --scale 10000 --latency 0.05 --jobs 64 \\
+        --output results.json
+"""
+
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+from amti import actions
+from amti import local
+from amti import settings
+from amti import utils
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DEFINITION_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..',
+    'examples',
+    'html-question',
+    'definition')
+"""The batch definition to benchmark with by default."""
+
+
+def _count_files(paths):
+    """Return the number of files in or at ``paths``."""
+    count = 0
+    for path in paths:
+        if os.path.isfile(path):
+            count += 1
+        for _, _, file_names in os.walk(path):
+            count += len(file_names)
+
+    return count
+
+
+def _peak_rss_kb():
+    """Return the peak RSS of this process and its children, in KB."""
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def run_lifecycle(
+        scale,
+        definition_dir,
+        work_dir,
+        latency,
+        jobs,
+        render_jobs,
+        shard_size,
+        rate_limit,
+        transport):
+    """Run the batch lifecycle once and return measurements per stage.
+
+    Parameters
+    ----------
+    scale : int
+        the number of HITs in the batch.
+    definition_dir : str
+        the path to the batch definition to use.
+    work_dir : str
+        the directory in which to write the batch and its extracts.
+    latency : float
+        the simulated latency of each API call, in seconds.
+    jobs : int
+        the number of API calls to make concurrently.
+    render_jobs : int
+        the number of processes to render questions with.
+    shard_size : Optional[int]
+        the shard size for the batch, or ``None`` to not shard it.
+    rate_limit : Optional[float]
+        a rate limit, in requests per second, to use for every operation
+        in place of ``settings.RATE_LIMITS``, or ``None`` to use the
+        configured limits.
+    transport : str
+        ``"http"`` to serve the API over HTTP, or ``"in-process"`` to
+        answer requests without sockets.
+
+    Returns
+    -------
+    List[Dict]
+        a dictionary of measurements for each stage.
+    """
+    if rate_limit is not None:
+        settings.RATE_LIMITS = {}
+        settings.RATE_LIMIT_DEFAULT = rate_limit
+
+    # submit every assignment immediately, so the batch can be saved
+    # right after it's uploaded.
+    local_mturk = local.backend.LocalMTurk(latency=latency, worker_delay=0.)
+
+    server = None
+    if transport == 'http':
+        server = local.server.start_server(local_mturk)
+        settings.ENVS['local']['endpoint_url'] = server.url
+    client = utils.mturk.get_mturk_client('local', concurrency=jobs)
+    if transport == 'in-process':
+        local.server.serve_in_process(client, local_mturk)
+
+    data_path = os.path.join(work_dir, 'data.jsonl')
+    with open(data_path, 'w') as data_file:
+        for i in range(scale):
+            data_file.write(json.dumps({'example_word': f'word-{i}'}) + '\n')
+
+    save_dir = os.path.join(work_dir, 'batches')
+    os.mkdir(save_dir)
+    tabular_path = os.path.join(work_dir, 'batch.jsonl')
+    xml_dir = os.path.join(work_dir, 'xml')
+    os.mkdir(xml_dir)
+    mark_file_path = os.path.join(work_dir, 'marks.jsonl')
+
+    batch_dir = None
+
+    def initialize():
+        nonlocal batch_dir
+        batch_dir = actions.create.initialize_batch_directory(
+            definition_dir=definition_dir,
+            data_path=data_path,
+            save_dir=save_dir,
+            shard_size=shard_size)
+
+    def render():
+        for shard_dir in utils.batch.get_shard_dirs(batch_dir):
+            actions.create.render_batch(batch_dir=shard_dir, jobs=render_jobs)
+
+    stages = [
+        ('initialize', initialize),
+        ('render', render),
+        ('upload', lambda: actions.create.resume_batch(
+            client=client, batch_dir=batch_dir, jobs=jobs)),
+        ('status', lambda: actions.status.status_batch(
+            client=client, batch_dir=batch_dir, jobs=jobs)),
+        ('review', lambda: actions.review.review_batch(
+            client=client,
+            batch_dir=batch_dir,
+            approve_all=True,
+            mark_file_path=mark_file_path,
+            jobs=jobs)),
+        ('save', lambda: actions.save.save_batch(
+            client=client, batch_dir=batch_dir, jobs=jobs)),
+        ('extract-tabular', lambda: actions.extraction.tabular.tabular(
+            batch_dir=batch_dir,
+            output_path=tabular_path,
+            file_format='jsonl')),
+        ('extract-xml', lambda: actions.extraction.xml.xml(
+            batch_dir=batch_dir,
+            output_dir=xml_dir)),
+        ('delete', lambda: actions.delete.delete_batch(
+            client=client, batch_dir=batch_dir, jobs=jobs))
+    ]
+
+    measurements = []
+    try:
+        for name, stage in stages:
+            logger.info(f'Running stage {name} at scale {scale}.')
+
+            files_before = _count_files([save_dir, tabular_path, xml_dir])
+            request_counts_before = dict(local_mturk.request_counts)
+
+            start = time.perf_counter()
+            stage()
+            wall_time = time.perf_counter() - start
+
+            api_calls = {
+                operation_name: count
+                    - request_counts_before.get(operation_name, 0)
+                for operation_name, count
+                in local_mturk.request_counts.items()
+                if count > request_counts_before.get(operation_name, 0)
+            }
+            measurements.append({
+                'stage': name,
+                'wall_time': wall_time,
+                'api_calls': sum(api_calls.values()),
+                'api_calls_by_operation': api_calls,
+                'peak_rss_kb': _peak_rss_kb(),
+                'files_created': _count_files(
+                    [save_dir, tabular_path, xml_dir]) - files_before
+            })
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    return measurements
+
+
+def _get_commit():
+    """Return the current commit of amti's repository, if available."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_results(results):
+    """Return a table summarizing ``results``."""
+    header = (
+        f'{"scale":>9} {"stage":<16} {"wall (s)":>10} {"api calls":>10}'
+        f' {"peak rss (MB)":>14} {"files":>9}')
+    lines = [header, '-' * len(header)]
+    for run in results['runs']:
+        for measurement in run['stages']:
+            lines.append(
+                f'{run["scale"]:>9} {measurement["stage"]:<16}'
+                f' {measurement["wall_time"]:>10.2f}'
+                f' {measurement["api_calls"]:>10}'
+                f' {measurement["peak_rss_kb"] / 1024:>14.1f}'
+                f' {measurement["files_created"]:>9}')
+
+    return '\n'.join(lines)
+
+
+@click.command(
+    context_settings={
+        'help_option_names': ['--help', '-h']
+    })
+@click.option(
+    '--scale', '-n', 'scales',
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[1000],
+    help='The number of HITs in the batch. May be passed several times'
+         ' to benchmark several scales. Defaults to 1000.')
+@click.option(
+    '--definition-dir', '-d',
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    default=DEFAULT_DEFINITION_DIR,
+    help='The batch definition to benchmark with. Its question template'
+         ' must only use the variable "example_word". Defaults to the'
+         ' html-question example.')
+@click.option(
+    '--latency',
+    type=click.FloatRange(min=0),
+    default=0.,
+    help='The simulated latency of each API call, in seconds. Defaults'
+         ' to 0.')
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    default=16,
+    help='The number of API calls to make concurrently. Defaults to 16.')
+@click.option(
+    '--render-jobs',
+    type=click.IntRange(min=1),
+    default=1,
+    help='The number of processes to render questions with. Defaults'
+         ' to 1.')
+@click.option(
+    '--shard-size', '-s',
+    type=click.IntRange(min=1),
+    help='Split the batch into shards of at most this many HITs.')
+@click.option(
+    '--rate-limit',
+    type=click.FloatRange(min=0),
+    help='Use this rate limit, in requests per second, for every'
+         ' operation instead of the configured limits.')
+@click.option(
+    '--transport',
+    type=click.Choice(['in-process', 'http']),
+    default='in-process',
+    help='Whether to answer API calls in process or over HTTP on'
+         ' localhost. Defaults to in-process.')
+@click.option(
+    '--output', '-o',
+    type=click.Path(dir_okay=False, writable=True),
+    help='The path at which to write the results as JSON.')
+@click.option(
+    '--run-scale',
+    type=int,
+    hidden=True,
+    help='Run a single scale in this process and write its measurements'
+         ' as JSON to the --output path.')
+@click.option(
+    '--verbose', '-v',
+    is_flag=True,
+    help='Set log level to DEBUG.')
+def lifecycle(
+        scales,
+        definition_dir,
+        latency,
+        jobs,
+        render_jobs,
+        shard_size,
+        rate_limit,
+        transport,
+        output,
+        run_scale,
+        verbose):
+    """Benchmark the full batch lifecycle at one or more scales."""
+    utils.log.config_logging(logging.DEBUG if verbose else logging.WARNING)
+
+    if run_scale is not None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            measurements = run_lifecycle(
+                scale=run_scale,
+                definition_dir=os.path.abspath(definition_dir),
+                work_dir=work_dir,
+                latency=latency,
+                jobs=jobs,
+                render_jobs=render_jobs,
+                shard_size=shard_size,
+                rate_limit=rate_limit,
+                transport=transport)
+        with open(output, 'w') as output_file:
+            json.dump(measurements, output_file)
+
+        return
+
+    results = {
+        'commit': _get_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'latency': latency,
+            'jobs': jobs,
+            'render_jobs': render_jobs,
+            'shard_size': shard_size,
+            'rate_limit': rate_limit,
+            'transport': transport
+        },
+        'runs': []
+    }
+    for scale in scales:
+        # run each scale in a fresh process to isolate its peak RSS
+        run_output = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        run_output.close()
+        args = [
+            sys.executable, os.path.abspath(__file__),
+            '--run-scale', str(scale),
+            '--output', run_output.name,
+            '--definition-dir', definition_dir,
+            '--latency', str(latency),
+            '--jobs', str(jobs),
+            '--render-jobs', str(render_jobs),
+            '--transport', transport
+        ]
+        if shard_size is not None:
+            args.extend(['--shard-size', str(shard_size)])
+        if rate_limit is not None:
+            args.extend(['--rate-limit', str(rate_limit)])
+        if verbose:
+            args.append('--verbose')
+
+        start = time.perf_counter()
+        try:
+            subprocess.check_call(args)
+            with open(run_output.name, 'r') as run_output_file:
+                measurements = json.load(run_output_file)
+        finally:
+            os.remove(run_output.name)
+        results['runs'].append({
+            'scale': scale,
+            'wall_time': time.perf_counter() - start,
+            'stages': measurements
+        })
+
+    click.echo(_format_results(results))
+
+    if output is not None:
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    lifecycle()
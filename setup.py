@@ -18,7 +18,7 @@ setup(
     keywords='amti mechanical turk mturk crowdsourcing',
     classifiers=[
         'Development Status :: 3 - Alpha',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
         'License :: OSI Approved :: Apache Software License',
         'Intended Audience :: Developers',
         'Intended Audience :: Science/Research',
@@ -31,7 +31,7 @@ setup(
         'boto3 >= 1.12.39',
         'click >= 7.1.1'
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     scripts=[
         'scripts/amti'
     ],